@@ -1,17 +1,19 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from app.services.airfields import get_airfield_db
+from app.services.performance import pressure_altitude_ft
 from app.services.weather.select import get_taf_metar
 from app.services.weather.decode import decode_metar, decode_taf
 from app.services.decision_engine import analyze_weather
-from app.services.llm_client import chat_completion
+from app.services.llm_client import chat_completion_async, LLMTimeoutError
 
 router = APIRouter()
 
 @router.get("/analyze/weather")
 async def analyze_weather_comprehensive(
     icao: str = Query(..., min_length=4, max_length=4, description="Airport ICAO code"),
-    runway_deg: float = Query(..., description="Runway heading in degrees"),
-    pressure_alt_ft: float = Query(0, description="Pressure altitude in feet"),
+    runway_deg: Optional[float] = Query(None, description="Runway heading in degrees (default: best runway from the airfield database)"),
+    pressure_alt_ft: Optional[float] = Query(None, description="Pressure altitude in feet (default: field elevation and QNH, else sea level and QNH)"),
     question: Optional[str] = Query(None, description="Specific analysis question")
 ):
     """Comprehensive weather analysis with AI insights for T-6II operations."""
@@ -31,6 +33,21 @@ async def analyze_weather_comprehensive(
         metar_data = decode_metar(weather.metar_raw)
         taf_data = decode_taf(weather.taf_raw) if weather.taf_raw else {}
         
+        # Runway and pressure altitude from the airfield database when not given
+        db = get_airfield_db()
+        runway_ident = None
+        if runway_deg is None:
+            wind = metar_data.get("wind") or {}
+            ranked = db.rank_runways(icao, wind.get("dir_deg"), wind.get("speed_kt") or 0, wind.get("gust_kt"))
+            if not ranked:
+                raise HTTPException(status_code=400, detail=f"No runway data for {icao.upper()}; pass runway_deg")
+            runway_ident, runway_deg = ranked[0]["runway"], ranked[0]["heading_true_deg"]
+        if pressure_alt_ft is None:
+            qnh_hpa = (metar_data.get("altimeter") or {}).get("qnh_hpa")
+            pressure_alt_ft = db.pressure_altitude(icao, qnh_hpa)
+            if pressure_alt_ft is None:   # field not in the database: sea level, still corrected for QNH
+                pressure_alt_ft = round(float(pressure_altitude_ft(0.0, qnh_hpa or None)))
+        
         # Get decision analysis
         analysis = analyze_weather(metar_data, runway_deg, pressure_alt_ft, 
                                  metar_data.get("temperature", {}).get("temp_c", 15))
@@ -38,7 +55,7 @@ async def analyze_weather_comprehensive(
         # Prepare AI analysis prompt
         weather_context = f"""
 Airport: {icao}
-Runway: {runway_deg}°
+Runway: {runway_ident + " " if runway_ident else ""}{runway_deg}°
 Pressure Altitude: {pressure_alt_ft} ft
 
 Current Weather (METAR):
@@ -75,10 +92,11 @@ Decision Analysis:
             }
         ]
         
-        ai_analysis = chat_completion(messages)
+        ai_analysis = await chat_completion_async(messages)
         
         return {
             "airport": icao,
+            "runway": runway_ident,
             "runway_heading_deg": runway_deg,
             "pressure_altitude_ft": pressure_alt_ft,
             "weather_data": {
@@ -94,32 +112,88 @@ Decision Analysis:
         
     except HTTPException:
         raise
+    except LLMTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @router.get("/analyze/performance")
 async def analyze_performance(
     icao: str = Query(..., min_length=4, max_length=4, description="Airport ICAO code"),
-    pressure_alt_ft: float = Query(..., description="Pressure altitude in feet"),
-    oat_c: float = Query(..., description="Outside air temperature in Celsius"),
-    runway_length_ft: float = Query(5000, description="Runway length in feet"),
-    aircraft_weight_lbs: float = Query(5500, description="Aircraft weight in pounds")
+    pressure_alt_ft: Optional[float] = Query(None, description="Pressure altitude in feet (default: field elevation and QNH)"),
+    oat_c: Optional[float] = Query(None, description="Outside air temperature in Celsius (default: from the METAR)"),
+    runway_length_ft: Optional[float] = Query(None, description="Runway length in feet (default: longest runway at the field, else 5000)"),
+    aircraft_weight_lbs: float = Query(5500, description="Aircraft weight in pounds"),
+    elevation_ft: Optional[float] = Query(None, description="Field elevation (default: airfield database)"),
+    qnh_hpa: Optional[float] = Query(None, description="Altimeter setting in hPa (default: from the METAR)"),
+    sweep_weight_lbs: Optional[List[float]] = Query(None, description="Sweep weights (repeat the parameter)"),
+    sweep_pressure_alt_ft: Optional[List[float]] = Query(None, description="Sweep pressure altitudes"),
+    sweep_oat_c: Optional[List[float]] = Query(None, description="Sweep temperatures")
 ):
     """Analyze aircraft performance for T-6II operations."""
     try:
-        from app.services.aviation_helpers import density_altitude
+        import asyncio
+        from app.services.airfields import get_airfield_db
+        from app.services.performance import (
+            density_altitude_ft, density_ratio, get_performance_tables, isa_temperature_c, performance_sweep,
+            pressure_altitude_ft,
+        )
+        
+        airfield = get_airfield_db().get(icao)
+        source = {"pressure_alt": "query", "oat": "query"}
+        
+        # Pressure altitude from field elevation and QNH, temperature from the METAR, unless given
+        if pressure_alt_ft is None or oat_c is None:
+            metar_data = {}
+            if qnh_hpa is None or oat_c is None:
+                try:
+                    weather = await asyncio.wait_for(get_taf_metar(icao), timeout=10.0)
+                    metar_data = decode_metar(weather.metar_raw) if weather.metar_raw else {}
+                except asyncio.TimeoutError:
+                    metar_data = {}
+            if pressure_alt_ft is None:
+                if elevation_ft is None and airfield is None:
+                    raise HTTPException(status_code=400, detail=f"{icao.upper()} is not in the airfield database; pass pressure_alt_ft or elevation_ft")
+                elevation_ft = elevation_ft if elevation_ft is not None else airfield.elevation_ft
+                qnh_hpa = qnh_hpa if qnh_hpa is not None else (metar_data.get("altimeter") or {}).get("qnh_hpa")
+                pressure_alt_ft = round(float(pressure_altitude_ft(elevation_ft, qnh_hpa)))
+                source["pressure_alt"] = "elevation + " + ("QNH" if qnh_hpa else "standard pressure (no QNH)")
+            if oat_c is None:
+                oat_c = (metar_data.get("temperature") or {}).get("temp_c")
+                source["oat"] = "METAR"
+                if oat_c is None:
+                    oat_c = round(float(isa_temperature_c(pressure_alt_ft)), 1)
+                    source["oat"] = "ISA (no METAR temperature)"
+        if runway_length_ft is None:
+            lengths = [r.length_m for r in airfield.runways] if airfield else []
+            runway_length_ft = round(max(lengths) / 0.3048) if lengths else 5000
         
         # Calculate density altitude
-        da = density_altitude(pressure_alt_ft, oat_c)
+        da = round(float(density_altitude_ft(pressure_alt_ft, oat_c)))
         
         # Basic performance analysis
         performance_analysis = {
             "density_altitude_ft": da,
             "pressure_altitude_ft": pressure_alt_ft,
             "outside_air_temp_c": oat_c,
-            "isa_deviation_c": oat_c - (15 - 2.0 * (pressure_alt_ft / 1000.0)),
+            "isa_deviation_c": round(oat_c - float(isa_temperature_c(pressure_alt_ft)), 1),
+            "density_ratio": round(float(density_ratio(pressure_alt_ft, oat_c)), 4),
             "runway_length_ft": runway_length_ft,
-            "aircraft_weight_lbs": aircraft_weight_lbs
+            "aircraft_weight_lbs": aircraft_weight_lbs,
+            "field_elevation_ft": elevation_ft if elevation_ft is not None else (airfield.elevation_ft if airfield else None),
+            "qnh_hpa": qnh_hpa,
+            "inputs": source
+        }
+        
+        # Takeoff/landing data interpolated from the performance grids
+        tables = get_performance_tables()
+        found = tables.lookup(weight_lbs=aircraft_weight_lbs, pressure_alt_ft=pressure_alt_ft, oat_c=oat_c)
+        data = {name: round(float(r["value"])) for name, r in found.items()}
+        performance_analysis["performance_data"] = {
+            **data,
+            "source": tables.source,
+            "approved": tables.approved,
+            "outside_data_range": any(bool(r["clamped"]) for r in found.values())
         }
         
         # Performance impacts
@@ -132,6 +206,8 @@ async def analyze_performance(
             impacts.append(f"High pressure altitude {pressure_alt_ft} ft - reduced engine power")
         if oat_c > 30:
             impacts.append(f"High temperature {oat_c}°C - reduced engine performance")
+        if performance_analysis["performance_data"]["outside_data_range"]:
+            impacts.append("Conditions outside the performance data range - values clamped to the nearest grid edge")
         
         performance_analysis["performance_impacts"] = impacts
         
@@ -146,6 +222,18 @@ async def analyze_performance(
         else:
             recommendations.append("❌ Significant performance reduction - consider alternatives")
         
+        # Runway-length verdicts only from approved (flight manual) tables
+        if data and not tables.approved:
+            recommendations.append(f"ℹ️ No runway-length check: performance data is not approved ({tables.source or 'unknown source'}); "
+                                   "use the flight manual charts")
+        for name, label in (("takeoff_50ft_ft", "Takeoff distance over 50 ft"), ("landing_50ft_ft", "Landing distance over 50 ft")):
+            if name in data and tables.approved:
+                margin = runway_length_ft / data[name] if data[name] else None
+                if margin is not None and margin < 1.0:
+                    recommendations.append(f"❌ {label} {data[name]} ft exceeds runway length {runway_length_ft:.0f} ft")
+                elif margin is not None and margin < 1.5:
+                    recommendations.append(f"⚠️ {label} {data[name]} ft leaves less than 50% runway margin")
+        
         if runway_length_ft < 3000:
             recommendations.append("⚠️ Short runway - ensure adequate takeoff distance")
         elif runway_length_ft > 8000:
@@ -153,8 +241,19 @@ async def analyze_performance(
         
         performance_analysis["recommendations"] = recommendations
         
+        # Grid form: every weight x pressure altitude x OAT combination
+        if sweep_weight_lbs or sweep_pressure_alt_ft or sweep_oat_c:
+            performance_analysis["sweep"] = performance_sweep(
+                tables,
+                sweep_weight_lbs or [aircraft_weight_lbs],
+                sweep_pressure_alt_ft or [pressure_alt_ft],
+                sweep_oat_c or [oat_c],
+            )
+        
         return performance_analysis
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Performance analysis failed: {str(e)}")
 
@@ -162,53 +261,124 @@ async def analyze_performance(
 async def analyze_route(
     departure: str = Query(..., min_length=4, max_length=4, description="Departure airport ICAO"),
     arrival: str = Query(..., min_length=4, max_length=4, description="Arrival airport ICAO"),
-    route_type: str = Query("VFR", description="Route type: VFR, IFR, or MIXED")
+    route_type: str = Query("VFR", description="Route type: VFR, IFR, or MIXED"),
+    via: Optional[List[str]] = Query(None, description="Intermediate waypoints in order: ICAO or \"lat,lon\" (repeat for each)"),
+    corridor_nm: float = Query(25, ge=1, le=200, description="Stations within this distance of the route (nm)"),
+    segment_nm: float = Query(50, ge=5, le=500, description="Segment length for the worst-case summary (nm)"),
+    window_hours: int = Query(2, ge=0, le=30, description="Include TAF conditions forecast over the next N hours")
 ):
-    """Analyze route conditions between two airports."""
+    """Analyze weather along the route corridor, per segment, for every reporting station."""
     try:
         import asyncio
-        
-        # Get weather for both airports
+        from datetime import datetime, timedelta, timezone
+        from app.core.config import settings
+        from app.services.airfields import get_airfield_db
+        from app.services.route_corridor import get_station_grid, resolve_waypoints, sweep_corridor, worst_category
+        from app.services.weather import get_taf_metar_many
+        from app.services.weather.decoder import parse_taf
+
+        departure, arrival = departure.upper(), arrival.upper()
+        db = get_airfield_db()
+
+        # Corridor sweep (needs every waypoint's position)
+        corridor = None
+        corridor_note = None
+        try:
+            waypoints = resolve_waypoints([departure] + (via or []) + [arrival], db)
+            corridor = sweep_corridor(waypoints, corridor_nm, segment_nm, get_station_grid(), db.icao)
+        except ValueError as e:
+            corridor_note = f"Corridor not analyzed: {e}"
+
+        icaos = [departure, arrival]
+        if corridor is not None:
+            nearest = sorted(corridor["stations"], key=lambda st: st["offset_nm"])[:settings.ROUTE_MAX_STATIONS]
+            keep = {st["icao"] for st in nearest}
+            corridor["stations"] = [st for st in corridor["stations"] if st["icao"] in keep]
+            icaos += [st["icao"] for st in corridor["stations"]]
+        icaos = list(dict.fromkeys(icaos))
+
+        # All stations at once, through the weather cache
         try:
-            dep_weather = await asyncio.wait_for(get_taf_metar(departure), timeout=10.0)
-            arr_weather = await asyncio.wait_for(get_taf_metar(arrival), timeout=10.0)
+            found = await asyncio.wait_for(get_taf_metar_many(icaos), timeout=15.0)
         except asyncio.TimeoutError:
             raise HTTPException(status_code=408, detail="Weather data request timed out")
-        
-        # Decode weather data
-        dep_metar = decode_metar(dep_weather.metar_raw) if dep_weather.metar_raw else {}
-        arr_metar = decode_metar(arr_weather.metar_raw) if arr_weather.metar_raw else {}
+
+        now = datetime.now(timezone.utc)
+        reports = {}
+        for icao in icaos:
+            weather = found.get(icao)
+            if weather is None or isinstance(weather, Exception):
+                reports[icao] = {"metar_raw": None, "metar": {}, "current": "unknown", "forecast": "unknown", "worst": "unknown"}
+                continue
+            metar = decode_metar(weather.metar_raw) if weather.metar_raw else {}
+            forecast = "unknown"
+            if weather.taf_raw and window_hours:
+                worst = parse_taf(weather.taf_raw.strip()).window(now, now + timedelta(hours=window_hours))["worst"]
+                forecast = worst["flight_rules"] if worst else "unknown"
+            current = metar.get("flight_rules", "unknown")
+            reports[icao] = {"metar_raw": weather.metar_raw, "metar": metar, "current": current,
+                             "forecast": forecast, "worst": worst_category([current, forecast])}
+
+        dep, arr = reports[departure], reports[arrival]
+        dep_ok = dep["current"] in ["VFR", "MVFR"]
+        arr_ok = arr["current"] in ["VFR", "MVFR"]
+
+        # Per-segment worst case over the stations assigned to it
+        blocked = {"LIFR"} if route_type.upper() == "IFR" else {"IFR", "LIFR"}
+        if corridor is not None:
+            for i, segment in enumerate(corridor["segments"]):
+                members = [st["icao"] for st in corridor["stations"] if st["segment"] == i]
+                segment["stations"] = members
+                segment["worst_category"] = worst_category([reports[m]["worst"] for m in members])
+            for st in corridor["stations"]:
+                st.update({k: reports[st["icao"]][k] for k in ("current", "forecast", "worst")})
+            route_ok = not any(seg["worst_category"] in blocked for seg in corridor["segments"])
+        else:
+            route_ok = dep["worst"] not in blocked and arr["worst"] not in blocked
         
         # Route analysis
         route_analysis = {
             "departure": {
                 "icao": departure,
-                "metar_raw": dep_weather.metar_raw,
-                "metar_decoded": dep_metar,
-                "conditions": dep_metar.get("flight_rules", "unknown")
+                "metar_raw": dep["metar_raw"],
+                "metar_decoded": dep["metar"],
+                "conditions": dep["current"]
             },
             "arrival": {
                 "icao": arrival,
-                "metar_raw": arr_weather.metar_raw,
-                "metar_decoded": arr_metar,
-                "conditions": arr_metar.get("flight_rules", "unknown")
+                "metar_raw": arr["metar_raw"],
+                "metar_decoded": arr["metar"],
+                "conditions": arr["current"]
             },
             "route_type": route_type,
+            "corridor": corridor,
             "analysis": {
-                "departure_suitable": dep_metar.get("flight_rules", "unknown") in ["VFR", "MVFR"],
-                "arrival_suitable": arr_metar.get("flight_rules", "unknown") in ["VFR", "MVFR"],
-                "route_recommended": True  # Simplified for now
+                "departure_suitable": dep_ok,
+                "arrival_suitable": arr_ok,
+                "route_recommended": route_ok and (dep_ok and arr_ok or route_type.upper() == "IFR")
             }
         }
         
         # Generate recommendations
         recommendations = []
-        if not route_analysis["analysis"]["departure_suitable"]:
+        if not dep_ok:
             recommendations.append(f"❌ Departure {departure} conditions not suitable for {route_type}")
-        if not route_analysis["analysis"]["arrival_suitable"]:
+        if not arr_ok:
             recommendations.append(f"❌ Arrival {arrival} conditions not suitable for {route_type}")
-        if route_analysis["analysis"]["departure_suitable"] and route_analysis["analysis"]["arrival_suitable"]:
-            recommendations.append("✅ Both airports suitable for VFR operations")
+        if corridor is not None:
+            for seg in corridor["segments"]:
+                where = f"leg {seg['leg']} ({seg['from']}-{seg['to']}) {seg['start_nm']:.0f}-{seg['end_nm']:.0f} nm"
+                if seg["worst_category"] in blocked:
+                    recommendations.append(f"❌ {seg['worst_category']} along {where}: {', '.join(seg['stations'])}")
+                elif seg["worst_category"] == "MVFR":
+                    recommendations.append(f"⚠️ Marginal VFR along {where}")
+                elif seg["worst_category"] == "unknown":
+                    recommendations.append(f"⚠️ No reporting stations within {corridor_nm:.0f} nm along {where}")
+        else:
+            recommendations.append(f"⚠️ {corridor_note}")
+        if dep_ok and arr_ok and route_analysis["analysis"]["route_recommended"]:
+            recommendations.append("✅ Both airports and the route corridor suitable for VFR operations" if corridor is not None
+                                   else "✅ Both airports suitable for VFR operations")
         
         route_analysis["recommendations"] = recommendations
         
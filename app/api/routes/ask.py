@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.api.schemas import AskRequest, AskResponse
-from app.services.llm_client import chat_completion
+from app.services.llm_client import chat_completion_async, stream_chat_completion, LLMTimeoutError
 from app.services.retriever_cache import get_retriever
+from app.services.answer_cache import AnswerCache, get_answer_cache
+from app.core.config import settings
+from app.utils.sse import sse_event, SSE_HEADERS
 
 router = APIRouter()
 
@@ -11,42 +19,152 @@ SYSTEM_PROMPT = (
     "Be concise, accurate, and conservative. If unsure, say you are unsure."
 )
 
-@router.post("/ask", response_model=AskResponse)
-def ask(req: AskRequest):
-    try:
-        # Get relevant T-6II procedures
-        retriever = get_retriever()
-        relevant_docs = retriever.search(req.question, k=3)
-        
-        # Build context from retrieved documents
-        context = ""
-        if relevant_docs:
-            context = "\n\n".join([
-                f"**{doc['title']}**:\n{doc['chunk_text']}"
-                for doc in relevant_docs
-            ])
-        
-        # Create enhanced prompt with context
-        if context:
-            enhanced_prompt = f"""
+@dataclass
+class _Prepared:
+    """Everything /ask and /ask/stream need before calling the model"""
+    retriever: Any
+    cache: Optional[AnswerCache]
+    mode: str
+    query_vector: Optional[np.ndarray] = None
+    cached: Optional[str] = None        # answer text on a cache hit
+    cache_kind: Optional[str] = None    # "exact" | "semantic"
+    docs: List[Dict] = field(default_factory=list)
+    messages: List[Dict[str, str]] = field(default_factory=list)
+
+async def _prepare(req: AskRequest) -> _Prepared:
+    # Get relevant T-6II procedures
+    retriever = await run_in_threadpool(get_retriever)
+    mode = req.retrieval_mode or settings.RETRIEVAL_MODE
+    cache = get_answer_cache()
+    if cache is not None:
+        cached = cache.get(req.question, mode, retriever.version)
+        if cached is not None:
+            return _Prepared(retriever, cache, mode, cached=cached.answer, cache_kind="exact")
+    
+    # Embed once; the vector serves both the semantic cache and the search
+    query_vector = None
+    if mode != "lexical":
+        query_vector = (await run_in_threadpool(retriever.embed_queries, [req.question]))[0]
+        if cache is not None:
+            similar = cache.get_similar(query_vector, mode, retriever.version)
+            if similar is not None:
+                return _Prepared(retriever, cache, mode, query_vector, cached=similar[0].answer, cache_kind="semantic")
+    elif cache is not None:
+        cache.miss()
+    
+    # BM25 scan and dense search are CPU work; keep them off the event loop like the embedding call
+    relevant_docs = await run_in_threadpool(retriever.search, req.question, k=3, mode=mode, query_vector=query_vector)
+    
+    # Build context from retrieved documents
+    context = ""
+    if relevant_docs:
+        context = "\n\n".join([
+            f"**{doc['title']}**:\n{doc['chunk_text']}"
+            for doc in relevant_docs
+        ])
+    
+    # Create enhanced prompt with context
+    if context:
+        enhanced_prompt = f"""
 {context}
 
 Based on the above T-6II procedures, answer this question: {req.question}
 
 Provide a clear, step-by-step answer based on the official procedures above.
 """
-        else:
-            enhanced_prompt = req.question
-        
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": enhanced_prompt},
-        ]
+    else:
+        enhanced_prompt = req.question
+    
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": enhanced_prompt},
+    ]
+    return _Prepared(retriever, cache, mode, query_vector, docs=relevant_docs, messages=messages)
+
+@router.post("/ask", response_model=AskResponse)
+async def ask(req: AskRequest):
+    try:
+        prep = await _prepare(req)
+        if prep.cached is not None:
+            return AskResponse(answer=prep.cached, cache=prep.cache_kind)
         
-        answer = chat_completion(messages)
+        answer = await chat_completion_async(prep.messages)
         if not answer:
             raise HTTPException(status_code=502, detail="Empty response from model.")
         
+        if prep.cache is not None:
+            prep.cache.put(req.question, prep.mode, answer, prep.query_vector, prep.retriever.version)
         return AskResponse(answer=answer)
+    except HTTPException:
+        raise
+    except LLMTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ask/stream")
+async def ask_stream(req: AskRequest, request: Request):
+    """/ask as Server-Sent Events.
+
+    Events: `sources` (retrieved chunks, sent before generation starts),
+    `token` (answer text as it is generated), then `done` or `error`.
+    A cache hit is sent as a single token followed by done.
+    """
+    try:
+        prep = await _prepare(req)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        sources = [
+            {"title": d.get("title"), "chunk_id": d.get("chunk_id"), "score": d.get("score")}
+            for d in prep.docs
+        ]
+        yield sse_event("sources", {"sources": sources, "cache": prep.cache_kind})
+        if prep.cached is not None:
+            yield sse_event("token", {"text": prep.cached})
+            yield sse_event("done", {"cache": prep.cache_kind})
+            return
+        
+        parts = []
+        tokens = stream_chat_completion(prep.messages)
+        try:
+            async for text in tokens:
+                if await request.is_disconnected():
+                    return  # finally closes the upstream stream
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        except LLMTimeoutError as e:
+            yield sse_event("error", {"status": 504, "detail": str(e)})
+            return
+        except Exception as e:
+            yield sse_event("error", {"status": 500, "detail": str(e)})
+            return
+        finally:
+            await tokens.aclose()
+        
+        answer = "".join(parts).strip()
+        if not answer:
+            yield sse_event("error", {"status": 502, "detail": "Empty response from model."})
+            return
+        if prep.cache is not None:
+            prep.cache.put(req.question, prep.mode, answer, prep.query_vector, prep.retriever.version)
+        yield sse_event("done", {"chars": len(answer)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/ask/cache")
+def ask_cache_stats():
+    """Answer cache hit rates and size"""
+    cache = get_answer_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.delete("/ask/cache")
+def clear_ask_cache():
+    """Drop every cached answer"""
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.clear()
+    return {"cleared": cache is not None}
@@ -1,7 +1,16 @@
 from fastapi import APIRouter, HTTPException, Query
+from app.api.schemas import DecisionMatrixRequest
+from app.core.config import settings
 from app.services.aviation_helpers import wind_components, density_altitude
-from app.services.decision_engine import analyze_weather
+from app.services.decision_engine import analyze_weather, analyze_forecast
+from app.services import decision_matrix as dm
+from app.services.airfields import get_airfield_db
+from app.services.performance import pressure_altitude_ft
+from app.services.weather.decoder import parse_taf
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+import numpy as np
+import time
 
 router = APIRouter()
 
@@ -59,7 +68,7 @@ async def calculate_density_altitude(
 @router.get("/aviation/runway-analysis")
 async def analyze_runway_conditions(
     icao: str = Query(..., min_length=4, max_length=4, description="Airport ICAO code"),
-    rwy_deg: float = Query(..., description="Runway heading in degrees")
+    rwy_deg: Optional[float] = Query(None, description="Runway heading in degrees (default: best runway from the airfield database)")
 ):
     """Analyze runway conditions using current weather data."""
     try:
@@ -78,7 +87,17 @@ async def analyze_runway_conditions(
             raise HTTPException(status_code=400, detail="No wind data in METAR")
         
         wind = metar_data["wind"]
-        headwind, crosswind = wind_components(wind["dir_deg"], wind["speed_kt"], rwy_deg)
+        runway_ident = None
+        if rwy_deg is None:
+            ranked = get_airfield_db().rank_runways(icao, wind["dir_deg"], wind["speed_kt"], wind.get("gust_kt"))
+            if not ranked:
+                raise HTTPException(status_code=400, detail=f"No runway data for {icao.upper()}; pass rwy_deg")
+            runway_ident, rwy_deg = ranked[0]["runway"], ranked[0]["heading_true_deg"]
+        if wind["dir_deg"] is None:
+            # Variable wind: assume the worst case, all of it across the runway
+            headwind, crosswind = 0.0, float(wind["speed_kt"])
+        else:
+            headwind, crosswind = wind_components(wind["dir_deg"], wind["speed_kt"], rwy_deg)
         
         # T-6II specific analysis
         t6_max_crosswind = 15  # knots - adjust based on your training standards
@@ -86,6 +105,7 @@ async def analyze_runway_conditions(
         
         return {
             "airport": icao,
+            "runway": runway_ident,
             "runway_heading_deg": rwy_deg,
             "wind_data": {
                 "direction_deg": wind["dir_deg"],
@@ -112,15 +132,75 @@ async def analyze_runway_conditions(
                 "flight_rules": metar_data.get("flight_rules")
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/aviation/airfields/{icao}")
+async def get_airfield(icao: str):
+    """Airfield position, elevation and runways from the local database."""
+    airfield = get_airfield_db().get(icao)
+    if airfield is None:
+        raise HTTPException(status_code=404, detail=f"{icao.upper()} is not in the airfield database")
+    return {
+        "icao": airfield.icao,
+        "name": airfield.name,
+        "lat": airfield.lat,
+        "lon": airfield.lon,
+        "elevation_ft": airfield.elevation_ft,
+        "runways": [{"ident": r.ident, "heading_true_deg": round(r.heading_deg, 1), "length_m": r.length_m}
+                    for r in airfield.runways],
+    }
+
+@router.get("/aviation/best-runway")
+async def get_best_runway(
+    icao: str = Query(..., min_length=4, max_length=4, description="Airport ICAO code"),
+    wind_dir_deg: Optional[float] = Query(None, description="Wind direction (true); default from the current METAR"),
+    wind_speed: Optional[float] = Query(None, description="Wind speed in knots; default from the current METAR"),
+    gust_kt: Optional[float] = Query(None, description="Gust in knots"),
+    max_xwind_kt: float = Query(dm.DEFAULT_MAX_XWIND_KT, description="Crosswind limit (knots)"),
+    max_tailwind_kt: float = Query(dm.MAX_TAILWIND_KT, description="Tailwind limit (knots)")
+):
+    """Rank every runway at a field by tailwind, crosswind and headwind."""
+    try:
+        db = get_airfield_db()
+        if icao.upper() not in db:
+            raise HTTPException(status_code=404, detail=f"{icao.upper()} is not in the airfield database")
+
+        source = "query"
+        if wind_speed is None:
+            from app.services.weather.select import get_taf_metar
+            from app.services.weather.decode import decode_metar
+
+            weather = await get_taf_metar(icao)
+            wind = decode_metar(weather.metar_raw).get("wind") if weather.metar_raw else None
+            if not wind:
+                raise HTTPException(status_code=404, detail="No current wind data available; pass wind_dir_deg and wind_speed")
+            wind_dir_deg, wind_speed, gust_kt, source = wind["dir_deg"], wind["speed_kt"], wind.get("gust_kt"), "METAR"
+
+        ranked = db.rank_runways(icao, wind_dir_deg, wind_speed, gust_kt, max_xwind_kt, max_tailwind_kt)
+        return {
+            "icao": icao.upper(),
+            "wind": {"dir_deg": wind_dir_deg, "speed_kt": wind_speed, "gust_kt": gust_kt, "source": source},
+            "best_runway": ranked[0]["runway"] if ranked and ranked[0]["within_limits"] else None,
+            "runways": ranked,
+            "limits": {"max_crosswind_kt": max_xwind_kt, "max_tailwind_kt": max_tailwind_kt},
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Best runway failed: {str(e)}")
+
 @router.get("/aviation/decision-analysis")
 async def get_decision_analysis(
     icao: str = Query(..., min_length=4, max_length=4, description="Airport ICAO code"),
-    runway_deg: float = Query(..., description="Runway heading in degrees"),
-    pressure_alt_ft: float = Query(0, description="Pressure altitude in feet (default: 0)"),
-    oat_c: float = Query(None, description="Outside air temperature in Celsius (optional)")
+    runway_deg: Optional[float] = Query(None, description="Runway heading in degrees (default: best runway from the airfield database)"),
+    pressure_alt_ft: Optional[float] = Query(None, description="Pressure altitude in feet (default: field elevation and QNH, else sea level and QNH)"),
+    oat_c: float = Query(None, description="Outside air temperature in Celsius (optional)"),
+    launch_time: Optional[datetime] = Query(None, description="Planned launch (UTC) to evaluate against the TAF"),
+    forecast_hours: int = Query(0, ge=0, le=30, description="Also evaluate this many hours after launch")
 ):
     """Get comprehensive weather decision analysis for T-6II operations."""
     try:
@@ -140,6 +220,21 @@ async def get_decision_analysis(
         # Decode METAR
         metar_data = decode_metar(weather.metar_raw)
         
+        # Runway and pressure altitude from the airfield database when not given
+        db = get_airfield_db()
+        runway_ident = None
+        if runway_deg is None:
+            wind = metar_data.get("wind") or {}
+            ranked = db.rank_runways(icao, wind.get("dir_deg"), wind.get("speed_kt") or 0, wind.get("gust_kt"))
+            if not ranked:
+                raise HTTPException(status_code=400, detail=f"No runway data for {icao.upper()}; pass runway_deg")
+            runway_ident, runway_deg = ranked[0]["runway"], ranked[0]["heading_true_deg"]
+        if pressure_alt_ft is None:
+            qnh_hpa = (metar_data.get("altimeter") or {}).get("qnh_hpa")
+            pressure_alt_ft = db.pressure_altitude(icao, qnh_hpa)
+            if pressure_alt_ft is None:   # field not in the database: sea level, still corrected for QNH
+                pressure_alt_ft = round(float(pressure_altitude_ft(0.0, qnh_hpa or None)))
+        
         # Use temperature from METAR if not provided
         if oat_c is None and "temperature" in metar_data:
             oat_c = metar_data["temperature"]["temp_c"]
@@ -171,8 +266,19 @@ async def get_decision_analysis(
             recommendations.append(f"⚠️ High density altitude {analysis['density_altitude_ft']} ft - expect reduced performance")
         
         analysis["t6_recommendations"] = recommendations
+        
+        # Forecast at launch (and after) from the TAF's period index
+        if launch_time is not None and weather.taf_raw:
+            if launch_time.tzinfo is None:
+                launch_time = launch_time.replace(tzinfo=timezone.utc)
+            taf = parse_taf(weather.taf_raw.strip())
+            times = [launch_time + timedelta(hours=h) for h in range(forecast_hours + 1)]
+            analysis["forecast"] = analyze_forecast(taf, runway_deg, pressure_alt_ft, oat_c, times)
+        
         analysis["icao"] = icao
+        analysis["runway"] = runway_ident
         analysis["runway_heading_deg"] = runway_deg
+        analysis["pressure_alt_ft"] = pressure_alt_ft
         
         return analysis
         
@@ -180,3 +286,129 @@ async def get_decision_analysis(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Decision analysis failed: {str(e)}")
+
+def _finite(value) -> Optional[float]:
+    """JSON has no NaN: cells without a report come back as null"""
+    return None if np.isnan(value) else float(value)
+
+@router.post("/aviation/decision-matrix")
+async def get_decision_matrix(req: DecisionMatrixRequest):
+    """Go/no-go for every station x runway x hour, evaluated in one vectorized pass."""
+    try:
+        from app.services.weather import get_taf_metar_many
+        from app.services.weather.decode import decode_metar
+
+        icaos = [s.icao.upper() for s in req.stations]
+        if len(set(icaos)) > settings.WEATHER_BULK_MAX_STATIONS:
+            raise HTTPException(status_code=422, detail=f"At most {settings.WEATHER_BULK_MAX_STATIONS} stations per request")
+
+        # Runways and elevation default to the airfield database
+        db = get_airfield_db()
+        runways, idents, elevations = [], [], []
+        for station, icao in zip(req.stations, icaos):
+            airfield = db.get(icao)
+            if station.runways:
+                runways.append(list(station.runways))
+                idents.append([None] * len(station.runways))
+            elif airfield is not None and airfield.runways:
+                runways.append([round(r.heading_deg, 1) for r in airfield.runways])
+                idents.append([r.ident for r in airfield.runways])
+            else:
+                raise HTTPException(status_code=422, detail=f"No runway data for {icao}; pass runways")
+            if station.elevation_ft is not None:
+                elevations.append(station.elevation_ft)
+            else:
+                elevations.append(airfield.elevation_ft if airfield is not None else 0.0)
+
+        found = await get_taf_metar_many(icaos)
+
+        start = req.start or datetime.now(timezone.utc)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        times = [start + timedelta(hours=h) for h in range(req.hours + 1)]
+
+        grid, sources, pa, oat, providers = [], [], [], [], []
+        for s, icao in enumerate(icaos):
+            weather = found.get(icao)
+            if isinstance(weather, Exception):
+                weather = None
+            metar = decode_metar(weather.metar_raw) if weather and weather.metar_raw else {}
+            taf = parse_taf(weather.taf_raw.strip()) if weather and weather.taf_raw else None
+            providers.append(weather.provider if weather else None)
+
+            row, row_sources = [], []
+            for i, t in enumerate(times):
+                if i == 0 and req.start is None and metar:
+                    row.append(metar)   # "now" is the observation, not the forecast
+                    row_sources.append("METAR")
+                    continue
+                at = taf.at(t) if taf else None
+                cond = at and at["worst" if req.forecast == "worst" else "prevailing"]
+                row.append(cond)
+                row_sources.append(("TAF " + req.forecast) if cond else "none")
+            grid.append(row)
+            sources.append(row_sources)
+
+            # Pressure altitude from field elevation and QNH; temperature from the METAR, else ISA
+            qnh = (metar.get("altimeter") or {}).get("qnh_hpa")
+            pa.append(float(pressure_altitude_ft(elevations[s], qnh)))
+            temp = (metar.get("temperature") or {}).get("temp_c")
+            oat.append(temp if temp is not None else 15 - 2.0 * pa[-1] / 1000.0)
+
+        started = time.perf_counter()
+        arrays = dm.condition_arrays(grid)
+        result = dm.decision_matrix(
+            arrays["wind_dir_deg"], arrays["wind_speed_kt"], arrays["gust_kt"],
+            arrays["visibility_km"], arrays["ceiling_ft"],
+            np.array(oat)[:, None], np.array(pa)[:, None],
+            dm.runway_array(runways),
+            max_xwind_kt=req.max_xwind_kt,
+        )
+        best = dm.best_runways(result)
+        compute_ms = (time.perf_counter() - started) * 1000
+
+        stations = []
+        for s in range(len(icaos)):
+            periods = []
+            for t, when in enumerate(times):
+                gust = arrays["gust_kt"][s, t]
+                periods.append({
+                    "time": when.isoformat(),
+                    "source": sources[s][t],
+                    "category": dm.category_name(int(result["category"][s, t])),
+                    "density_altitude_ft": int(result["density_altitude_ft"][s, t]),
+                    "best_runway_deg": runways[s][int(best[s, t])] if best[s, t] >= 0 else None,
+                    "runways": [
+                        {
+                            "runway": idents[s][r],
+                            "runway_deg": rwy,
+                            "decision": dm.decision_name(int(result["decision"][s, r, t])),
+                            **{key: _finite(result[key][s, r, t])
+                               for key in ("headwind_kt", "crosswind_kt", "gust_crosswind_kt", "tailwind_kt")},
+                            "considerations": dm.considerations(result, s, r, t, None if np.isnan(gust) else float(gust)),
+                        }
+                        for r, rwy in enumerate(runways[s])
+                    ],
+                })
+            stations.append({
+                "icao": icaos[s],
+                "provider": providers[s],
+                "elevation_ft": elevations[s],
+                "pressure_alt_ft": round(pa[s]),
+                "oat_c": oat[s],
+                "periods": periods,
+            })
+
+        decisions = result["decision"][result["decision"] >= 0]
+        return {
+            "stations": stations,
+            "cells": int(decisions.size),
+            "summary": {name: int((decisions == code).sum()) for code, name in enumerate(dm.DECISIONS)},
+            "max_xwind_kt": result["max_xwind_kt"],
+            "compute_ms": round(compute_ms, 3),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Decision matrix failed: {str(e)}")
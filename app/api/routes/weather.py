@@ -1,50 +1,90 @@
-from fastapi import APIRouter, HTTPException
-from app.api.schemas import WeatherRequest, WeatherResponse, WeatherAnalysisRequest, WeatherAnalysisResponse
-from app.services.weather import get_taf_metar, get_taf_metar_decoded, get_minute
-from app.services.llm_client import chat_completion
+from typing import Dict, List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.api.schemas import (WeatherRequest, WeatherResponse, WeatherAnalysisRequest, WeatherAnalysisResponse,
+                             BulkWeatherRequest, BulkWeatherResponse, BulkWeatherStation)
+from app.services.weather import get_taf_metar, get_taf_metar_decoded, get_taf_metar_many, decode_weather, get_minute
+from app.services.weather.cache import get_weather_cache
+from app.services.weather.manager import weather_manager
+from app.services.weather.prefetch import get_prefetch_scheduler
+from app.services.llm_client import chat_completion_async, stream_chat_completion, LLMTimeoutError
+from app.utils.sse import sse_event, SSE_HEADERS
+from app.core.config import settings
 
 router = APIRouter()
 
 @router.get("/weather/providers")
 async def get_weather_providers():
-    """Get information about configured weather providers"""
-    from app.core.config import settings
-    providers = []
-    
-    # Check CheckWX (via MetServiceProvider)
-    if settings.CHECKWX_API_KEY:
-        providers.append("CheckWX: configured")
-    else:
-        providers.append("CheckWX: not configured")
-    
-    # MET Norway is always available
-    providers.append("MET Norway: available (free)")
-    
+    """Configured weather providers with live health, latency and circuit-breaker state"""
+    providers = weather_manager.get_provider_info()
     return {
         "providers": providers,
-        "count": len(providers)
+        "count": len(providers),
+        **weather_manager.get_provider_health(),
     }
 
+@router.get("/weather/cache")
+async def get_weather_cache_stats():
+    """Weather cache hit counters, per-station freshness and watch-list prefetch status"""
+    cache = get_weather_cache()
+    if cache is None:
+        return {"enabled": False}
+    prefetch = get_prefetch_scheduler()
+    return {"enabled": True, **cache.stats(), "prefetch": prefetch.status() if prefetch is not None else None}
+
 @router.post("/weather", response_model=WeatherResponse)
 async def get_weather(req: WeatherRequest):
     """Get current weather data (METAR/TAF) for an airport"""
     try:
         result = await get_taf_metar(req.icao)
         
-        # Determine which provider was used based on data availability
-        provider_name = "CheckWX" if (result.metar_raw or result.taf_raw) else "MET Norway"
-        
         return WeatherResponse(
             icao=result.icao,
             metar=result.metar_raw if result.metar_raw else None,
             taf=result.taf_raw if result.taf_raw else None,
-            provider=provider_name,
+            provider=result.provider or "none",
             success=bool(result.metar_raw or result.taf_raw),
             error=None if (result.metar_raw or result.taf_raw) else "No weather data available"
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/weather/bulk", response_model=BulkWeatherResponse)
+async def get_weather_bulk(req: BulkWeatherRequest):
+    """METAR/TAF for many airfields at once, with per-station errors"""
+    icaos = list(dict.fromkeys(i.strip().upper() for i in req.icaos if i.strip()))
+    bad = [i for i in icaos if not (3 <= len(i) <= 4 and i.isalnum())]
+    if bad:
+        raise HTTPException(status_code=422, detail=f"Invalid ICAO codes: {', '.join(bad)}")
+    if len(icaos) > settings.WEATHER_BULK_MAX_STATIONS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.WEATHER_BULK_MAX_STATIONS} stations per request")
+    try:
+        found = await get_taf_metar_many(icaos)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    results = []
+    for icao in icaos:
+        weather = found.get(icao)
+        if isinstance(weather, Exception) or weather is None:
+            results.append(BulkWeatherStation(icao=icao, success=False, error=str(weather) if weather is not None else "Fetch failed"))
+            continue
+        success = bool(weather.metar_raw or weather.taf_raw)
+        station = BulkWeatherStation(
+            icao=icao,
+            provider=weather.provider,
+            metar=weather.metar_raw or None,
+            taf=weather.taf_raw or None,
+            success=success,
+            error=None if success else "No weather data available",
+        )
+        if req.decoded and success:
+            decoded = decode_weather(weather)
+            station.metar_decoded = decoded["metar_decoded"] or None
+            station.taf_decoded = decoded["taf_decoded"] or None
+        results.append(station)
+    return BulkWeatherResponse(count=len(results), succeeded=sum(r.success for r in results), results=results)
+
 @router.post("/weather/decoded")
 async def get_weather_decoded(req: WeatherRequest):
     """Get weather data with decoded METAR/TAF information"""
@@ -54,55 +94,50 @@ async def get_weather_decoded(req: WeatherRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/weather/analyze", response_model=WeatherAnalysisResponse)
-async def analyze_weather(req: WeatherAnalysisRequest):
-    """Get weather data and AI analysis for aviation decision making"""
-    try:
-        # Get decoded weather data for better analysis
-        decoded_weather = await get_taf_metar_decoded(req.icao)
-        
-        # Create weather response
-        weather_response = WeatherResponse(
-            icao=decoded_weather["icao"],
-            metar=decoded_weather["metar_raw"] if decoded_weather["metar_raw"] else None,
-            taf=decoded_weather["taf_raw"] if decoded_weather["taf_raw"] else None,
-            provider="Weather Service",
-            success=bool(decoded_weather["metar_raw"] or decoded_weather["taf_raw"]),
-            error=None if (decoded_weather["metar_raw"] or decoded_weather["taf_raw"]) else "No weather data available"
-        )
-        
-        # Prepare enhanced weather context for AI analysis
-        weather_context = ""
-        if decoded_weather["metar_raw"]:
-            weather_context += f"METAR: {decoded_weather['metar_raw']}\n"
-            # Add decoded METAR data for better analysis
-            metar_data = decoded_weather["metar_decoded"]
-            if metar_data and "flight_rules" in metar_data:
-                weather_context += f"Flight Rules: {metar_data['flight_rules']}\n"
-            if metar_data and "wind" in metar_data:
-                wind = metar_data["wind"]
-                if wind.get("dir_deg") and wind.get("speed_kt"):
-                    weather_context += f"Wind: {wind['dir_deg']}° at {wind['speed_kt']} kt"
-                    if wind.get("gust_kt"):
-                        weather_context += f" (gusts {wind['gust_kt']} kt)"
-                    weather_context += "\n"
-            if metar_data and "visibility_km" in metar_data:
-                weather_context += f"Visibility: {metar_data['visibility_km']} km\n"
-            if metar_data and "ceiling_ft" in metar_data:
-                weather_context += f"Ceiling: {metar_data['ceiling_ft']} ft\n"
-        
-        if decoded_weather["taf_raw"]:
-            weather_context += f"TAF: {decoded_weather['taf_raw']}\n"
-            # Add TAF summary if available
-            taf_data = decoded_weather["taf_decoded"]
-            if taf_data and "summary" in taf_data:
-                weather_context += f"TAF Summary: {taf_data['summary']}\n"
-        
-        if not weather_context:
-            weather_context = "No current weather data available for this airport."
-        
-        # Create AI analysis prompt
-        analysis_prompt = f"""
+def _weather_response(decoded_weather: dict) -> WeatherResponse:
+    return WeatherResponse(
+        icao=decoded_weather["icao"],
+        metar=decoded_weather["metar_raw"] if decoded_weather["metar_raw"] else None,
+        taf=decoded_weather["taf_raw"] if decoded_weather["taf_raw"] else None,
+        provider=decoded_weather.get("provider") or "Weather Service",
+        success=bool(decoded_weather["metar_raw"] or decoded_weather["taf_raw"]),
+        error=None if (decoded_weather["metar_raw"] or decoded_weather["taf_raw"]) else "No weather data available"
+    )
+
+def _analysis_messages(req: WeatherAnalysisRequest, decoded_weather: dict) -> List[Dict[str, str]]:
+    """Prompt for the AI weather analysis, built from the deterministic decode"""
+    # Prepare enhanced weather context for AI analysis
+    weather_context = ""
+    if decoded_weather["metar_raw"]:
+        weather_context += f"METAR: {decoded_weather['metar_raw']}\n"
+        # Add decoded METAR data for better analysis
+        metar_data = decoded_weather["metar_decoded"]
+        if metar_data and "flight_rules" in metar_data:
+            weather_context += f"Flight Rules: {metar_data['flight_rules']}\n"
+        if metar_data and "wind" in metar_data:
+            wind = metar_data["wind"]
+            if wind.get("dir_deg") and wind.get("speed_kt"):
+                weather_context += f"Wind: {wind['dir_deg']}° at {wind['speed_kt']} kt"
+                if wind.get("gust_kt"):
+                    weather_context += f" (gusts {wind['gust_kt']} kt)"
+                weather_context += "\n"
+        if metar_data and "visibility_km" in metar_data:
+            weather_context += f"Visibility: {metar_data['visibility_km']} km\n"
+        if metar_data and "ceiling_ft" in metar_data:
+            weather_context += f"Ceiling: {metar_data['ceiling_ft']} ft\n"
+    
+    if decoded_weather["taf_raw"]:
+        weather_context += f"TAF: {decoded_weather['taf_raw']}\n"
+        # Add TAF summary if available
+        taf_data = decoded_weather["taf_decoded"]
+        if taf_data and "summary" in taf_data:
+            weather_context += f"TAF Summary: {taf_data['summary']}\n"
+    
+    if not weather_context:
+        weather_context = "No current weather data available for this airport."
+    
+    # Create AI analysis prompt
+    analysis_prompt = f"""
 You are an aviation weather expert. Analyze the following weather data and provide guidance for T-6II flight operations.
 
 Weather Data for {req.icao}:
@@ -118,14 +153,22 @@ Please provide:
 
 Be concise but thorough in your analysis.
 """
+    
+    return [
+        {"role": "system", "content": "You are an expert aviation weather analyst specializing in T-6II operations."},
+        {"role": "user", "content": analysis_prompt}
+    ]
+
+@router.post("/weather/analyze", response_model=WeatherAnalysisResponse)
+async def analyze_weather(req: WeatherAnalysisRequest):
+    """Get weather data and AI analysis for aviation decision making"""
+    try:
+        # Get decoded weather data for better analysis
+        decoded_weather = await get_taf_metar_decoded(req.icao)
+        weather_response = _weather_response(decoded_weather)
         
         # Get AI analysis
-        messages = [
-            {"role": "system", "content": "You are an expert aviation weather analyst specializing in T-6II operations."},
-            {"role": "user", "content": analysis_prompt}
-        ]
-        
-        analysis = chat_completion(messages)
+        analysis = await chat_completion_async(_analysis_messages(req, decoded_weather))
         
         # Extract recommendation (first part of analysis)
         recommendation = analysis.split('\n')[0] if analysis else "Unable to analyze weather data"
@@ -137,5 +180,49 @@ Be concise but thorough in your analysis.
             recommendation=recommendation
         )
         
+    except LLMTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/weather/analyze/stream")
+async def analyze_weather_stream(req: WeatherAnalysisRequest, request: Request):
+    """/weather/analyze as Server-Sent Events.
+
+    The `weather` event (raw and decoded METAR/TAF) is sent as soon as the
+    providers answer; the AI analysis follows as `token` events, then
+    `done` (with the recommendation line) or `error`.
+    """
+    try:
+        decoded_weather = await get_taf_metar_decoded(req.icao)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        yield sse_event("weather", {
+            "weather_data": _weather_response(decoded_weather).model_dump(),
+            "metar_decoded": decoded_weather.get("metar_decoded"),
+            "taf_decoded": decoded_weather.get("taf_decoded"),
+        })
+        parts = []
+        tokens = stream_chat_completion(_analysis_messages(req, decoded_weather))
+        try:
+            async for text in tokens:
+                if await request.is_disconnected():
+                    return  # finally closes the upstream stream
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        except LLMTimeoutError as e:
+            yield sse_event("error", {"status": 504, "detail": str(e)})
+            return
+        except Exception as e:
+            yield sse_event("error", {"status": 500, "detail": str(e)})
+            return
+        finally:
+            await tokens.aclose()
+        
+        analysis = "".join(parts).strip()
+        recommendation = analysis.split('\n')[0] if analysis else "Unable to analyze weather data"
+        yield sse_event("done", {"icao": req.icao, "recommendation": recommendation})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -1,12 +1,16 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 
 class AskRequest(BaseModel):
     question: str = Field(..., min_length=3, max_length=2000)
+    retrieval_mode: Optional[Literal["dense", "lexical", "hybrid"]] = Field(
+        None, description="dense (embeddings), lexical (BM25, no embedding call) or hybrid; defaults to RETRIEVAL_MODE"
+    )
 
 class AskResponse(BaseModel):
     answer: str
+    cache: Optional[str] = Field(None, description="exact or semantic when the answer came from the answer cache")
 
 class WeatherRequest(BaseModel):
     icao: str = Field(..., min_length=3, max_length=4, description="ICAO airport code (e.g., NZAA, KLAX)")
@@ -19,6 +23,37 @@ class WeatherResponse(BaseModel):
     success: bool
     error: Optional[str] = None
 
+class BulkWeatherRequest(BaseModel):
+    icaos: List[str] = Field(..., min_length=1, description="ICAO airport codes, e.g. [\"NZAA\", \"NZWN\"]")
+    decoded: bool = Field(True, description="Include decoded METAR/TAF per station")
+
+class BulkWeatherStation(BaseModel):
+    icao: str
+    provider: Optional[str] = None
+    metar: Optional[str] = None
+    taf: Optional[str] = None
+    metar_decoded: Optional[Dict] = None
+    taf_decoded: Optional[Dict] = None
+    success: bool
+    error: Optional[str] = None
+
+class BulkWeatherResponse(BaseModel):
+    count: int
+    succeeded: int
+    results: List[BulkWeatherStation]
+
+class DecisionMatrixStation(BaseModel):
+    icao: str = Field(..., min_length=4, max_length=4)
+    runways: Optional[List[float]] = Field(None, min_length=1, description="Runway headings (true), e.g. [30, 210]; default from the airfield database")
+    elevation_ft: Optional[float] = Field(None, description="Field elevation; default from the airfield database, else 0. Pressure altitude uses the METAR QNH")
+
+class DecisionMatrixRequest(BaseModel):
+    stations: List[DecisionMatrixStation] = Field(..., min_length=1)
+    start: Optional[datetime] = Field(None, description="First period (UTC); default is now, using the METAR")
+    hours: int = Field(0, ge=0, le=30, description="Also evaluate each hour after start from the TAF")
+    forecast: Literal["worst", "prevailing"] = Field("worst", description="TAF conditions: worst case incl. TEMPO/PROB, or prevailing")
+    max_xwind_kt: Optional[float] = Field(None, description="Crosswind limit; default T6_MAX_XWIND_KT or 15 kt")
+
 class WeatherAnalysisRequest(BaseModel):
     icao: str = Field(..., min_length=3, max_length=4)
     question: str = Field(..., min_length=3, max_length=500)
@@ -19,7 +19,58 @@ class Settings:
     REQUEST_MAX_OUTPUT_TOKENS: int = int(os.getenv("REQUEST_MAX_OUTPUT_TOKENS", "600"))
     
     REQUEST_TIMEOUT_SECONDS: int = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
-    
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # concurrent Gemini calls per worker
+
+    # Embeddings (EMBED_BASE_URL switches to a plain JSON server, e.g. app/scripts/stub_embed_server.py)
+    EMBED_MODEL: str = os.getenv("EMBED_MODEL", "text-embedding-004")
+    EMBED_BASE_URL: str = os.getenv("EMBED_BASE_URL", "")
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "100"))  # Gemini batchEmbedContents accepts up to 100
+    EMBED_MAX_IN_FLIGHT: int = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
+    EMBED_REQUESTS_PER_MINUTE: float = float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "300"))
+    EMBED_MAX_RETRIES: int = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+    EMBED_MAX_THROTTLES: int = int(os.getenv("EMBED_MAX_THROTTLES", "8"))  # 429s per batch before it fails
+    EMBED_CACHE_PATH: str = os.getenv("EMBED_CACHE_PATH", "artifacts/embed_cache.sqlite")  # empty disables the cache
+
+    # Retriever index bundle (see app/services/index_store.py)
+    INDEX_DIR: str = os.getenv("INDEX_DIR", "artifacts/index")
+    INDEX_VERIFY_CHECKSUMS: bool = os.getenv("INDEX_VERIFY_CHECKSUMS", "false").lower() == "true"
+    INDEX_RELOAD_CHECK_SECONDS: float = float(os.getenv("INDEX_RELOAD_CHECK_SECONDS", "30"))
+    INDEX_TYPE: str = os.getenv("INDEX_TYPE", "flat")  # flat | ivf_flat | ivf_pq | hnsw (used by build scripts)
+    INDEX_NPROBE: int = int(os.getenv("INDEX_NPROBE", "0"))  # 0 keeps the value recorded in the bundle
+    INDEX_EF_SEARCH: int = int(os.getenv("INDEX_EF_SEARCH", "0"))
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")  # dense | lexical | hybrid
+    # Coarse-to-fine dense search (app/services/hierarchy.py): score section centroids, then only the
+    # chunks of the HIER_FAN_OUT best sections. Opt-in (0 disables); only for bundles with at least
+    # HIER_MIN_CHUNKS chunks and no ANN index. Approximate: can miss chunks exact search finds
+    HIER_FAN_OUT: int = int(os.getenv("HIER_FAN_OUT", "0"))
+    HIER_MIN_CHUNKS: int = int(os.getenv("HIER_MIN_CHUNKS", "20000"))
+    HIER_GROUP_MAX_CHUNKS: int = int(os.getenv("HIER_GROUP_MAX_CHUNKS", "64"))  # build time: larger sections are split
+    HIER_PAGE_GROUP: int = int(os.getenv("HIER_PAGE_GROUP", "10"))  # build time: pages per group for chunks without a section
+
+    # PDF extraction (app/services/pdf_extract.py): page shards on a process pool, resumable
+    PDF_EXTRACT_DIR: str = os.getenv("PDF_EXTRACT_DIR", "artifacts/extract")
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))  # 0 = one per CPU
+    PDF_SHARD_PAGES: int = int(os.getenv("PDF_SHARD_PAGES", "50"))
+    # Extracted pages (app/services/page_store.py): one zstd Parquet file per document
+    PAGE_STORE_DIR: str = os.getenv("PAGE_STORE_DIR", "data/processed/pages")
+    PAGE_STORE_ROW_GROUP_PAGES: int = int(os.getenv("PAGE_STORE_ROW_GROUP_PAGES", "64"))
+    # Chunking (app/services/chunker.py): header/footer lines recurring on this many pages are stripped;
+    # chunks whose estimated Jaccard similarity to an earlier one reaches the threshold are dropped (0 disables)
+    BOILERPLATE_MIN_PAGES: int = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))
+    BOILERPLATE_LOOKAHEAD_PAGES: int = int(os.getenv("BOILERPLATE_LOOKAHEAD_PAGES", "64"))  # while a PDF is still being extracted
+    CHUNK_DEDUP_THRESHOLD: float = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.85"))
+    # Streaming index build (app/services/pipeline.py): queue depth in batches per stage boundary
+    PIPELINE_WORK_DIR: str = os.getenv("PIPELINE_WORK_DIR", "artifacts/pipeline")
+    PIPELINE_QUEUE_DEPTH: int = int(os.getenv("PIPELINE_QUEUE_DEPTH", "4"))
+    PIPELINE_EMBED_BATCH: int = int(os.getenv("PIPELINE_EMBED_BATCH", "0"))  # 0 = EMBED_BATCH_SIZE x EMBED_MAX_IN_FLIGHT
+
+    # /ask answer cache (exact + semantic); empty ANSWER_CACHE_PATH keeps it in memory only
+    ANSWER_CACHE_ENABLED: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    ANSWER_CACHE_TTL_SECONDS: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+    ANSWER_CACHE_SIMILARITY: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+    ANSWER_CACHE_PATH: str = os.getenv("ANSWER_CACHE_PATH", "artifacts/answer_cache.sqlite")
+
     # Weather Services
     METSERVICE_BASE_URL: str = os.getenv("METSERVICE_BASE_URL", "")
     METSERVICE_API_KEY: str = os.getenv("METSERVICE_API_KEY", "")
@@ -32,12 +83,52 @@ class Settings:
     # MET Norway fallback
     METNO_USER_AGENT: str = os.getenv("METNO_USER_AGENT", "AviaGenAI/0.1 (contact: you@example.com)")
     
+    # Shared outbound HTTP client (app/services/http_client.py) and per-provider caps
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+    HTTP_KEEPALIVE_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "20"))
+    CHECKWX_MAX_CONNECTIONS: int = int(os.getenv("CHECKWX_MAX_CONNECTIONS", "10"))
+    CHECKWX_TIMEOUT_SECONDS: float = float(os.getenv("CHECKWX_TIMEOUT_SECONDS", "20"))
+    METNO_MAX_CONNECTIONS: int = int(os.getenv("METNO_MAX_CONNECTIONS", "10"))
+    METNO_TIMEOUT_SECONDS: float = float(os.getenv("METNO_TIMEOUT_SECONDS", "20"))
+    CHECKWX_BULK_MAX_STATIONS: int = int(os.getenv("CHECKWX_BULK_MAX_STATIONS", "20"))  # stations per multi-station call
+    WEATHER_BULK_CONCURRENCY: int = int(os.getenv("WEATHER_BULK_CONCURRENCY", "8"))  # fan-out for single-station providers
+    WEATHER_BULK_MAX_STATIONS: int = int(os.getenv("WEATHER_BULK_MAX_STATIONS", "50"))  # per /weather/bulk request
+    
+    # METAR/TAF cache (app/services/weather/cache.py); TTL follows the report's own issue cycle
+    WEATHER_CACHE_ENABLED: bool = os.getenv("WEATHER_CACHE_ENABLED", "true").lower() == "true"
+    WEATHER_CACHE_PATH: str = os.getenv("WEATHER_CACHE_PATH", "artifacts/weather_cache.sqlite")  # empty = memory only
+    WEATHER_METAR_INTERVAL_MINUTES: int = int(os.getenv("WEATHER_METAR_INTERVAL_MINUTES", "60"))  # 30 at half-hourly fields
+    WEATHER_TAF_INTERVAL_HOURS: int = int(os.getenv("WEATHER_TAF_INTERVAL_HOURS", "6"))
+    WEATHER_PUBLISH_DELAY_SECONDS: float = float(os.getenv("WEATHER_PUBLISH_DELAY_SECONDS", "300"))
+    WEATHER_CACHE_MIN_TTL_SECONDS: float = float(os.getenv("WEATHER_CACHE_MIN_TTL_SECONDS", "60"))
+    WEATHER_CACHE_MAX_TTL_SECONDS: float = float(os.getenv("WEATHER_CACHE_MAX_TTL_SECONDS", "1800"))  # bounds SPECI lag
+    WEATHER_CACHE_STALE_SECONDS: float = float(os.getenv("WEATHER_CACHE_STALE_SECONDS", "1800"))
+    
+    # Background prefetch of watched airfields (comma-separated ICAOs; empty disables it)
+    WEATHER_WATCHLIST: str = os.getenv("WEATHER_WATCHLIST", "")
+    WEATHER_PREFETCH_JITTER_SECONDS: float = float(os.getenv("WEATHER_PREFETCH_JITTER_SECONDS", "60"))
+    WEATHER_PREFETCH_STATIONS_PER_MINUTE: float = float(os.getenv("WEATHER_PREFETCH_STATIONS_PER_MINUTE", "30"))
+    
+    # Provider health, circuit breakers and hedging (app/services/weather/manager.py)
+    WEATHER_HEALTH_WINDOW: int = int(os.getenv("WEATHER_HEALTH_WINDOW", "50"))  # recent requests per provider
+    WEATHER_BREAKER_FAILURES: int = int(os.getenv("WEATHER_BREAKER_FAILURES", "3"))
+    WEATHER_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("WEATHER_BREAKER_COOLDOWN_SECONDS", "60"))
+    WEATHER_HEDGE_ENABLED: bool = os.getenv("WEATHER_HEDGE_ENABLED", "true").lower() == "true"
+    WEATHER_HEDGE_PERCENTILE: float = float(os.getenv("WEATHER_HEDGE_PERCENTILE", "95"))
+    WEATHER_HEDGE_MIN_DELAY_MS: float = float(os.getenv("WEATHER_HEDGE_MIN_DELAY_MS", "250"))
+    WEATHER_HEDGE_MAX_DELAY_MS: float = float(os.getenv("WEATHER_HEDGE_MAX_DELAY_MS", "3000"))
+    
     # Decision engine defaults (tune to your authority/corresponding AIP)
     VFR_MIN_VIS_KM: float = float(os.getenv("VFR_MIN_VIS_KM", "5"))
     VFR_MIN_CEILING_FT: int = int(os.getenv("VFR_MIN_CEILING_FT", "3000"))
     MVFR_MIN_VIS_KM: float = float(os.getenv("MVFR_MIN_VIS_KM", "5"))
     MVFR_MIN_CEILING_FT: int = int(os.getenv("MVFR_MIN_CEILING_FT", "1000"))
     T6_MAX_XWIND_KT: str = os.getenv("T6_MAX_XWIND_KT", "")  # Optional T-6 specific limit
+    AIRFIELDS_PATH: str = os.getenv("AIRFIELDS_PATH", "app/data/airfields.yaml")  # runways/elevations (app/services/airfields.py)
+    PERFORMANCE_DATA_PATH: str = os.getenv("PERFORMANCE_DATA_PATH", "app/data/t6_performance.yaml")  # takeoff/landing grids
+    ROUTE_MAX_STATIONS: int = int(os.getenv("ROUTE_MAX_STATIONS", "100"))  # corridor stations fetched per /analyze/route
     
     # Azure OpenAI (Alternative)
     AZURE_OPENAI_ENDPOINT: str = os.getenv("AZURE_OPENAI_ENDPOINT", "")
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.routes.ask import router as ask_router
 from app.api.routes.weather import router as weather_router
@@ -6,11 +7,25 @@ from app.api.routes.aviation import router as aviation_router
 from app.api.routes.analyze import router as analyze_router
 from app.api.routes.checklists import router as checklists_router
 from app.api.routes.briefing import router as briefing_router
+from app.services.http_client import get_http_client, close_http_client
+from app.services.weather.prefetch import get_prefetch_scheduler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()  # open the shared weather connection pool up front
+    prefetch = get_prefetch_scheduler()
+    if prefetch is not None:
+        prefetch.start()
+    yield
+    if prefetch is not None:
+        await prefetch.stop()
+    await close_http_client()
 
 app = FastAPI(
     title="AviaGenAI",
     description="Aviation Technical Assistant with T-6II Knowledge Base, Weather Services, and Pre-Flight Briefing System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.get("/")
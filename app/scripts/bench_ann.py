@@ -0,0 +1,84 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.ann import INDEX_TYPES, build_ann_index, index_bytes
+from app.services.retrieve import Retriever
+
+def synthetic_corpus(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embedding geometry than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    x = centers[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+def make_queries(xb: np.ndarray, n_queries: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    q = xb[rng.integers(0, xb.shape[0], n_queries)] + 0.1 * rng.standard_normal((n_queries, xb.shape[1])).astype("float32")
+    faiss.normalize_L2(q)
+    return q
+
+def exact_topk(xb: np.ndarray, xq: np.ndarray, k: int) -> np.ndarray:
+    scores = xq @ xb.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def bench(xb: np.ndarray, xq: np.ndarray, k: int, label: str):
+    k = min(k, xb.shape[0])
+    truth = exact_topk(xb, xq, k)
+    print(f"\n📊 {label}: {xb.shape[0]} vectors x {xb.shape[1]} dims, {xq.shape[0]} queries, k={k}")
+    print(f"{'index':<10}{'build s':>9}{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}{'MB':>9}  params")
+    for index_type in INDEX_TYPES:
+        started = time.perf_counter()
+        index, params = build_ann_index(xb, index_type)
+        build_s = time.perf_counter() - started
+        if index_type != "flat" and index is None:
+            continue
+
+        latencies, found = [], []
+        threads = faiss.omp_get_max_threads()
+        faiss.omp_set_num_threads(1)  # single-query latency, as in the API
+        for q in xq:
+            q = q[None, :]
+            t0 = time.perf_counter()
+            if index is None:
+                scores = xb @ q[0]
+                ids = np.argpartition(-scores, k - 1)[:k]
+            else:
+                _, ids = index.search(q, k)
+                ids = ids[0]
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found.append(ids)
+        faiss.omp_set_num_threads(threads)
+        recall = np.mean([len(set(f.tolist()) & set(t.tolist())) / k for f, t in zip(found, truth)])
+        p50, p99 = np.percentile(latencies, [50, 99])
+        mb = index_bytes(index, xb) / 1e6
+        print(f"{index_type:<10}{build_s:>9.2f}{recall:>10.3f}{p50:>9.3f}{p99:>9.3f}{mb:>9.1f}  {params}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency vs memory of the retriever's ANN index types")
+    parser.add_argument("--n", type=int, default=50000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--real", action="store_true", help=f"also benchmark the vectors in {settings.INDEX_DIR}")
+    args = parser.parse_args()
+
+    xb = synthetic_corpus(args.n, args.dim)
+    bench(xb, make_queries(xb, args.queries), args.k, "synthetic")
+
+    if args.real:
+        r = Retriever.load(settings.INDEX_DIR)
+        xb = np.asarray(r.vectors)
+        bench(xb, make_queries(xb, args.queries), args.k, f"index {r.version}")
+
+if __name__ == "__main__":
+    main()
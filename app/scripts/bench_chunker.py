@@ -0,0 +1,81 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pyarrow as pa
+
+from app.core.config import settings
+from app.services.chunker import Boilerplate, NearDuplicateFilter, structured_chunks
+from app.services.page_store import get_page_store
+from app.services.retrieve import Retriever
+from app.utils.text import chunk_pages
+
+def _bundle_bytes(texts, dim: int) -> int:
+    """Size of an index bundle (vectors + meta + BM25) over texts, with stand-in vectors"""
+    r = Retriever()
+    vecs = np.random.default_rng(0).standard_normal((len(texts), dim)).astype("float32")
+    r.vectors = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    r.meta = pa.table({"chunk_id": [f"c{i}" for i in range(len(texts))], "chunk_text": texts})
+    with tempfile.TemporaryDirectory() as root:
+        version = r.save(root)
+        return sum(p.stat().st_size for p in (Path(root) / version).rglob("*") if p.is_file())
+
+def bench_chunker(doc_id: str, max_chars: int = 2000, overlap: int = 200, repeat: int = 5, dim: int = 768):
+    """Fixed windows vs structure-aware chunking at the same size and overlap: MB/s, chunks and index size"""
+    pages = list(get_page_store().iter_pages(doc_id))
+    if not pages:
+        print(f"❌ {doc_id} is not in the page store ({settings.PAGE_STORE_DIR})")
+        return
+    mb = sum(len((p["text"] or "").encode("utf-8")) for p in pages) / 1e6
+    print(f"⏱️ {doc_id}: {len(pages)} pages, {mb:.2f} MB of page text, {max_chars}-char chunks, "
+          f"{overlap}-char overlap, best of {repeat} runs\n")
+
+    def fixed():
+        return [c["text"] for c in chunk_pages(pages, max_chars, overlap)]
+
+    def structured(dedup: bool):
+        def run():
+            boilerplate = Boilerplate(min_pages=settings.BOILERPLATE_MIN_PAGES).fit(pages)
+            chunks = [c["text"] for c in structured_chunks(pages, max_chars, overlap, boilerplate, run.stats)]
+            if dedup:
+                f = NearDuplicateFilter(settings.CHUNK_DEDUP_THRESHOLD)
+                chunks = [c for c in chunks if not f.is_duplicate(c)]
+            return chunks
+        run.stats = {}
+        return run
+
+    results = []
+    for name, fn in (("fixed windows (old)", fixed), ("structure-aware", structured(False)),
+                     ("structure-aware + MinHash dedup", structured(True))):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            chunks = fn()
+            best = min(best, time.perf_counter() - started)
+        results.append((name, chunks, best, getattr(fn, "stats", {})))
+
+    base_chunks, base_bytes = len(results[0][1]), _bundle_bytes(results[0][1], dim)
+    print(f"{'chunker':<34} {'MB/s':>7} {'chunks':>7} {'vs old':>8} {'text chars':>11} {'index bytes':>12} {'vs old':>8}")
+    for name, chunks, seconds, stats in results:
+        size = _bundle_bytes(chunks, dim)
+        print(f"{name:<34} {mb / seconds:7.1f} {len(chunks):7d} {(len(chunks) - base_chunks) / base_chunks:+8.1%} "
+              f"{sum(map(len, chunks)):11,d} {size:12,d} "
+              f"{(size - base_bytes) / base_bytes:+8.1%}")
+    stats = results[1][3]
+    print(f"\nBoilerplate lines stripped: {stats.get('boilerplate_lines', 0) // repeat}; "
+          f"near-duplicates dropped: {len(results[1][1]) - len(results[2][1])}; "
+          f"chunk count {len(results[2][1]) - base_chunks:+d} vs the old chunker")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the chunkers on a document in the page store")
+    parser.add_argument("doc_id", nargs="?", default="t6_flight_training_v1")
+    parser.add_argument("--max-chars", type=int, default=2000)
+    parser.add_argument("--overlap", type=int, default=200, help="overlap for both chunkers (the build default)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension for the index size estimate")
+    args = parser.parse_args()
+    bench_chunker(args.doc_id, args.max_chars, args.overlap, args.repeat, args.dim)
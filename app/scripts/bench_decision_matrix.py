@@ -0,0 +1,82 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+
+from app.services.decision_engine import analyze_weather
+from app.services.decision_matrix import decision_matrix, runway_array
+
+def random_inputs(stations: int, runways: int, periods: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    shape = (stations, periods)
+    inputs = {
+        "wind_dir_deg": rng.integers(0, 36, shape) * 10.0,
+        "wind_speed_kt": rng.integers(0, 30, shape).astype(float),
+        "gust_kt": np.where(rng.random(shape) < 0.2, rng.integers(20, 40, shape), np.nan),
+        "visibility_km": rng.choice([0.8, 3.0, 6.0, 10.0], shape),
+        "ceiling_ft": np.where(rng.random(shape) < 0.4, np.nan, rng.integers(2, 60, shape) * 100.0),
+        "oat_c": rng.integers(-10, 35, (stations, 1)).astype(float),
+        "pressure_alt_ft": rng.integers(0, 6000, (stations, 1)).astype(float),
+    }
+    first = rng.integers(1, 18, (stations, 1)) * 10.0
+    headings = [first + 180, first, first + 90, first + 270][:runways]
+    inputs["runway_deg"] = runway_array(np.hstack(headings).tolist())
+    return inputs
+
+def scalar_loop(x):
+    """One analyze_weather call per cell, as the endpoints used to do"""
+    stations, periods = x["wind_speed_kt"].shape
+    out = []
+    for s in range(stations):
+        for r in range(x["runway_deg"].shape[1]):
+            for t in range(periods):
+                ceiling = x["ceiling_ft"][s, t]
+                metar = {
+                    "wind": {"dir_deg": x["wind_dir_deg"][s, t], "speed_kt": x["wind_speed_kt"][s, t]},
+                    "visibility_km": x["visibility_km"][s, t],
+                    "ceiling_ft": None if np.isnan(ceiling) else ceiling,
+                    "clouds": [],
+                }
+                out.append(analyze_weather(metar, x["runway_deg"][s, r], x["pressure_alt_ft"][s, 0], x["oat_c"][s, 0]))
+    return out
+
+def best_ms(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Decision matrix: NumPy broadcasting vs analyze_weather per cell")
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--runways", type=int, default=4, choices=[1, 2, 3, 4])
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    x = random_inputs(args.stations, args.runways, args.hours)
+    cells = args.stations * args.runways * args.hours
+    run = lambda: decision_matrix(max_xwind_kt=15.0, **x)
+
+    result = run()
+    loop = scalar_loop(x)
+    # Same categories as classify_vmc, cell for cell
+    expected = np.array([a["category"] for a in loop]).reshape(args.stations, args.runways, args.hours)[:, 0, :]
+    names = np.array(["VFR", "MVFR", "IFR", "LIFR"])[result["category"]]
+    print(f"✅ Categories match analyze_weather: {bool((names == expected).all())}")
+
+    vec_ms = best_ms(run, args.repeats)
+    loop_ms = best_ms(lambda: scalar_loop(x), max(1, args.repeats // 2))
+    print(f"📊 {args.stations} stations x {args.runways} runways x {args.hours} hours = {cells:,} cells")
+    print(f"{'method':<28}{'ms':>10}{'cells/ms':>12}")
+    print(f"{'analyze_weather loop':<28}{loop_ms:>10.2f}{cells / loop_ms:>12,.0f}")
+    print(f"{'decision_matrix (NumPy)':<28}{vec_ms:>10.2f}{cells / vec_ms:>12,.0f}")
+    print(f"🚀 Speedup: {loop_ms / vec_ms:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.core.config import settings
+from app.services.embed import EmbeddingEngine
+
+def bench_embed(n_texts: int = 2000):
+    """Measure embedding throughput (texts/s) of the configured backend"""
+    backend = settings.EMBED_BASE_URL or f"Gemini ({settings.EMBED_MODEL})"
+    print(f"⏱️ Embedding {n_texts} synthetic chunks via {backend}")
+    texts = [f"T-6II procedure step {i}: check PCL IDLE, fuel balance and BINGO state." for i in range(n_texts)]
+
+    for in_flight in (1, settings.EMBED_MAX_IN_FLIGHT):
+        engine = EmbeddingEngine(max_in_flight=in_flight)
+        started = time.perf_counter()
+        vecs = engine.embed(texts, verbose=False)
+        elapsed = time.perf_counter() - started
+        print(f"  in-flight={in_flight:<3} shape={vecs.shape} {elapsed:.2f}s -> {engine.last_stats.summary()}")
+
+if __name__ == "__main__":
+    bench_embed(*(int(a) for a in sys.argv[1:]))
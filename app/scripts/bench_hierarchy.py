@@ -0,0 +1,135 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import faiss
+import numpy as np
+import pyarrow as pa
+
+from app.core.config import settings
+from app.services.ann import build_ann_index
+from app.services.hierarchy import SectionIndex
+from app.services.retrieve import Retriever
+
+def synthetic_manual(n: int, dim: int, section_chunks: int = 20, chapter_sections: int = 20,
+                     chunk_noise: float = 1.0, seed: int = 0):
+    """Chunk vectors of a chapter -> section -> chunk manual, plus page-provenance metadata"""
+    rng = np.random.default_rng(seed)
+    n_sections = -(-n // section_chunks)
+    n_chapters = -(-n_sections // chapter_sections)
+    chapters = rng.standard_normal((n_chapters, dim)).astype("float32")
+    sections = chapters[np.arange(n_sections) // chapter_sections] + rng.standard_normal((n_sections, dim)).astype("float32")
+    section_of = np.arange(n) // section_chunks
+    xb = sections[section_of] + chunk_noise * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(xb)
+    page = (np.arange(n) // 2 + 1).astype("int32")   # ~2 chunks per page
+    meta = pa.table({
+        "doc_id": ["manual"] * n,
+        "section": [f"{s // chapter_sections + 1}{s % chapter_sections:02d}. SECTION" for s in section_of],
+        "page_start": page,
+        "page_end": page,
+    })
+    return xb, meta, section_of
+
+def make_queries(xb: np.ndarray, n_queries: int, noise: float, seed: int = 1):
+    """Queries near random target chunks: cos(query, target) is about 1 / sqrt(1 + noise**2)"""
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(0, xb.shape[0], n_queries)
+    g = rng.standard_normal((n_queries, xb.shape[1])).astype("float32")
+    faiss.normalize_L2(g)
+    q = xb[targets] + noise * g
+    faiss.normalize_L2(q)
+    return q, targets
+
+def flat_search(xb: np.ndarray, q: np.ndarray, k: int) -> np.ndarray:
+    scores = xb @ q
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+def bench(xb: np.ndarray, meta: pa.Table, section_of: np.ndarray, xq: np.ndarray, targets: np.ndarray,
+          k: int, fan_outs, ann_types, label: str):
+    started = time.perf_counter()
+    index = SectionIndex.build(xb, meta, settings.HIER_GROUP_MAX_CHUNKS, settings.HIER_PAGE_GROUP)
+    build_s = time.perf_counter() - started
+    print(f"\n📊 {label}: {xb.shape[0]} chunks x {xb.shape[1]} dims in {len(index)} sections "
+          f"(built in {build_s:.2f}s), {xq.shape[0]} queries, k={k}")
+
+    def section_search(fan_out):
+        def run(q):
+            ids = index.search(xb, q[None, :], k, fan_out)[0][0]
+            return ids[ids >= 0]
+        return run
+
+    def ann_search(ann):
+        def run(q):
+            ids = ann.search(q[None, :], k)[1][0]
+            return ids[ids >= 0]
+        return run
+
+    runs = [("flat", lambda q: flat_search(xb, q, k))]
+    for index_type in ann_types:
+        # The ANN a bundle would be built with (--index-type), at its default parameters
+        started = time.perf_counter()
+        ann, params = build_ann_index(xb, index_type)
+        if ann is not None:
+            print(f"{index_type} {params} built in {time.perf_counter() - started:.1f}s")
+            runs.append((index_type, ann_search(ann)))
+    runs += [(f"fan-out {f}", section_search(f)) for f in fan_outs]
+    print(f"{'search':<14}{'p50 ms':>9}{'p99 ms':>9}{'hit@k':>8}{'MRR':>7}{'same-sec':>10}{'vs flat':>9}")
+
+    threads = faiss.omp_get_max_threads()
+    faiss.omp_set_num_threads(1)   # single-query latency, as in the API
+    flat = []
+    for name, search in runs:
+        latencies, found = [], []
+        for q in xq:
+            t0 = time.perf_counter()
+            ids = search(q)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found.append(ids)
+        if not flat:
+            flat = found
+        hit = np.mean([t in f for f, t in zip(found, targets)])
+        mrr = np.mean([1.0 / (list(f).index(t) + 1) if t in f else 0.0 for f, t in zip(found, targets)])
+        same = np.mean([np.mean(section_of[f] == section_of[t]) if len(f) else 0.0 for f, t in zip(found, targets)])
+        agree = np.mean([len(set(f.tolist()) & set(g.tolist())) / k for f, g in zip(found, flat)])
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{name:<14}{p50:>9.3f}{p99:>9.3f}{hit:>8.3f}{mrr:>7.3f}{same:>10.3f}{agree:>9.3f}")
+    faiss.omp_set_num_threads(threads)
+
+def main():
+    parser = argparse.ArgumentParser(description="Coarse-to-fine (section -> chunk) vs flat dense search")
+    parser.add_argument("--sizes", default="20000,50000,100000", help="comma-separated synthetic corpus sizes")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--fan-out", default="4,8,16", help="comma-separated fan-outs to compare")
+    parser.add_argument("--ann", default="hnsw,ivf_flat", help="comma-separated ANN index types to compare ('' for none)")
+    parser.add_argument("--chunk-noise", type=float, default=2.0, help="spread of chunks around their section topic")
+    parser.add_argument("--query-noise", type=float, default=2.5, help="spread of queries around their target chunk")
+    parser.add_argument("--real", action="store_true", help=f"also benchmark the bundle in {settings.INDEX_DIR}")
+    args = parser.parse_args()
+    fan_outs = [int(f) for f in args.fan_out.split(",")]
+    ann_types = [t for t in args.ann.split(",") if t]
+
+    for n in (int(s) for s in args.sizes.split(",")):
+        xb, meta, section_of = synthetic_manual(n, args.dim, chunk_noise=args.chunk_noise)
+        xq, targets = make_queries(xb, args.queries, args.query_noise)
+        bench(xb, meta, section_of, xq, targets, args.k, fan_outs, ann_types, "synthetic manual")
+        del xb
+
+    if args.real:
+        r = Retriever.load(settings.INDEX_DIR)
+        xb = np.asarray(r.vectors)
+        meta = r.meta
+        index = SectionIndex.build(xb, meta, settings.HIER_GROUP_MAX_CHUNKS, settings.HIER_PAGE_GROUP)
+        section_of = np.empty(xb.shape[0], dtype="int64")
+        for g in range(len(index)):
+            section_of[index.members[index.offsets[g]:index.offsets[g + 1]]] = g
+        xq, targets = make_queries(xb, args.queries, args.query_noise)
+        bench(xb, meta, section_of, xq, targets, min(args.k, xb.shape[0]), fan_outs, ann_types, f"index {r.version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.services.aviation_helpers import wind_components, density_altitude
+from app.services.weather.decoder import _metar_dict, decode_metar, parse_metar, parse_taf
+
+SAMPLES = [
+    "METAR KJFK 121651Z 31015G25KT 280V340 1 1/2SM R04R/2200VP6000FT -RA BR FEW008 BKN015 OVC030CB M02/M05 A2992 RMK AO2 SLP132",
+    "NZAA 121700Z AUTO VRB03KT 9999 NCD 12/09 Q1021 NOSIG",
+    "EGLL 121650Z 24012MPS CAVOK 18/10 Q1009 BECMG 26015KT",
+    "KSFO 121656Z 00000KT M1/4SM FG VV001 11/11 A3001",
+    "ENGM 121650Z 01005KT 1200 BR SCT002 M03/M03 Q1030",
+    "NZOH 121700Z 27012KT 9999 FEW030 SCT045 16/08 Q1015",
+    "YSSY 121700Z 18022G32KT 9999 -SHRA SCT020 BKN035 14/11 Q1008 RMK RF00.2/001.4",
+]
+
+# The same TAF as one line and line-wrapped, and a two-report feed
+TAF_ONE_LINE = ("TAF KJFK 121130Z 1212/1318 31012KT P6SM SCT040 FM121800 33015G25KT P6SM BKN030 "
+                "TEMPO 1220/1224 3SM -SHRA BKN015 BECMG 1302/1304 VRB03KT")
+TAF_WRAPPED = """TAF KJFK 121130Z 1212/1318 31012KT P6SM SCT040
+      FM121800 33015G25KT P6SM BKN030
+      TEMPO 1220/1224 3SM -SHRA BKN015
+      BECMG 1302/1304 VRB03KT="""
+TAF_FEED = """TAF
+ENGM 121100Z 1212/1312 01005KT 9999 FEW030
+  TEMPO 1212/1218 4000 -SN=
+TAF ENGM 121400Z 1215/1315 02008KT 9999 SCT025
+  BECMG 1218/1220 BKN012="""
+
+def check_reports():
+    """Multi-line input: wrapped groups stay in their report, the latest report of a feed wins"""
+    one, wrapped = parse_taf(TAF_ONE_LINE), parse_taf(TAF_WRAPPED)
+    assert [p.kind for p in wrapped.periods] == [p.kind for p in one.periods] == ["BASE", "FM", "TEMPO", "BECMG"]
+    feed = parse_taf(TAF_FEED)
+    assert feed.raw.startswith("TAF ENGM 121400Z") and [p.kind for p in feed.periods] == ["BASE", "BECMG"]
+    feed = parse_metar(SAMPLES[4] + "=\n" + SAMPLES[4].replace("121650Z", "121720Z") + "=")
+    assert feed.observed == (12, 17, 20)
+    print("✅ multi-line TAF/METAR checks passed")
+
+def legacy_decode_metar(raw: Optional[str]) -> Dict:
+    """The regex-per-field decoder this module replaced, kept for comparison"""
+    if not raw:
+        return {}
+    raw = raw.strip()
+    result = {"raw": raw}
+    try:
+        parts = raw.split()
+        if len(parts) < 3:
+            return result
+        wind_match = re.search(r'(\d{3})(\d{2,3})(?:G(\d{2,3}))?KT', raw)
+        if wind_match:
+            wind_dir = int(wind_match.group(1))
+            wind_speed = int(wind_match.group(2))
+            wind_gust = int(wind_match.group(3)) if wind_match.group(3) else None
+            result["wind"] = {"dir_deg": wind_dir, "speed_kt": wind_speed, "gust_kt": wind_gust}
+            wind_components_data = {}
+            for rwy in [18, 36, 9, 27]:
+                headwind, crosswind = wind_components(wind_dir, wind_speed, rwy)
+                wind_components_data[f"rwy_{rwy:02d}"] = {"headwind_kt": headwind, "crosswind_kt": crosswind}
+            result["wind_components"] = wind_components_data
+        vis_match = re.search(r'(\d{4})SM|(\d{1,2})SM', raw)
+        if vis_match:
+            if vis_match.group(1):
+                result["visibility_km"] = int(vis_match.group(1)) * 1.609
+            else:
+                result["visibility_km"] = int(vis_match.group(2)) * 1.609
+        ceiling_match = re.search(r'(BKN|OVC)(\d{3})', raw)
+        if ceiling_match:
+            result["ceiling_ft"] = int(ceiling_match.group(2)) * 100
+        temp_match = re.search(r'(\d{2})/(\d{2})', raw)
+        if temp_match:
+            temp_c = int(temp_match.group(1))
+            dewpoint_c = int(temp_match.group(2))
+            result["temperature"] = {"temp_c": temp_c, "dewpoint_c": dewpoint_c}
+            result["density_altitude_ft"] = density_altitude(0, temp_c)
+        if "OVC" in raw or "BKN" in raw:
+            result["flight_rules"] = "IFR" if "OVC" in raw else "MVFR"
+        else:
+            result["flight_rules"] = "VFR"
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def unique_reports(n: int, seed: int = 0):
+    """Distinct raw strings (varying the observation time) so the LRU cannot help"""
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        raw = rng.choice(SAMPLES)
+        stamp = f"{1 + i // 1440 % 28:02d}{i // 60 % 24:02d}{i % 60:02d}Z"   # unique up to 40,320 reports
+        out.append(re.sub(r"\b\d{6}Z\b", stamp, raw, count=1))
+    return out
+
+def rate(fn, reports) -> float:
+    started = time.perf_counter()
+    for raw in reports:
+        fn(raw)
+    return len(reports) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="METAR decodes per second: single-pass tokenizer vs the old regex decoder")
+    parser.add_argument("--n", type=int, default=20000)
+    args = parser.parse_args()
+
+    check_reports()
+    cold = unique_reports(args.n)
+    warm = [SAMPLES[i % len(SAMPLES)] for i in range(args.n)]
+
+    print(f"📊 {args.n} decodes per run")
+    print(f"{'decoder':<34}{'decodes/s':>12}")
+    print(f"{'legacy regex decode_metar':<34}{rate(legacy_decode_metar, cold):>12,.0f}")
+    parse_metar.cache_clear()
+    print(f"{'tokenizer parse_metar (cold)':<34}{rate(parse_metar, cold):>12,.0f}")
+    parse_metar.cache_clear()
+    _metar_dict.cache_clear()
+    print(f"{'tokenizer decode_metar (cold)':<34}{rate(decode_metar, cold):>12,.0f}")
+    print(f"{'tokenizer parse_metar (LRU hit)':<34}{rate(parse_metar, warm):>12,.0f}")
+    print(f"{'tokenizer decode_metar (LRU hit)':<34}{rate(decode_metar, warm):>12,.0f}")
+
+if __name__ == "__main__":
+    main()
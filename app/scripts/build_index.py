@@ -1,11 +1,14 @@
-import pickle
+import argparse
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from app.services.ingest import build_chunk_df
 from app.services.retrieve import Retriever
+from app.services.embed_cache import text_hash
+from app.services import index_store
+from app.core.config import settings
 
-def main():
+def main(incremental: bool = False, index_type: str = settings.INDEX_TYPE, index_params: dict = None):
     print("Building T-6II knowledge base...")
     
     print("Step 1: Extracting and chunking text...")
@@ -19,18 +22,43 @@ def main():
     df.to_parquet("artifacts/chunks.parquet")
     print("Chunks saved to artifacts/chunks.parquet")
     
+    previous = None
+    if incremental and index_store.current_version(settings.INDEX_DIR):
+        previous = Retriever.load(settings.INDEX_DIR)
+        print(f"Incremental mode: comparing against index {previous.version} ({previous.vectors.shape[0]} chunks)")
+        new_keys = list(zip(df["chunk_id"], (text_hash(t) for t in df["chunk_text"])))
+        old_keys = list(zip(previous.meta.column("chunk_id").to_pylist(), previous.text_hashes()))
+        missing = int((~previous.embedded_rows()).sum())
+        if missing:
+            print(f"⚠️ {missing} chunks in {previous.version} have no embedding; they will be embedded again")
+        elif new_keys == old_keys and previous.ann_spec["type"] == index_type and not index_params:
+            print(f"✅ Index {previous.version} is already up to date; nothing to embed.")
+            return
+    
     print("Step 4: Building search index (this may take a while)...")
     r = Retriever()
-    r.build(df)
+    info = r.build(df, previous=previous)
+    print(f"Reused {info['reused']}, embedded {info['embedded']}, removed {info['removed']} chunks")
+    spec = r.build_ann(index_type, index_params)
+    print(f"Dense index: {spec['type']} {spec['params']}")
     
     print("Step 5: Saving search index...")
-    with open("artifacts/retriever.pkl", "wb") as f:
-        pickle.dump(r, f)
+    version = r.save(settings.INDEX_DIR)
     
     print(f"✅ Successfully indexed {len(df)} chunks!")
     print("Files created:")
     print("  - artifacts/chunks.parquet")
-    print("  - artifacts/retriever.pkl")
+    print(f"  - {settings.INDEX_DIR}/{version}/")
+
+def _param(value: str):
+    key, _, raw = value.partition("=")
+    return key, int(raw) if raw.lstrip("-").isdigit() else raw
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the T-6II retriever index bundle")
+    parser.add_argument("--incremental", action="store_true", help="embed only chunks that changed since the current bundle")
+    parser.add_argument("--index-type", default=settings.INDEX_TYPE, choices=["flat", "ivf_flat", "ivf_pq", "hnsw"])
+    parser.add_argument("--index-param", action="append", type=_param, default=[], metavar="KEY=VALUE",
+                        help="ANN build/search parameter, e.g. nlist=256, nprobe=16, M=32, ef_search=64")
+    args = parser.parse_args()
+    main(incremental=args.incremental, index_type=args.index_type, index_params=dict(args.index_param) or None)
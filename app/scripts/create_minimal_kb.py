@@ -1,4 +1,3 @@
-import pickle
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
@@ -6,7 +5,8 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 import pandas as pd
 import numpy as np
 import faiss
-from app.services.embed import embed_texts
+from app.services.embed_cache import embed_texts_cached
+from app.core.config import settings
 
 def create_minimal_knowledge_base():
     """Create a minimal knowledge base with hardcoded T-6II procedures"""
@@ -71,26 +71,24 @@ def create_minimal_knowledge_base():
     print("🔢 Creating embeddings...")
     try:
         texts = df["chunk_text"].tolist()
-        embeddings = embed_texts(texts, batch_size=1)
+        embeddings = embed_texts_cached(texts)
         print(f"✅ Created {embeddings.shape[0]} embeddings")
         
-        # Build FAISS index
+        # Build search index
         print("🔍 Building search index...")
         faiss.normalize_L2(embeddings)
-        index = faiss.IndexFlatIP(embeddings.shape[1])
-        index.add(embeddings)
         
         # Use the existing Retriever class
         from app.services.retrieve import Retriever
+        import pyarrow as pa
         retriever = Retriever()
-        retriever.index = index
-        retriever.meta = df.reset_index(drop=True)
+        retriever.vectors = embeddings
+        retriever.meta = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
         
         # Save retriever
-        with open("artifacts/retriever.pkl", "wb") as f:
-            pickle.dump(retriever, f)
+        version = retriever.save(settings.INDEX_DIR)
         
-        print("✅ Search index saved to artifacts/retriever.pkl")
+        print(f"✅ Search index saved to {settings.INDEX_DIR}/{version}/")
         
         # Test the retriever
         print("\n🧪 Testing search...")
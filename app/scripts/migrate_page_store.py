@@ -0,0 +1,36 @@
+import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.core.config import settings
+from app.services.ingest import load_catalog
+from app.services.page_store import get_page_store
+
+def migrate(processed_dir: str = "data/processed", catalog_path: str = "corpus/catalog.yaml", delete: bool = False):
+    """Load legacy <stem>_structured.json extractions into the page store"""
+    store = get_page_store()
+    doc_ids = {Path(d["file"]).stem: d["id"] for d in load_catalog(catalog_path).get("docs", [])}
+    for json_file in sorted(Path(processed_dir).glob("*_structured.json")):
+        stem = json_file.name[:-len("_structured.json")]
+        doc_id = doc_ids.get(stem, stem)
+        print(f"📦 Migrating {json_file} -> {store.path_for(doc_id)}")
+        with open(json_file, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        old = legacy.get("metadata", {})
+        info = store.write_document(doc_id, legacy.get("pages", []), metadata={
+            k: old[k] for k in ("source_file", "extraction_date") if k in old
+        })
+        text_file = Path(processed_dir) / f"{stem}_extracted.txt"
+        legacy_bytes = json_file.stat().st_size + (text_file.stat().st_size if text_file.exists() else 0)
+        print(f"✅ {info['total_pages']} pages, {info['total_characters']:,} characters: "
+              f"{legacy_bytes:,} bytes of txt/json -> {store.path_for(doc_id).stat().st_size:,} bytes")
+        if delete:
+            json_file.unlink()
+            if text_file.exists():
+                text_file.unlink()
+            print("🗑️ Removed the legacy txt/json pair")
+    print(f"Page store {settings.PAGE_STORE_DIR}: {store.stats()}")
+
+if __name__ == "__main__":
+    migrate(delete="--delete" in sys.argv)
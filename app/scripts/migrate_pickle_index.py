@@ -0,0 +1,30 @@
+import pickle
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import pyarrow as pa
+import faiss
+from app.core.config import settings
+from app.services.retrieve import Retriever
+
+def migrate(pkl_path: str = "artifacts/retriever.pkl"):
+    """Convert a legacy pickled retriever into a memory-mappable index bundle"""
+    print(f"📦 Migrating {pkl_path} -> {settings.INDEX_DIR}")
+    with open(pkl_path, "rb") as f:
+        legacy = pickle.load(f)
+
+    # Legacy pickles hold a faiss.IndexFlatIP plus a pandas DataFrame
+    vectors = legacy.index.reconstruct_n(0, legacy.index.ntotal)
+    faiss.normalize_L2(vectors)
+
+    r = Retriever()
+    r.vectors = vectors
+    r.meta = pa.Table.from_pandas(legacy.meta.reset_index(drop=True), preserve_index=False)
+    version = r.save(settings.INDEX_DIR)
+
+    print(f"✅ Wrote {vectors.shape[0]} vectors (dim {vectors.shape[1]}) to {settings.INDEX_DIR}/{version}/")
+    print("The pickle is no longer read by the API and can be deleted.")
+
+if __name__ == "__main__":
+    migrate(*sys.argv[1:])
@@ -0,0 +1,67 @@
+"""
+Local stub embedding server for exercising the embedding engine without
+calling Google AI Studio.
+
+    python app/scripts/stub_embed_server.py --port 8765 --rate 20 --latency-ms 150
+    EMBED_BASE_URL=http://127.0.0.1:8765 python app/scripts/bench_embed.py
+
+Vectors are deterministic per text (seeded from its SHA-256), so repeated runs
+produce identical indexes. --rate simulates a provider quota by answering 429
+with Retry-After once more than RATE requests/s arrive.
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List
+
+DIM = 768
+
+class EmbedRequest(BaseModel):
+    model: str = "stub"
+    texts: List[str]
+
+def stub_vector(text: str, dim: int = DIM) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    return (v / np.linalg.norm(v)).tolist()
+
+def create_app(rate: float = 0.0, latency_ms: float = 0.0, dim: int = DIM) -> FastAPI:
+    app = FastAPI(title="AviaGenAI stub embedding server")
+    window = {"start": time.monotonic(), "count": 0}
+
+    @app.post("/embed")
+    async def embed(req: EmbedRequest):
+        if rate > 0:
+            now = time.monotonic()
+            if now - window["start"] >= 1.0:
+                window["start"], window["count"] = now, 0
+            window["count"] += 1
+            if window["count"] > rate:
+                retry_after = max(0.05, 1.0 - (now - window["start"]))
+                return JSONResponse({"error": "rate limited"}, status_code=429,
+                                    headers={"Retry-After": f"{retry_after:.2f}"})
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000.0)
+        return {"model": req.model, "embeddings": [stub_vector(t, dim) for t in req.texts]}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=0.0, help="max requests/s before answering 429 (0 = unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated per-request latency")
+    parser.add_argument("--dim", type=int, default=DIM)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.rate, args.latency_ms, args.dim), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
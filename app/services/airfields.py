@@ -0,0 +1,187 @@
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import yaml
+
+from app.core.config import settings
+from app.services.performance import pressure_altitude_ft
+
+@dataclass(slots=True)
+class Runway:
+    ident: str
+    heading_deg: float   # true
+    length_m: float
+
+@dataclass(slots=True)
+class Airfield:
+    icao: str
+    name: str
+    lat: float
+    lon: float
+    elevation_ft: float
+    runways: List[Runway]
+
+_DESIGNATOR = re.compile(r"^(\d{2})([LCR]?)$")
+
+def _runway_ends(pair: Dict, mag_var: float) -> List[Dict]:
+    """Both ends of an "09/27" entry with their true headings"""
+    ends = []
+    for i, ident in enumerate(str(pair["ident"]).split("/")):
+        m = _DESIGNATOR.match(ident.strip())
+        if not m:
+            raise ValueError(f"Bad runway designator {ident!r}")
+        heading = (int(m.group(1)) * 10 + mag_var) % 360
+        if pair.get("heading_deg") is not None:
+            heading = (float(pair["heading_deg"]) + 180 * i) % 360
+        ends.append({"ident": ident.strip(), "heading_deg": heading, "length_m": float(pair.get("length_m") or 0)})
+    return ends
+
+class AirfieldDB:
+    """Airfields and runways held as flat NumPy arrays.
+
+    Airfield columns (icao, lat, lon, elevation) are one row per field;
+    runway columns are one row per runway end, grouped by airfield, with
+    `offsets[i]:offsets[i + 1]` the rows of field i (CSR layout). `index` maps
+    ICAO to row, so a lookup is one dict probe plus two slices, and wind
+    components for every runway of every field are one array expression.
+    """
+
+    def __init__(self, records: Dict[str, Dict]):
+        icaos, names, lat, lon, elev, counts = [], [], [], [], [], []
+        idents, headings, lengths = [], [], []
+        for icao, rec in sorted(records.items()):
+            ends = [end for pair in rec.get("runways") or [] for end in _runway_ends(pair, float(rec.get("mag_var_deg") or 0))]
+            icaos.append(icao.upper())
+            names.append(rec.get("name") or icao)
+            lat.append(rec["lat"])
+            lon.append(rec["lon"])
+            elev.append(rec.get("elevation_ft") or 0)
+            counts.append(len(ends))
+            idents.extend(e["ident"] for e in ends)
+            headings.extend(e["heading_deg"] for e in ends)
+            lengths.extend(e["length_m"] for e in ends)
+
+        self.icao = np.array(icaos, dtype="U4")
+        self.names = names
+        self.lat = np.array(lat, dtype="float64")
+        self.lon = np.array(lon, dtype="float64")
+        self.elevation_ft = np.array(elev, dtype="float32")
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype("int32")
+        self.runway_ident = np.array(idents, dtype="U3")
+        self.runway_heading = np.array(headings, dtype="float32")
+        self.runway_length_m = np.array(lengths, dtype="float32")
+        self.runway_field = np.repeat(np.arange(len(icaos), dtype="int32"), counts)   # runway row -> field row
+        self.index: Dict[str, int] = {icao: i for i, icao in enumerate(icaos)}
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "AirfieldDB":
+        p = Path(path)
+        if not p.exists():
+            print(f"⚠️ Airfield data not found at {path}")
+            return cls({})
+        with open(p, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        return cls(data.get("airfields") or {})
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, icao: str) -> bool:
+        return icao.upper() in self.index
+
+    def runway_rows(self, icao: str) -> Optional[slice]:
+        i = self.index.get(icao.upper())
+        if i is None:
+            return None
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def get(self, icao: str) -> Optional[Airfield]:
+        i = self.index.get(icao.upper())
+        if i is None:
+            return None
+        rows = self.runway_rows(icao)
+        return Airfield(
+            icao=str(self.icao[i]),
+            name=self.names[i],
+            lat=float(self.lat[i]),
+            lon=float(self.lon[i]),
+            elevation_ft=float(self.elevation_ft[i]),
+            runways=[Runway(str(ident), float(hdg), float(length)) for ident, hdg, length in
+                     zip(self.runway_ident[rows], self.runway_heading[rows], self.runway_length_m[rows])],
+        )
+
+    def runway_headings(self, icao: str) -> List[float]:
+        rows = self.runway_rows(icao)
+        return [] if rows is None else [float(h) for h in self.runway_heading[rows]]
+
+    def pressure_altitude(self, icao: str, qnh_hpa: Optional[float] = None) -> Optional[float]:
+        """Field elevation corrected for QNH; None if the field is unknown"""
+        i = self.index.get(icao.upper())
+        if i is None:
+            return None
+        return round(float(pressure_altitude_ft(float(self.elevation_ft[i]), qnh_hpa or None)))
+
+    def wind_components(self, wind_dir_deg, wind_speed_kt, rows=slice(None)) -> Dict[str, np.ndarray]:
+        """Headwind (+)/tailwind (-) and crosswind (+ from the right) for runway rows.
+
+        Wind may be scalars or arrays aligned with the selected rows (e.g. one
+        wind per airfield spread with `runway_field`). A direction of None or
+        NaN is variable wind: all of it is treated as crosswind.
+        """
+        heading = self.runway_heading[rows].astype("float64")
+        direction = np.asarray(np.nan if wind_dir_deg is None else wind_dir_deg, dtype="float64")
+        speed = np.asarray(wind_speed_kt, dtype="float64")
+        rel = np.radians(direction - heading)
+        variable = np.isnan(direction)
+        head = np.where(variable, 0.0, speed * np.cos(rel))
+        cross = np.where(variable, speed, speed * np.sin(rel))
+        return {"headwind_kt": np.round(head, 1), "crosswind_kt": np.round(cross, 1)}
+
+    def rank_runways(self, icao: str, wind_dir_deg: Optional[float], wind_speed_kt: float,
+                     gust_kt: Optional[float] = None, max_xwind_kt: float = 15.0,
+                     max_tailwind_kt: float = 5.0) -> List[Dict]:
+        """All runway ends at a field, best first.
+
+        Ends within the crosswind (gust) and tailwind limits come first, then
+        no tailwind, then least gust crosswind, then most headwind, then the
+        longest runway.
+        """
+        rows = self.runway_rows(icao)
+        if rows is None or rows.start == rows.stop:
+            return []
+        steady = self.wind_components(wind_dir_deg, wind_speed_kt, rows)
+        gusts = self.wind_components(wind_dir_deg, gust_kt if gust_kt else wind_speed_kt, rows)
+        head, cross = steady["headwind_kt"], steady["crosswind_kt"]
+        tail = np.maximum(-head, 0.0)
+        gust_cross = np.abs(gusts["crosswind_kt"])
+        within = (gust_cross <= max_xwind_kt) & (tail <= max_tailwind_kt)
+        length = self.runway_length_m[rows]
+        order = np.lexsort((-length, -head, gust_cross, tail > 0, ~within))
+        return [
+            {
+                "rank": rank + 1,
+                "runway": str(self.runway_ident[rows][i]),
+                "heading_true_deg": round(float(self.runway_heading[rows][i]), 1),
+                "length_m": float(length[i]),
+                "headwind_kt": float(head[i]),
+                "crosswind_kt": abs(float(cross[i])),
+                "crosswind_from": "variable" if wind_dir_deg is None else ("right" if cross[i] > 0 else "left" if cross[i] < 0 else "none"),
+                "gust_crosswind_kt": float(gust_cross[i]),
+                "tailwind_kt": float(tail[i]),
+                "within_limits": bool(within[i]),
+            }
+            for rank, i in enumerate(order)
+        ]
+
+    def stats(self) -> Dict:
+        return {"airfields": len(self), "runway_ends": int(self.runway_heading.size)}
+
+_airfield_db = None
+def get_airfield_db() -> AirfieldDB:
+    global _airfield_db
+    if _airfield_db is None:
+        _airfield_db = AirfieldDB.from_yaml(settings.AIRFIELDS_PATH)
+    return _airfield_db
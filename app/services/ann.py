@@ -0,0 +1,85 @@
+import math
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+# Approximate nearest-neighbour index types selectable at build time.
+# "flat" means exact search straight over the memory-mapped vector matrix.
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+ANN_FILE = "ann.faiss"
+
+def default_params(index_type: str, n: int, dim: int) -> Dict:
+    """Reasonable build/search parameters for n vectors of size dim"""
+    if index_type in ("ivf_flat", "ivf_pq"):
+        # ~4*sqrt(n) lists, but keep >= 39 training points per centroid
+        nlist = max(1, min(int(4 * math.sqrt(max(n, 1))), n // 39 or 1))
+        params = {"nlist": nlist, "nprobe": min(nlist, max(8, nlist // 16))}
+        if index_type == "ivf_pq":
+            m = next(m for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+            params.update({"m": m, "nbits": 8})
+        return params
+    if index_type == "hnsw":
+        return {"M": 32, "ef_construction": 200, "ef_search": 64}
+    return {}
+
+def build_ann_index(vectors: np.ndarray, index_type: str, params: Optional[Dict] = None) -> Tuple[Optional[faiss.Index], Dict]:
+    """Train and fill an index over L2-normalised vectors (inner-product metric).
+
+    Returns (index, params actually used); index is None for "flat". Corpora
+    too small to train the requested type fall back to flat with a warning.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    n, dim = vectors.shape
+    params = {**default_params(index_type, n, dim), **(params or {})}
+    if index_type == "flat":
+        return None, params
+
+    xb = np.ascontiguousarray(vectors, dtype="float32")
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, int(params["M"]), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = int(params["ef_construction"])
+    else:
+        min_train = int(params["nlist"])
+        if index_type == "ivf_pq":
+            min_train = max(min_train, 2 ** int(params["nbits"]))
+        if n < min_train:
+            print(f"⚠️ {n} vectors are too few to train {index_type} {params}; using flat search")
+            return None, default_params("flat", n, dim)
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, int(params["nlist"]), faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, int(params["nlist"]), int(params["m"]), int(params["nbits"]),
+                                     faiss.METRIC_INNER_PRODUCT)
+        index.train(xb)
+    index.add(xb)
+    apply_search_params(index, index_type, params)
+    return index, params
+
+def apply_search_params(index: faiss.Index, index_type: str, params: Dict):
+    """Set query-time knobs (nprobe / efSearch) from params"""
+    if index_type in ("ivf_flat", "ivf_pq") and "nprobe" in params:
+        faiss.extract_index_ivf(index).nprobe = int(params["nprobe"])
+    elif index_type == "hnsw" and "ef_search" in params:
+        index.hnsw.efSearch = int(params["ef_search"])
+
+def index_bytes(index: Optional[faiss.Index], vectors: np.ndarray) -> int:
+    """Serialized size of the search structure (the raw matrix for flat)"""
+    if index is None:
+        return int(vectors.nbytes)
+    return int(faiss.serialize_index(index).nbytes)
+
+def write_ann(index: faiss.Index, bundle: Path) -> Dict[str, str]:
+    faiss.write_index(index, str(Path(bundle) / ANN_FILE))
+    return {"ann": ANN_FILE}
+
+def read_ann(bundle: Path) -> faiss.Index:
+    """Load an ANN index, memory-mapping inverted lists where faiss supports it"""
+    path = str(Path(bundle) / ANN_FILE)
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
@@ -0,0 +1,198 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def normalize_question(question: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a question"""
+    return _NON_WORD.sub(" ", question.lower()).strip()
+
+def cache_key(question: str, mode: str) -> str:
+    """Exact-level key: answers are grounded in one retrieval mode's results"""
+    return f"{mode}:{normalize_question(question)}"
+
+@dataclass
+class CachedAnswer:
+    key: str
+    question: str
+    mode: str                      # retrieval mode the answer was grounded in
+    answer: str
+    vector: Optional[np.ndarray]   # normalised query embedding; None for lexical-only requests
+    index_version: Optional[str]
+    created_at: float
+
+class AnswerCache:
+    """Two-level /ask answer cache.
+
+    Level 1 is an exact LRU keyed on the retrieval mode and the normalised
+    question. Level 2 reuses an answer retrieved in the same mode whose query
+    embedding is within `threshold` cosine similarity of the new query.
+    Entries expire after ttl_s, the least recently used entry is evicted
+    beyond max_entries, and everything is dropped when the retriever index
+    version changes. With a path, entries are written through
+    to SQLite and reloaded on start-up.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_s: float = 86400.0, threshold: float = 0.92,
+                 path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self.index_version: Optional[str] = None
+        self.lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._matrix: Optional[np.ndarray] = None   # stacked vectors for the semantic level
+        self._matrix_keys: list = []
+        self._matrix_modes: Optional[np.ndarray] = None
+        self.conn = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(answers)")]
+            if columns and "mode" not in columns:
+                # Answers cached before the mode was recorded can't be attributed to one
+                self.conn.execute("DROP TABLE answers")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, question TEXT, mode TEXT, answer TEXT,"
+                " vector BLOB, index_version TEXT, created_at REAL)"
+            )
+            self._load()
+
+    def _load(self):
+        rows = self.conn.execute(
+            "SELECT key, question, mode, answer, vector, index_version, created_at FROM answers ORDER BY created_at"
+        ).fetchall()
+        for key, question, mode, answer, blob, version, created in rows:
+            vec = np.frombuffer(blob, dtype="<f4") if blob else None
+            self.entries[key] = CachedAnswer(key, question, mode, answer, vec, version, created)
+            self.index_version = version
+        while len(self.entries) > self.max_entries:
+            self._evict(next(iter(self.entries)))
+
+    def _evict(self, key: str):
+        self.entries.pop(key, None)
+        self._matrix = None
+        if self.conn is not None:
+            self.conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def _check_version(self, index_version: Optional[str]):
+        if index_version != self.index_version:
+            if self.entries:
+                self.counters["invalidations"] += 1
+            self.entries.clear()
+            self._matrix = None
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM answers")
+                self.conn.commit()
+            self.index_version = index_version
+
+    def _fresh(self, entry: CachedAnswer) -> bool:
+        if time.time() - entry.created_at <= self.ttl_s:
+            return True
+        self._evict(entry.key)
+        return False
+
+    def get(self, question: str, mode: str, index_version: Optional[str]) -> Optional[CachedAnswer]:
+        """Exact lookup on the retrieval mode and normalised question"""
+        with self.lock:
+            self._check_version(index_version)
+            entry = self.entries.get(cache_key(question, mode))
+            if entry is None or not self._fresh(entry):
+                return None
+            self.entries.move_to_end(entry.key)
+            self.counters["exact_hits"] += 1
+            return entry
+
+    def get_similar(self, vector: np.ndarray, mode: str,
+                    index_version: Optional[str]) -> Optional[Tuple[CachedAnswer, float]]:
+        """Best cached answer from the same retrieval mode whose query embedding is within the cosine threshold"""
+        with self.lock:
+            self._check_version(index_version)
+            if self._matrix is None:
+                self._matrix_keys = [k for k, e in self.entries.items() if e.vector is not None]
+                self._matrix = (np.stack([self.entries[k].vector for k in self._matrix_keys])
+                                if self._matrix_keys else np.zeros((0, vector.shape[0]), dtype="float32"))
+                self._matrix_modes = np.asarray([self.entries[k].mode for k in self._matrix_keys], dtype=object)
+            if self._matrix.shape[0] == 0 or self._matrix.shape[1] != vector.shape[0]:
+                self.counters["misses"] += 1
+                return None
+            sims = np.where(self._matrix_modes == mode, self._matrix @ vector, -np.inf)
+            best = int(np.argmax(sims))
+            entry = self.entries.get(self._matrix_keys[best])
+            if sims[best] < self.threshold or entry is None or not self._fresh(entry):
+                self.counters["misses"] += 1
+                return None
+            self.entries.move_to_end(entry.key)
+            self.counters["semantic_hits"] += 1
+            return entry, float(sims[best])
+
+    def miss(self):
+        """Record a miss for requests that never reach the semantic level (lexical mode)"""
+        with self.lock:
+            self.counters["misses"] += 1
+
+    def put(self, question: str, mode: str, answer: str, vector: Optional[np.ndarray], index_version: Optional[str]):
+        with self.lock:
+            self._check_version(index_version)
+            key = cache_key(question, mode)
+            vec = None if vector is None else np.ascontiguousarray(vector, dtype="<f4")
+            entry = CachedAnswer(key, question, mode, answer, vec, index_version, time.time())
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self._matrix = None
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, question, mode, answer, None if vec is None else vec.tobytes(), index_version, entry.created_at),
+                )
+                self.conn.commit()
+            while len(self.entries) > self.max_entries:
+                self.counters["evictions"] += 1
+                self._evict(next(iter(self.entries)))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._matrix = None
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM answers")
+                self.conn.commit()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "entries": len(self.entries),
+                "index_version": self.index_version,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "similarity_threshold": self.threshold,
+                "ttl_seconds": self.ttl_s,
+                "max_entries": self.max_entries,
+                "persistent": self.conn is not None,
+            }
+
+_answer_cache = None
+def get_answer_cache() -> Optional[AnswerCache]:
+    global _answer_cache
+    if _answer_cache is None and settings.ANSWER_CACHE_ENABLED:
+        _answer_cache = AnswerCache(
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_s=settings.ANSWER_CACHE_TTL_SECONDS,
+            threshold=settings.ANSWER_CACHE_SIMILARITY,
+            path=settings.ANSWER_CACHE_PATH or None,
+        )
+    return _answer_cache
@@ -1,6 +1,8 @@
 import math
 from typing import Tuple
 
+from app.services.performance import density_altitude_ft
+
 def wind_components(wind_dir_deg: float, wind_speed: float, rwy_deg: float) -> Tuple[float, float]:
     """
     Calculate headwind and crosswind components for runway operations.
@@ -29,8 +31,6 @@ def density_altitude(pressure_alt_ft: float, oat_c: float) -> float:
         oat_c: Outside air temperature in Celsius
     
     Returns:
-        Density altitude in feet
+        Density altitude in feet (ISA density relation, see app/services/performance.py)
     """
-    isa_temp = 15 - 2.0 * (pressure_alt_ft / 1000.0)
-    delta = oat_c - isa_temp
-    return round(pressure_alt_ft + (120 * delta), 0)
+    return round(float(density_altitude_ft(pressure_alt_ft, oat_c)), 0)
@@ -0,0 +1,260 @@
+import re
+import zlib
+from collections import Counter, defaultdict, deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Block kinds, in the order a chunk prefers to end before them
+SECTION_RE = re.compile(r"^(?:\d{3}\.\s+[A-Z]|CHAPTER\s+[A-Z]+|APPENDIX\s+[A-Z])")
+STEP_RE = re.compile(r"^(?:[a-z]\.\s|\d{1,2}\.\s|\(\d{1,2}\)\s|\([a-z]\)\s|[•▪\-–]\s|(?:NOTE|CAUTION|WARNING)\b)")
+TOC_LEADER_RE = re.compile(r"\.{4,}|…{2,}")
+SENTENCE_RE = re.compile(r"(?<=[.!?:”\"])\s+(?=[A-Z0-9(“\"])")
+PAGE_NUMBER_RE = re.compile(r"^(?:[A-Z]-)?\d{1,4}(?:\s*[-–]\s*\d{1,4})?$|^[ivxlcdm]{1,6}$", re.I)
+
+def _line_key(line: str) -> str:
+    """Recurrence key of a header/footer line: digits and spacing don't matter"""
+    return re.sub(r"\s+", " ", re.sub(r"\d+", "#", line)).strip().upper()
+
+class Boilerplate:
+    """Page headers and footers found by recurrence across a document's pages.
+
+    Only the first and last `edge_lines` non-blank lines of a page are
+    candidates, and step lines ("4. Common Errors.") never are. An edge line
+    is boilerplate if its key (digits masked, so
+    "2-17" and "3-4" match) recurs on at least min_pages pages, or if it is a
+    bare page number ("2-17", "iv").
+    """
+
+    def __init__(self, edge_lines: int = 3, min_pages: int = 3):
+        self.edge_lines = edge_lines
+        self.min_pages = min_pages
+        self.keys: Set[str] = set()
+        self.counts: Counter = Counter()
+        self.pages_seen = 0
+
+    def _edges(self, lines: List[str]) -> List[int]:
+        idx = [i for i, l in enumerate(lines) if l.strip()]
+        return sorted(set(idx[:self.edge_lines] + idx[-self.edge_lines:]))
+
+    def add(self, page: Dict):
+        """Count one page's edge-line keys"""
+        lines = (page.get("text") or "").split("\n")
+        for key in {_line_key(lines[i]) for i in self._edges(lines) if not STEP_RE.match(lines[i].strip())}:
+            self.counts[key] += 1
+            if self.counts[key] == self.min_pages and key:
+                self.keys.add(key)
+        self.pages_seen += 1
+
+    def fit(self, pages: Iterable[Dict]) -> "Boilerplate":
+        """One pass over {text} records, keeping only a counter of edge-line keys"""
+        for page in pages:
+            self.add(page)
+        return self
+
+    def ahead(self, pages: Iterable[Dict], window: int) -> Iterator[Dict]:
+        """Fit while streaming: pages come out `window` pages behind the input.
+
+        For a document whose pages are still arriving (being extracted), a
+        page is stripped with the counts of every page before it and the
+        `window` after it, instead of the whole document's.
+        """
+        held: Deque[Dict] = deque()
+        for page in pages:
+            self.add(page)
+            held.append(page)
+            if len(held) > window:
+                yield held.popleft()
+        yield from held
+
+    def strip(self, text: str) -> Tuple[str, int]:
+        """(text without boilerplate edge lines, lines removed)"""
+        lines = text.split("\n")
+        drop = [i for i in self._edges(lines) if not STEP_RE.match(lines[i].strip())
+                and (_line_key(lines[i]) in self.keys or PAGE_NUMBER_RE.match(lines[i].strip()))]
+        for i in reversed(drop):
+            del lines[i]
+        return "\n".join(lines), len(drop)
+
+def _kind(kind: str, lines: List[str]) -> str:
+    """A contents entry ("401. ... SYSTEM ........ 4-1") looks like a heading but is not one"""
+    return "para" if kind == "section" and any(TOC_LEADER_RE.search(l) for l in lines) else kind
+
+def page_blocks(text: str) -> Iterator[Tuple[str, str]]:
+    """(kind, text) blocks of a page: "section" headings, "step" items and "para" paragraphs.
+
+    PDF line wraps inside a paragraph are joined with spaces; a line that
+    opens a step or a section starts a new block.
+    """
+    current: List[str] = []
+    kind = "para"
+    for raw in text.replace("\x00", " ").replace("\u200b", "").split("\n"):
+        line = " ".join(raw.split())
+        starts = "section" if SECTION_RE.match(line) else "step" if STEP_RE.match(line) else None
+        if not line or starts:
+            if current:
+                yield _kind(kind, current), " ".join(current)
+            current, kind = [], starts or "para"
+        if line:
+            current.append(line)
+    if current:
+        yield _kind(kind, current), " ".join(current)
+
+def _pieces(text: str, max_chars: int, room: Optional[int] = None) -> List[str]:
+    """A block cut at sentence boundaries (then word boundaries) into pieces of <= max_chars.
+
+    A block that fits in `room` (default max_chars) stays whole.
+    """
+    if len(text) <= (max_chars if room is None else room):
+        return [text]
+    out: List[str] = []
+    for sentence in SENTENCE_RE.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            out.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            out.append(sentence)
+    return out
+
+def structured_chunks(pages: Iterable[Dict], max_chars: int = 2000, overlap: int = 0,
+                      boilerplate: Optional[Boilerplate] = None, stats: Optional[Dict] = None,
+                      min_fill: float = 0.75) -> Iterator[Dict]:
+    """Chunks that end on section, step, paragraph or sentence boundaries.
+
+    Blocks are packed into a chunk while they fit in max_chars. Once the
+    chunk is at least min_fill full, a section heading or a block that does
+    not fit closes it; below that, the block is cut into sentences that top
+    the chunk up, so chunks stay close to max_chars. Short sections are thus
+    merged but long ones start a fresh chunk. Within a section, consecutive
+    chunks overlap by whole trailing sentences (at most `overlap` chars).
+    Each chunk carries its first/last page and the section heading it
+    starts in.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("boilerplate_lines", 0)
+    min_chars = int(max_chars * min_fill)
+    parts: List[Tuple[int, str]] = []     # (page, text) pieces of the open chunk
+    size = 0
+    section = ""
+    chunk_section = ""
+
+    def flush(carry: bool) -> Optional[Dict]:
+        nonlocal parts, size, chunk_section
+        if not parts:
+            return None
+        chunk = {"text": "\n".join(t for _, t in parts), "page_start": parts[0][0], "page_end": parts[-1][0],
+                 "section": chunk_section}
+        tail: List[Tuple[int, str]] = []
+        if carry and overlap > 0:
+            page, last = parts[-1]
+            kept = 0
+            for sentence in reversed(SENTENCE_RE.split(last)):
+                if kept + len(sentence) > overlap:
+                    break
+                tail.insert(0, (page, sentence))
+                kept += len(sentence) + 1
+            if tail and len(tail[0][1]) == len(last):   # the whole last piece fits: carry it as is
+                tail = [(page, last)]
+            elif tail:
+                tail = [(page, " ".join(t for _, t in tail))]
+        parts, size = tail, sum(len(t) + 1 for _, t in tail)
+        chunk_section = section
+        return chunk
+
+    for page in pages:
+        text = page.get("text") or ""
+        if boilerplate is not None:
+            text, removed = boilerplate.strip(text)
+            stats["boilerplate_lines"] += removed
+        for kind, block in page_blocks(text):
+            if kind == "section":
+                if size >= min_chars:
+                    chunk = flush(carry=False)
+                    if chunk:
+                        yield chunk
+                section = block[:120]
+                if not parts:
+                    chunk_section = section
+            room = max_chars - size
+            if parts and len(block) > room and size >= min_chars:
+                chunk = flush(carry=True)   # full enough: end on the block boundary
+                if chunk:
+                    yield chunk
+                room = max_chars - size
+            # Otherwise a block that does not fit is cut into sentences to fill the chunk
+            for piece in _pieces(block, max_chars, room):
+                if parts and size + len(piece) > max_chars:
+                    chunk = flush(carry=True)
+                    if chunk:
+                        yield chunk
+                    if size + len(piece) > max_chars:   # overlap + piece would overflow
+                        parts, size = [], 0
+                if not parts:
+                    chunk_section = section
+                parts.append((int(page["page"]), piece))
+                size += len(piece) + 1
+    chunk = flush(carry=False)
+    if chunk:
+        yield chunk
+
+# MinHash over word 5-gram shingles; the permutations are multiply-shift hashes
+# (a * x + b, wrapping in uint64, top 32 bits) of 32-bit shingle hashes
+_WORD_RE = re.compile(r"\w+")
+
+class NearDuplicateFilter:
+    """Streaming near-duplicate detection with MinHash + LSH banding.
+
+    Each text gets a num_perm MinHash signature, cut into `bands` bands; texts
+    sharing any band are candidates, and a candidate whose signatures agree
+    on at least `threshold` of the positions (estimated Jaccard similarity of
+    the shingle sets) is a duplicate of the earlier text. Only signatures and
+    band keys of kept texts are held.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16, shingle_words: int = 5,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # odd
+        self.b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_words = shingle_words
+        self.buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        self.signatures: List[np.ndarray] = []
+        self._word_hashes: Dict[str, int] = {}   # vocabulary seen so far
+        self.seen = 0
+        self.dropped = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower()) or [""]
+        for word in set(words).difference(self._word_hashes):
+            self._word_hashes[word] = zlib.crc32(word.encode())
+        w = np.fromiter(map(self._word_hashes.__getitem__, words), dtype=np.uint64, count=len(words))
+        # Shingle hashes as a rolling polynomial over word hashes (no shingle strings built)
+        n = min(self.shingle_words, w.size)
+        x = np.zeros(w.size - n + 1, dtype=np.uint64)
+        for k in range(n):
+            x = (x * np.uint64(1000003) + w[k:w.size - n + 1 + k]) & np.uint64(0xFFFFFFFF)
+        x = np.unique(x)
+        return ((self.a * x[None, :] + self.b) >> np.uint64(32)).min(axis=1)
+
+    def is_duplicate(self, text: str) -> bool:
+        """True if text nearly duplicates one already kept; otherwise keep it"""
+        self.seen += 1
+        sig = self.signature(text)
+        keys = [(band, sig[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        candidates = {i for key in keys for i in self.buckets.get(key, ())}
+        for i in candidates:
+            if np.mean(self.signatures[i] == sig) >= self.threshold:
+                self.dropped += 1
+                return True
+        idx = len(self.signatures)
+        self.signatures.append(sig)
+        for key in keys:
+            self.buckets[key].append(idx)
+        return False
@@ -1,5 +1,6 @@
 import os
-from typing import Dict, List, Any, Optional
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
 from app.services.aviation_helpers import wind_components, density_altitude
 
 def env_float(name: str, default: Optional[float]) -> Optional[float]:
@@ -38,7 +39,10 @@ def analyze_weather(metar_dec: Dict, runway_deg: float, pa_ft: float, oat_c: flo
         head, cross = wind_components(float(wdir), float(wspd), runway_deg)
 
     da = density_altitude(pa_ft, oat_c)
-    category = classify_vmc(metar_dec.get("visibility_km"), metar_dec.get("ceiling_ft"))
+    ceiling = metar_dec.get("ceiling_ft")
+    if ceiling is None and "clouds" in metar_dec:
+        ceiling = 99999  # cloud groups were decoded and none is BKN/OVC/VV: no ceiling
+    category = classify_vmc(metar_dec.get("visibility_km"), ceiling)
 
     considerations: List[str] = []
     if category in ("IFR","LIFR"):
@@ -55,3 +59,23 @@ def analyze_weather(metar_dec: Dict, runway_deg: float, pa_ft: float, oat_c: flo
         "density_altitude_ft": da,
         "considerations": considerations
     }
+
+def analyze_forecast(taf, runway_deg: float, pa_ft: float, oat_c: float, times: Iterable[datetime]) -> List[Dict[str, Any]]:
+    """analyze_weather over a decoded TAF (weather.decoder.TafReport) at each of `times`.
+
+    Each entry holds the analysis of the prevailing forecast and of the worst
+    case including TEMPO/PROB/BECMG groups. The TAF is parsed once by the
+    caller; every lookup here is an index query.
+    """
+    timeline = []
+    for t in times:
+        at = taf.at(t)
+        timeline.append({
+            "time": at["time"],
+            "in_validity": at["in_validity"],
+            "prevailing": analyze_weather(at["prevailing"], runway_deg, pa_ft, oat_c) if at["prevailing"] else None,
+            "worst_case": analyze_weather(at["worst"], runway_deg, pa_ft, oat_c) if at["worst"] else None,
+            "change_groups": [c["kind"] if c["probability"] is None else f"{c['kind']}{c['probability']}"
+                              for c in at["changes"]],
+        })
+    return timeline
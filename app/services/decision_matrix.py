@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.performance import density_altitude_ft
+from app.services.decision_engine import (
+    VFR_MIN_VIS_KM, VFR_MIN_CEILING, MVFR_MIN_VIS_KM, MVFR_MIN_CEILING, T6_MAX_XWIND_KT,
+)
+
+# Category codes, in increasing severity; -1 = unknown (no visibility)
+CATEGORIES = ("VFR", "MVFR", "IFR", "LIFR")
+DECISIONS = ("GO", "CAUTION", "NO_GO")
+
+# Training limits used when T6_MAX_XWIND_KT is not configured (same as /aviation/runway-analysis)
+DEFAULT_MAX_XWIND_KT = 15.0
+MAX_TAILWIND_KT = 5.0
+CAUTION_XWIND_KT = 10.0
+GUST_SPREAD_KT = 10.0
+HIGH_DA_FT = 3000.0
+
+# Per-cell considerations are bit flags; text is only built for cells that are returned
+FLAGS = {
+    "ifr": (1 << 0, "Instrument flight likely required; confirm minima and alternates."),
+    "mvfr": (1 << 1, "Marginal VFR; consider clouds/terrain/escape options."),
+    "xwind_limit": (1 << 2, "Crosswind {crosswind_kt} kt exceeds T-6 limit {max_xwind_kt} kt."),
+    "xwind_high": (1 << 3, "Crosswind {crosswind_kt} kt - extra caution required."),
+    "tailwind": (1 << 4, "Tailwind {tailwind_kt} kt exceeds {max_tailwind_kt} kt."),
+    "gusts": (1 << 5, "Gusting {gust_kt} kt; gust crosswind {gust_crosswind_kt} kt."),
+    "high_da": (1 << 6, "High density altitude {density_altitude_ft} ft; expect performance reductions."),
+    "unknown": (1 << 7, "Visibility not reported; category unknown."),
+}
+
+def _arr(x, shape=None) -> np.ndarray:
+    a = np.asarray(x, dtype="float64")
+    return np.broadcast_to(a, shape) if shape is not None else a
+
+def decision_matrix(wind_dir_deg, wind_speed_kt, gust_kt, visibility_km, ceiling_ft, oat_c, pressure_alt_ft,
+                    runway_deg, max_xwind_kt: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """Go/no-go for every station x runway x period in one pass.
+
+    Weather inputs are (stations, periods) arrays (or anything that
+    broadcasts to that); runway_deg is (stations, runways), NaN-padded when
+    stations have different runway counts. NaN means not reported: NaN
+    ceiling is no ceiling, NaN gust no gusts, NaN wind direction variable
+    (treated as full crosswind); a cell with neither wind speed nor
+    visibility has no report and gets decision -1. Outputs are (stations,
+    runways, periods) except density altitude and category, which do not
+    depend on runway.
+    """
+    speed = _arr(wind_speed_kt)
+    shape = speed.shape
+    direction = _arr(wind_dir_deg, shape)
+    gust = _arr(gust_kt, shape)
+    vis = _arr(visibility_km, shape)
+    ceiling = np.where(np.isnan(_arr(ceiling_ft, shape)), np.inf, _arr(ceiling_ft, shape))
+    oat = _arr(oat_c, shape)
+    pa = _arr(pressure_alt_ft, shape)
+    rwy = _arr(runway_deg)
+    max_xwind = max_xwind_kt if max_xwind_kt is not None else (T6_MAX_XWIND_KT or DEFAULT_MAX_XWIND_KT)
+
+    # Wind components: (S, 1, T) against (S, R, 1)
+    rel = np.radians(direction[:, None, :] - rwy[:, :, None])
+    variable = np.isnan(direction)[:, None, :]
+    spd = speed[:, None, :]
+    headwind = np.where(variable, 0.0, spd * np.cos(rel))
+    crosswind = np.where(variable, spd, np.abs(spd * np.sin(rel)))
+    gust_spd = np.where(np.isnan(gust), speed, gust)[:, None, :]
+    gust_crosswind = np.where(variable, gust_spd, np.abs(gust_spd * np.sin(rel)))
+    tailwind = np.maximum(-headwind, 0.0)
+
+    # Density altitude (same ISA relation as aviation_helpers.density_altitude)
+    density_alt = np.round(density_altitude_ft(pa, oat))
+
+    # VMC category (same thresholds as decision_engine.classify_vmc)
+    category = np.select(
+        [np.isnan(vis), (ceiling < 500) | (vis < 1.6), (ceiling < MVFR_MIN_CEILING) | (vis < MVFR_MIN_VIS_KM),
+         (ceiling < VFR_MIN_CEILING) | (vis < VFR_MIN_VIS_KM)],
+        [-1, 3, 2, 1], default=0,
+    ).astype("int8")
+
+    cat3 = category[:, None, :]
+    flags = np.zeros(headwind.shape, dtype="uint16")
+    for name, condition in (
+        ("ifr", cat3 >= 2),
+        ("mvfr", cat3 == 1),
+        ("unknown", cat3 < 0),
+        ("xwind_limit", gust_crosswind > max_xwind),
+        ("xwind_high", (gust_crosswind > CAUTION_XWIND_KT) & (gust_crosswind <= max_xwind)),
+        ("tailwind", tailwind > MAX_TAILWIND_KT),
+        ("gusts", (gust - speed >= GUST_SPREAD_KT)[:, None, :]),
+        ("high_da", (density_alt > HIGH_DA_FT)[:, None, :]),
+    ):
+        flags |= np.where(condition, FLAGS[name][0], 0).astype("uint16")
+
+    no_go = FLAGS["ifr"][0] | FLAGS["xwind_limit"][0] | FLAGS["tailwind"][0] | FLAGS["unknown"][0]
+    decision = np.where(flags & no_go, 2, np.where(flags, 1, 0)).astype("int8")
+    no_data = (np.isnan(speed) & np.isnan(vis))[:, None, :] | np.isnan(rwy)[:, :, None]   # incl. padding runways
+    flags[np.broadcast_to(no_data, flags.shape)] = 0
+    decision = np.where(no_data, -1, decision)
+
+    blank = lambda a: np.round(np.where(no_data, np.nan, a), 1)
+    return {
+        "decision": decision,
+        "category": category,
+        "headwind_kt": blank(headwind),
+        "crosswind_kt": blank(crosswind),
+        "gust_crosswind_kt": blank(gust_crosswind),
+        "tailwind_kt": blank(tailwind),
+        "density_altitude_ft": density_alt,
+        "flags": flags,
+        "max_xwind_kt": max_xwind,
+    }
+
+def condition_arrays(grid: List[List[Optional[Dict]]]) -> Dict[str, np.ndarray]:
+    """(stations, periods) weather arrays from decoded METAR/TAF condition dicts.
+
+    Accepts decode_metar output and TafReport.at() "prevailing"/"worst"
+    dicts; None (no report, outside TAF validity) becomes an all-NaN cell.
+    """
+    fields = ("wind_dir_deg", "wind_speed_kt", "gust_kt", "visibility_km", "ceiling_ft")
+    shape = (len(grid), max((len(row) for row in grid), default=0))
+    out = {name: np.full(shape, np.nan) for name in fields}
+    for s, row in enumerate(grid):
+        for t, cond in enumerate(row):
+            if not cond:
+                continue
+            wind = cond.get("wind") or {}
+            values = (wind.get("dir_deg"), wind.get("speed_kt"), wind.get("gust_kt"),
+                      cond.get("visibility_km"), cond.get("ceiling_ft"))
+            for name, value in zip(fields, values):
+                if value is not None:
+                    out[name][s, t] = value
+    # A report without a wind group counts as calm; cells with no report at all stay NaN
+    reported = np.array([[bool(c) for c in row] + [False] * (shape[1] - len(row)) for row in grid]).reshape(shape)
+    calm = reported & np.isnan(out["wind_speed_kt"])
+    out["wind_speed_kt"][calm] = 0.0
+    out["wind_dir_deg"][out["wind_speed_kt"] == 0] = 0.0
+    return out
+
+def runway_array(runways: List[List[float]]) -> np.ndarray:
+    """(stations, runways) headings, NaN-padded to the longest list"""
+    out = np.full((len(runways), max((len(r) for r in runways), default=0)), np.nan)
+    for s, headings in enumerate(runways):
+        out[s, :len(headings)] = headings
+    return out
+
+def best_runways(result: Dict[str, np.ndarray]) -> np.ndarray:
+    """(stations, periods) index of the runway with the best decision, then least crosswind; -1 without data"""
+    score = result["decision"] * 1000.0 + result["gust_crosswind_kt"]
+    best = np.argmin(np.where(result["decision"] < 0, np.inf, score), axis=1)   # never a padding runway
+    return np.where((result["decision"] >= 0).any(axis=1), best, -1)
+
+def considerations(result: Dict[str, np.ndarray], s: int, r: int, t: int, gust_kt: Optional[float] = None) -> List[str]:
+    """Text for one cell's flags"""
+    values = {
+        "crosswind_kt": float(result["gust_crosswind_kt"][s, r, t]),
+        "tailwind_kt": float(result["tailwind_kt"][s, r, t]),
+        "gust_crosswind_kt": float(result["gust_crosswind_kt"][s, r, t]),
+        "density_altitude_ft": int(result["density_altitude_ft"][s, t]),
+        "max_xwind_kt": result["max_xwind_kt"],
+        "max_tailwind_kt": MAX_TAILWIND_KT,
+        "gust_kt": gust_kt,
+    }
+    cell = int(result["flags"][s, r, t])
+    return [text.format(**values) for bit, text in FLAGS.values() if cell & bit]
+
+def category_name(code: int) -> str:
+    return CATEGORIES[code] if code >= 0 else "unknown"
+
+def decision_name(code: int) -> str:
+    return DECISIONS[code] if code >= 0 else "n/a"
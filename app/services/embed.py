@@ -1,30 +1,212 @@
 import google.generativeai as genai
+import httpx
 import numpy as np
-from typing import List
-from app.core.config import settings
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Optional
+from app.core.config import settings
 
 genai.configure(api_key=settings.GOOGLE_API_KEY)
-EMBED_MODEL = "text-embedding-004"
-
-def embed_texts(texts: List[str], batch_size: int = 10) -> np.ndarray:
-    """Embed texts in batches to avoid memory issues"""
-    vecs = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        print(f"Processing batch {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size}")
-        
-        for t in batch:
+EMBED_MODEL = settings.EMBED_MODEL
+EMBED_DIM = 768  # text-embedding-004 has 768 dimensions
+
+class RateLimitError(Exception):
+    """Raised by a backend when the provider answers 429 / RESOURCE_EXHAUSTED"""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Thread-safe token bucket whose refill rate adapts to provider throttling.
+
+    The rate is halved (down to min_rate) on every 429 and creeps back up
+    additively after each success, so sustained throughput settles just under
+    the provider's real quota instead of a hard-coded sleep.
+    """
+
+    def __init__(self, rate_per_s: float, capacity: float, min_rate_per_s: float = 0.1):
+        self.max_rate = rate_per_s
+        self.min_rate = min(min_rate_per_s, rate_per_s)
+        self.rate = rate_per_s
+        self.capacity = capacity
+        self.tokens = capacity
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = max(self.paused_until - now, (tokens - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, now + (retry_after or 1.0 / self.rate))
+
+class GeminiEmbeddingBackend:
+    """Google AI Studio backend; a list of texts becomes one batchEmbedContents call"""
+
+    def __init__(self, model: str = EMBED_MODEL):
+        self.model = model
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        from google.api_core import exceptions as gexc
+        try:
+            resp = genai.embed_content(model=self.model, content=texts)
+        except (gexc.ResourceExhausted, gexc.TooManyRequests) as e:
+            raise RateLimitError(str(e))
+        return resp["embedding"]
+
+class HTTPEmbeddingBackend:
+    """Plain JSON backend, e.g. app/scripts/stub_embed_server.py for local testing.
+
+    POST {base_url}/embed {"model": ..., "texts": [...]} -> {"embeddings": [[...], ...]}
+    """
+
+    def __init__(self, base_url: str, model: str = EMBED_MODEL, timeout: float = 30.0):
+        self.model = model
+        self.client = httpx.Client(base_url=base_url.rstrip("/"), timeout=timeout)
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        resp = self.client.post("/embed", json={"model": self.model, "texts": texts})
+        if resp.status_code == 429:
+            retry_after = resp.headers.get("Retry-After")
+            raise RateLimitError("HTTP 429 from embedding server", float(retry_after) if retry_after else None)
+        resp.raise_for_status()
+        return resp.json()["embeddings"]
+
+@dataclass
+class EmbedStats:
+    texts: int = 0
+    requests: int = 0
+    throttled: int = 0
+    retries: int = 0
+    throttle_exhausted: int = 0
+    failed_texts: int = 0
+    seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    @property
+    def texts_per_s(self) -> float:
+        return self.texts / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.texts} texts in {self.seconds:.2f}s ({self.texts_per_s:.1f} texts/s), "
+                f"{self.requests} requests, {self.throttled} throttled, {self.retries} retries, "
+                f"{self.throttle_exhausted} batches gave up on throttling, {self.failed_texts} failed")
+
+class EmbeddingEngine:
+    """Batched, concurrent, rate-limited embedding of many texts"""
+
+    def __init__(self, backend=None, batch_size: int = None, max_in_flight: int = None,
+                 requests_per_minute: float = None, max_retries: int = None,
+                 max_throttles: int = None):
+        if backend is None:
+            backend = (HTTPEmbeddingBackend(settings.EMBED_BASE_URL) if settings.EMBED_BASE_URL
+                       else GeminiEmbeddingBackend())
+        self.backend = backend
+        self.batch_size = batch_size or settings.EMBED_BATCH_SIZE
+        self.max_in_flight = max_in_flight or settings.EMBED_MAX_IN_FLIGHT
+        self.max_retries = settings.EMBED_MAX_RETRIES if max_retries is None else max_retries
+        self.max_throttles = settings.EMBED_MAX_THROTTLES if max_throttles is None else max_throttles
+        rpm = requests_per_minute or settings.EMBED_REQUESTS_PER_MINUTE
+        self.limiter = TokenBucket(rate_per_s=rpm / 60.0, capacity=max(1.0, float(self.max_in_flight)))
+        self.last_stats = EmbedStats()
+
+    def _embed_one_batch(self, texts: List[str], stats: EmbedStats) -> Optional[np.ndarray]:
+        attempt = 0
+        throttles = 0
+        while True:
+            self.limiter.acquire()
+            stats.incr("requests")
             try:
-                resp = genai.embed_content(model=EMBED_MODEL, content=t)
-                vecs.append(resp["embedding"])
-                time.sleep(0.1)  # Rate limiting
+                vecs = self.backend.embed_batch(texts)
+                self.limiter.on_success()
+                return np.asarray(vecs, dtype="float32")
+            except RateLimitError as e:
+                stats.incr("throttled")
+                self.limiter.on_throttle(e.retry_after)
+                # Throttling is expected under load and has its own, larger budget so that a
+                # quota that never clears (e.g. an exhausted daily limit) still fails the batch
+                throttles += 1
+                if throttles > self.max_throttles:
+                    print(f"Giving up on batch of {len(texts)} texts after {throttles} throttled requests: {e}")
+                    stats.incr("throttle_exhausted")
+                    return None
+                continue
             except Exception as e:
-                print(f"Error embedding text: {e}")
-                # Add zero vector as fallback
-                vecs.append([0.0] * 768)  # text-embedding-004 has 768 dimensions
-        
-        # Small delay between batches
-        time.sleep(0.5)
-    
-    return np.array(vecs, dtype="float32")
+                attempt += 1
+                if attempt > self.max_retries:
+                    print(f"Error embedding batch of {len(texts)} texts: {e}")
+                    return None
+                stats.incr("retries")
+                time.sleep(min(2 ** attempt * 0.25, 8.0))
+
+    def embed(self, texts: List[str], batch_size: Optional[int] = None, verbose: bool = True) -> np.ndarray:
+        """Embed texts in order; batches that fail permanently come back as zero vectors"""
+        batch_size = batch_size or self.batch_size
+        stats = EmbedStats(texts=len(texts))
+        started = time.perf_counter()
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results: List[Optional[np.ndarray]] = [None] * len(batches)
+
+        if len(batches) == 1:
+            # Single queries stay on the caller's thread
+            results[0] = self._embed_one_batch(batches[0], stats)
+        elif batches:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+                futures = {pool.submit(self._embed_one_batch, b, stats): i for i, b in enumerate(batches)}
+                for done, fut in enumerate(as_completed(futures), 1):
+                    results[futures[fut]] = fut.result()
+                    if verbose:
+                        print(f"Embedded batch {done}/{len(batches)}")
+
+        dim = next((r.shape[1] for r in results if r is not None), EMBED_DIM)
+        out = np.zeros((len(texts), dim), dtype="float32")
+        for i, r in enumerate(results):
+            start = i * batch_size
+            if r is None:
+                stats.failed_texts += len(batches[i])
+            else:
+                out[start:start + r.shape[0]] = r
+
+        stats.seconds = time.perf_counter() - started
+        self.last_stats = stats
+        if verbose and len(texts) > 1:
+            print(f"Embedding throughput: {stats.summary()}")
+        return out
+
+_engine = None
+def get_embedding_engine() -> EmbeddingEngine:
+    global _engine
+    if _engine is None:
+        _engine = EmbeddingEngine()
+    return _engine
+
+def embed_texts(texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """Embed texts through the shared engine (batched, concurrent, rate-limited)"""
+    return get_embedding_engine().embed(texts, batch_size=batch_size)
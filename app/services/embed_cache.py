@@ -0,0 +1,89 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embed import EMBED_MODEL, embed_texts
+
+def text_hash(text: str) -> str:
+    """Stable content key for a chunk of text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """On-disk embedding store keyed by (model name, chunk text hash).
+
+    Backed by SQLite so concurrent build scripts can share one file; vectors
+    are stored as raw float32 bytes.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self.conn.commit()
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        with self.lock:
+            for i in range(0, len(hashes), 500):  # stay under SQLite's bound-parameter limit
+                batch = hashes[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT text_hash, dim, vec FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for h, dim, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype="<f4", count=dim)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, np.ndarray]):
+        rows = [(model, h, int(v.shape[0]), np.ascontiguousarray(v, dtype="<f4").tobytes()) for h, v in items.items()]
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+_cache = None
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _cache
+    if _cache is None and settings.EMBED_CACHE_PATH:
+        _cache = EmbeddingCache(settings.EMBED_CACHE_PATH)
+    return _cache
+
+def embed_texts_cached(texts: List[str], cache: Optional[EmbeddingCache] = None, model: str = EMBED_MODEL) -> np.ndarray:
+    """Like embed_texts, but only texts missing from the on-disk cache reach the API"""
+    cache = cache or get_embedding_cache()
+    if cache is None:
+        return embed_texts(texts)
+
+    hashes = [text_hash(t) for t in texts]
+    found = cache.get_many(model, hashes)
+    missing = [h for h in dict.fromkeys(hashes) if h not in found]
+    print(f"Embedding cache: {len(hashes) - sum(h not in found for h in hashes)}/{len(hashes)} hits, {len(missing)} to embed")
+
+    if missing:
+        first_text = {h: t for h, t in zip(reversed(hashes), reversed(texts))}
+        new_vecs = embed_texts([first_text[h] for h in missing])
+        fresh = {h: v for h, v in zip(missing, new_vecs) if np.any(v)}  # never cache failed (zero) embeddings
+        cache.put_many(model, fresh)
+        found.update({h: v for h, v in zip(missing, new_vecs)})
+
+    dim = next(iter(found.values())).shape[0] if found else 0
+    out = np.zeros((len(texts), dim), dtype="float32")
+    for i, h in enumerate(hashes):
+        out[i] = found[h]
+    return out
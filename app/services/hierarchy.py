@@ -0,0 +1,199 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+def _group_keys(meta: pa.Table, page_group: int) -> List[Tuple[str, str]]:
+    """(doc_id, group) per chunk: its section heading, else a page_group-page window"""
+    n = meta.num_rows
+    cols = set(meta.column_names)
+    docs = meta.column("doc_id").to_pylist() if "doc_id" in cols else [""] * n
+    sections = meta.column("section").to_pylist() if "section" in cols else [None] * n
+    pages = meta.column("page_start").to_pylist() if "page_start" in cols else [None] * n
+    keys = []
+    for doc, section, page in zip(docs, sections, pages):
+        if section:
+            keys.append((doc, section))
+        elif page is not None:
+            first = (int(page) - 1) // page_group * page_group + 1
+            keys.append((doc, f"pages {first}-{first + page_group - 1}"))
+        else:
+            keys.append((doc, ""))
+    return keys
+
+class SectionIndex:
+    """Coarse level of a two-level dense index: one centroid per section.
+
+    Chunks are grouped by the page provenance recorded at ingest: (doc_id,
+    section heading), or fixed page windows when a chunk has no section, and
+    groups larger than max_group chunks are cut into runs of consecutive
+    chunks. A query is scored against every group centroid, then exactly
+    against the chunks of its `fan_out` best groups only, so the cost is
+    groups + fan_out x group size rather than the whole corpus.
+
+    Groups are stored CSR-style: members[offsets[g]:offsets[g + 1]] are the
+    chunk rows of group g.
+    """
+
+    ARRAYS = ("centroids", "offsets", "members")
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, members: np.ndarray,
+                 labels: Optional[List[Dict]] = None, params: Optional[Dict] = None):
+        self.centroids = centroids    # (groups, dim) float32, L2-normalised
+        self.offsets = offsets        # (groups + 1,) int64
+        self.members = members        # (chunks,) int64 chunk rows, grouped
+        self.labels = labels or []
+        self.params = params or {}
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, meta: pa.Table, max_group: int = 64,
+              page_group: int = 10) -> Optional["SectionIndex"]:
+        n = meta.num_rows
+        if n == 0 or vectors.shape[0] != n:
+            return None
+        rows_by_key: Dict[Tuple[str, str], List[int]] = {}
+        for row, key in enumerate(_group_keys(meta, page_group)):
+            rows_by_key.setdefault(key, []).append(row)
+
+        pages_start = meta.column("page_start").to_pylist() if "page_start" in meta.column_names else None
+        pages_end = meta.column("page_end").to_pylist() if "page_end" in meta.column_names else None
+        groups, labels = [], []
+        for (doc, section), rows in rows_by_key.items():
+            for i in range(0, len(rows), max_group):
+                part = rows[i:i + max_group]
+                groups.append(part)
+                labels.append({
+                    "doc_id": doc,
+                    "section": section,
+                    "page_start": pages_start[part[0]] if pages_start else None,
+                    "page_end": pages_end[part[-1]] if pages_end else None,
+                    "chunks": len(part),
+                })
+
+        dim = vectors.shape[1]
+        centroids = np.zeros((len(groups), dim), dtype="float32")
+        for g, rows in enumerate(groups):
+            centroids[g] = np.asarray(vectors[rows], dtype="float32").sum(axis=0)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.maximum(norms, 1e-12)
+        offsets = np.zeros(len(groups) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(rows) for rows in groups])
+        members = np.fromiter((r for rows in groups for r in rows), dtype="int64", count=n)
+        return cls(centroids, offsets, members, labels, {"max_group": max_group, "page_group": page_group})
+
+    def __len__(self) -> int:
+        return self.centroids.shape[0]
+
+    def top_groups(self, q: np.ndarray, fan_out: int) -> np.ndarray:
+        """(queries, fan_out) best groups per query row, best first"""
+        scores = q @ self.centroids.T
+        fan_out = min(fan_out, scores.shape[1])
+        top = np.argpartition(-scores, fan_out - 1, axis=1)[:, :fan_out]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def search(self, vectors: np.ndarray, q: np.ndarray, k: int, fan_out: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (ids, scores) per query row, padded with id -1 like Retriever._dense"""
+        ids = np.full((q.shape[0], k), -1, dtype="int64")
+        out = np.zeros((q.shape[0], k), dtype="float32")
+        if len(self) == 0 or k <= 0:
+            return ids, out
+        for i, groups in enumerate(self.top_groups(q, fan_out)):
+            rows = np.concatenate([self.members[self.offsets[g]:self.offsets[g + 1]] for g in groups])
+            scores = np.asarray(vectors[rows]) @ q[i]
+            kk = min(k, rows.size)
+            top = np.argpartition(-scores, kk - 1)[:kk]
+            top = top[np.argsort(-scores[top])]
+            ids[i, :kk] = rows[top]
+            out[i, :kk] = scores[top]
+        return ids, out
+
+    def write(self, bundle: Path) -> Dict[str, str]:
+        """Write into a bundle directory; returns {logical name: relative path} for the manifest"""
+        out = Path(bundle) / "sections"
+        out.mkdir(exist_ok=True)
+        files = {}
+        for name in self.ARRAYS:
+            np.save(out / f"{name}.npy", getattr(self, name))
+            files[f"sections.{name}"] = f"sections/{name}.npy"
+        with open(out / "groups.json", "w", encoding="utf-8") as f:
+            json.dump({"params": self.params, "labels": self.labels}, f)
+        files["sections.groups"] = "sections/groups.json"
+        return files
+
+    @classmethod
+    def open(cls, bundle: Path) -> Optional["SectionIndex"]:
+        """Memory-map a section index written by write(); None if the bundle has none"""
+        src = Path(bundle) / "sections"
+        if not (src / "groups.json").exists():
+            return None
+        with open(src / "groups.json", "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        arrays = {name: np.load(src / f"{name}.npy", mmap_mode="r") for name in cls.ARRAYS}
+        return cls(labels=spec["labels"], params=spec["params"], **arrays)
+
+class SectionIndexBuilder:
+    """Builds a SectionIndex from (vectors, meta) batches arriving in row order.
+
+    A document's chunks arrive together, so only the current document's
+    groups are open at once: a group is closed when it reaches max_group
+    chunks or its document ends, and its member rows are appended to a spill
+    file under work_dir/sections. Memory holds one centroid per group and the
+    open groups, never the chunk vectors. The groups match
+    SectionIndex.build() over the same rows, in closing order.
+    """
+
+    def __init__(self, work_dir: Path, max_group: int = 64, page_group: int = 10):
+        self.dir = Path(work_dir) / "sections"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_group = max_group
+        self.page_group = page_group
+        self.rows = 0
+        self.doc = None
+        self.open: Dict[Tuple[str, str], Dict] = {}
+        self.centroids: List[np.ndarray] = []
+        self.sizes: List[int] = []
+        self.labels: List[Dict] = []
+        self._members = open(self.dir / "members.spill", "wb")
+
+    def _close(self, key: Tuple[str, str]):
+        group = self.open.pop(key)
+        np.asarray(group["rows"], dtype="int64").tofile(self._members)
+        self.centroids.append(group["sum"] / max(float(np.linalg.norm(group["sum"])), 1e-12))
+        self.sizes.append(len(group["rows"]))
+        self.labels.append({"doc_id": key[0], "section": key[1], "page_start": group["page_start"],
+                            "page_end": group["page_end"], "chunks": len(group["rows"])})
+
+    def add(self, vectors: np.ndarray, meta: pa.Table):
+        n = meta.num_rows
+        pages_start = meta.column("page_start").to_pylist() if "page_start" in meta.column_names else [None] * n
+        pages_end = meta.column("page_end").to_pylist() if "page_end" in meta.column_names else [None] * n
+        for i, key in enumerate(_group_keys(meta, self.page_group)):
+            if key[0] != self.doc:
+                for open_key in list(self.open):
+                    self._close(open_key)
+                self.doc = key[0]
+            group = self.open.get(key)
+            if group is None:
+                group = self.open[key] = {"rows": [], "sum": np.zeros(vectors.shape[1], dtype="float32"),
+                                          "page_start": pages_start[i]}
+            group["rows"].append(self.rows + i)
+            group["sum"] += vectors[i]
+            group["page_end"] = pages_end[i]
+            if len(group["rows"]) == self.max_group:
+                self._close(key)
+        self.rows += n
+
+    def finish(self) -> Optional[SectionIndex]:
+        for key in list(self.open):
+            self._close(key)
+        self._members.close()
+        if self.rows == 0:
+            return None
+        offsets = np.zeros(len(self.sizes) + 1, dtype="int64")
+        offsets[1:] = np.cumsum(self.sizes)
+        members = np.memmap(self.dir / "members.spill", dtype="int64", mode="r", shape=(self.rows,))
+        return SectionIndex(np.vstack(self.centroids).astype("float32"), offsets, members, self.labels,
+                            {"max_group": self.max_group, "page_group": self.page_group})
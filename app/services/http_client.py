@@ -0,0 +1,65 @@
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+# One pooled AsyncClient per process (per event loop), shared by every weather
+# provider. main.py's lifespan closes it on shutdown; it is created lazily so
+# scripts and tests that never run the lifespan still work.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_limiters: Dict[str, asyncio.Semaphore] = {}
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (installed by httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+def provider_settings(provider: str) -> Dict:
+    """Per-provider connection cap and timeout from Settings"""
+    if provider == "checkwx":
+        return {"max_connections": settings.CHECKWX_MAX_CONNECTIONS, "timeout": settings.CHECKWX_TIMEOUT_SECONDS}
+    if provider == "metno":
+        return {"max_connections": settings.METNO_MAX_CONNECTIONS, "timeout": settings.METNO_TIMEOUT_SECONDS}
+    return {"max_connections": settings.HTTP_MAX_CONNECTIONS, "timeout": settings.HTTP_TIMEOUT_SECONDS}
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared keep-alive client (HTTP/2 when h2 is installed)"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # A client is bound to the loop that opened its connections
+        _client = httpx.AsyncClient(
+            http2=settings.HTTP2_ENABLED and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=settings.HTTP_TIMEOUT_SECONDS,
+        )
+        _client_loop = loop
+        _limiters.clear()
+    return _client
+
+async def close_http_client():
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client, _client_loop = None, None
+    _limiters.clear()
+
+async def provider_get(provider: str, url: str, **kwargs) -> httpx.Response:
+    """GET through the shared client, within the provider's connection cap and timeout"""
+    client = get_http_client()
+    conf = provider_settings(provider)
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        limiter = _limiters[provider] = asyncio.Semaphore(conf["max_connections"])
+    kwargs.setdefault("timeout", conf["timeout"])
+    async with limiter:
+        return await client.get(url, **kwargs)
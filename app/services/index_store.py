@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+# On-disk layout of a retriever index bundle:
+#
+#   <root>/CURRENT              name of the active version, e.g. "v0003"
+#   <root>/v0003/manifest.json  embedding model, dimension, row count, checksums
+#   <root>/v0003/vectors.f32    raw little-endian float32 matrix, shape (count, dim)
+#   <root>/v0003/meta.arrow     uncompressed Arrow IPC file, one row per vector
+#   <root>/v0003/...            optional attachments (e.g. bm25/), also checksummed
+#
+# Both data files are opened with mmap, so every worker process maps the same
+# page-cache pages instead of unpickling its own private copy.
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.arrow"
+CURRENT_FILE = "CURRENT"
+
+def _sha256(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _next_version(root: Path) -> str:
+    existing = [int(p.name[1:]) for p in root.glob("v[0-9]*") if p.is_dir() and p.name[1:].isdigit()]
+    return f"v{max(existing, default=0) + 1:04d}"
+
+def current_version(root: str) -> Optional[str]:
+    """Name of the active bundle version under root, or None if nothing was written yet"""
+    pointer = Path(root) / CURRENT_FILE
+    if not pointer.exists():
+        return None
+    return pointer.read_text().strip() or None
+
+def resolve_bundle(root: str, version: Optional[str] = None) -> Path:
+    """Directory of the requested (default: current) bundle version"""
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No index bundle found under {root}. Run app/scripts/build_index.py first.")
+    bundle = Path(root) / version
+    if not (bundle / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"Index bundle {bundle} has no {MANIFEST_FILE}")
+    return bundle
+
+def read_manifest(bundle: Path) -> Dict:
+    with open(Path(bundle) / MANIFEST_FILE, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index bundle format {manifest.get('format_version')} in {bundle}")
+    return manifest
+
+def write_bundle(root: str, vectors: np.ndarray, meta: pa.Table, embed_model: str,
+                 extra: Optional[Dict] = None,
+                 attachments: Optional[List[Callable[[Path], Dict[str, str]]]] = None) -> Path:
+    """Write a new bundle version under root and make it current.
+
+    The version directory is assembled under a temporary name and renamed into
+    place, and CURRENT is swapped with os.replace, so readers never observe a
+    half-written bundle. Each attachment is called with that directory, writes
+    its own files and returns {logical name: relative path}; those files are
+    checksummed into the manifest alongside vectors and meta.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    if vectors.ndim != 2:
+        raise ValueError(f"vectors must be 2-D, got shape {vectors.shape}")
+    if meta.num_rows != vectors.shape[0]:
+        raise ValueError(f"meta has {meta.num_rows} rows but there are {vectors.shape[0]} vectors")
+
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+    version = _next_version(root_path)
+    tmp = root_path / f".tmp-{version}"
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir()
+
+    vectors.tofile(tmp / VECTORS_FILE)
+    with pa.OSFile(str(tmp / META_FILE), "wb") as sink:
+        with pa.ipc.new_file(sink, meta.schema) as writer:
+            writer.write_table(meta)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "index_version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embed_model": embed_model,
+        "dim": int(vectors.shape[1]),
+        "count": int(vectors.shape[0]),
+        "metric": "inner_product",
+        "normalized": True,
+        "files": {
+            "vectors": {
+                "path": VECTORS_FILE,
+                "dtype": "float32",
+                "byte_order": "little",
+                "shape": [int(vectors.shape[0]), int(vectors.shape[1])],
+                "bytes": (tmp / VECTORS_FILE).stat().st_size,
+                "sha256": _sha256(tmp / VECTORS_FILE),
+            },
+            "meta": {
+                "path": META_FILE,
+                "format": "arrow_ipc",
+                "columns": meta.schema.names,
+                "bytes": (tmp / META_FILE).stat().st_size,
+                "sha256": _sha256(tmp / META_FILE),
+            },
+        },
+    }
+    for attach in attachments or []:
+        for name, rel in attach(tmp).items():
+            manifest["files"][name] = {"path": rel, "bytes": (tmp / rel).stat().st_size, "sha256": _sha256(tmp / rel)}
+    if extra:
+        manifest.update(extra)
+    with open(tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    bundle = root_path / version
+    os.rename(tmp, bundle)
+    pointer_tmp = root_path / f".{CURRENT_FILE}.tmp"
+    pointer_tmp.write_text(version + "\n")
+    os.replace(pointer_tmp, root_path / CURRENT_FILE)
+    return bundle
+
+def verify_bundle(bundle: Path, manifest: Dict) -> None:
+    """Check every file in the manifest against its recorded checksum"""
+    for name, entry in manifest["files"].items():
+        path = Path(bundle) / entry["path"]
+        if not path.exists():
+            raise ValueError(f"Index bundle file missing: {path}")
+        if path.stat().st_size != entry["bytes"]:
+            raise ValueError(f"Index bundle file {path} has unexpected size")
+        if _sha256(path) != entry["sha256"]:
+            raise ValueError(f"Index bundle file {path} failed checksum verification")
+
+def open_vectors(bundle: Path, manifest: Dict) -> np.ndarray:
+    """Read-only memory map over the vector matrix (no copy, no parse)"""
+    entry = manifest["files"]["vectors"]
+    rows, dim = entry["shape"]
+    path = Path(bundle) / entry["path"]
+    if path.stat().st_size != rows * dim * 4:
+        raise ValueError(f"{path} size does not match shape {rows}x{dim}")
+    if rows == 0:
+        return np.zeros((0, dim), dtype="<f4")
+    return np.memmap(path, dtype="<f4", mode="r", shape=(rows, dim))
+
+def open_meta(bundle: Path, manifest: Dict) -> pa.Table:
+    """Zero-copy Arrow table backed by a memory map of the metadata file"""
+    source = pa.memory_map(str(Path(bundle) / manifest["files"]["meta"]["path"]), "r")
+    return pa.ipc.open_file(source).read_all()
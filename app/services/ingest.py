@@ -1,68 +1,120 @@
 import yaml
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
 from pypdf import PdfReader
-from app.utils.text import clean_text, split_into_chunks
+from app.core.config import settings
+from app.services.chunker import Boilerplate, NearDuplicateFilter, structured_chunks
+from app.services.page_store import PageStore, get_page_store
+from app.services.pdf_extract import extract_pdf, iter_pages, store_pages
+from app.utils.text import clean_text
 
 def load_catalog(path: str = "corpus/catalog.yaml") -> Dict:
     with open(path, "r") as f:
         return yaml.safe_load(f)
 
-def pdf_to_text(pdf_path: str, max_pages: int = 10) -> str:
-    """Extract text from PDF with page limit for testing"""
-    reader = PdfReader(pdf_path)
-    pages = []
-    total_pages = len(reader.pages)
-    pages_to_process = min(max_pages, total_pages)
-    
-    print(f"Processing {pages_to_process} pages out of {total_pages} total pages")
-    
-    for i, p in enumerate(reader.pages[:pages_to_process]):
-        try:
-            pages.append(p.extract_text() or "")
-        except Exception:
-            pages.append("")
-    return clean_text("\n\n".join(pages))
+def pdf_to_text(pdf_path: str, max_pages: Optional[int] = None) -> str:
+    """Extract text from a PDF (all pages unless max_pages is given)"""
+    if max_pages is not None:
+        reader = PdfReader(pdf_path)
+        total_pages = len(reader.pages)
+        print(f"Processing {min(max_pages, total_pages)} pages out of {total_pages} total pages (max_pages={max_pages})")
+        pages = []
+        for p in reader.pages[:max_pages]:
+            try:
+                pages.append(p.extract_text() or "")
+            except Exception:
+                pages.append("")
+        return clean_text("\n\n".join(pages))
+
+    # Sharded, resumable extraction on a process pool (app/services/pdf_extract.py)
+    result = extract_pdf(pdf_path)
+    return clean_text("\n\n".join(page["text"] for page in iter_pages(result["shard_dir"])))
+
+def catalog_doc_id(pdf_path: str, catalog_path: str = "corpus/catalog.yaml") -> str:
+    """Catalog id of a PDF, or its file stem if it is not catalogued"""
+    target = Path(pdf_path).resolve()
+    for doc in load_catalog(catalog_path).get("docs", []):
+        if Path(doc["file"]).resolve() == target:
+            return doc["id"]
+    return target.stem
+
+def ensure_pages(doc: Dict, store: Optional[PageStore] = None) -> bool:
+    """Extract a catalog document into the page store unless it is there; False if its PDF is missing"""
+    store = store or get_page_store()
+    if doc["id"] in store:
+        return True
+    f = Path(doc["file"])
+    if not f.exists():
+        return False
+    print(f"Processing PDF: {doc['title']}...")
+    store_pages(extract_pdf(str(f)), doc["id"], store)
+    return True
+
+def doc_pages(doc: Dict, store: Optional[PageStore] = None, first_page: Optional[int] = None,
+              last_page: Optional[int] = None) -> Iterator[Dict]:
+    """Stream a catalog document's pages from the page store, extracting the PDF first if needed"""
+    store = store or get_page_store()
+    if ensure_pages(doc, store):
+        yield from store.iter_pages(doc["id"], first_page, last_page)
 
-def build_chunk_df(catalog_path: str = "corpus/catalog.yaml", max_chunks_per_doc: int = 100) -> pd.DataFrame:
+def fit_boilerplate(doc_id: str, store: Optional[PageStore] = None) -> Boilerplate:
+    """Header/footer lines of a stored document (one scan of its text column)"""
+    store = store or get_page_store()
+    return Boilerplate(min_pages=settings.BOILERPLATE_MIN_PAGES).fit(store.iter_pages(doc_id, columns=["text"]))
+
+def new_dedup_filter() -> Optional[NearDuplicateFilter]:
+    """Near-duplicate filter for one build, or None when CHUNK_DEDUP_THRESHOLD is 0"""
+    return NearDuplicateFilter(settings.CHUNK_DEDUP_THRESHOLD) if settings.CHUNK_DEDUP_THRESHOLD > 0 else None
+
+def chunk_rows(doc: Dict, pages: Iterable[Dict], max_chars: int = 2000, overlap: int = 200,
+               boilerplate: Optional[Boilerplate] = None, dedup: Optional[NearDuplicateFilter] = None,
+               stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """Chunk rows (catalog metadata + text + page provenance) for one document's page stream.
+
+    Chunks nearly duplicating one already produced in this build (same
+    `dedup` filter) are dropped before they cost an embedding.
+    """
+    idx = 0
+    for ch in structured_chunks(pages, max_chars, overlap, boilerplate, stats):
+        if dedup is not None and dedup.is_duplicate(ch["text"]):
+            continue
+        yield {
+            "doc_id": doc["id"],
+            "title": doc.get("title", ""),
+            "type": doc.get("type", ""),
+            "source": doc.get("source", ""),
+            "date": str(doc.get("date", "")),
+            "restrictions": doc.get("restrictions", ""),
+            "chunk_id": f"{doc['id']}_c{idx}",
+            "chunk_text": ch["text"],
+            "section": ch["section"],
+            "page_start": ch["page_start"],
+            "page_end": ch["page_end"],
+        }
+        idx += 1
+
+def build_chunk_df(catalog_path: str = "corpus/catalog.yaml", max_chunks_per_doc: Optional[int] = None) -> pd.DataFrame:
+    """Every chunk of every catalog document in one DataFrame.
+
+    Holds the whole corpus in memory; app/services/pipeline.py streams the
+    same rows straight into an index instead.
+    """
     cat = load_catalog(catalog_path)
+    store = get_page_store()
     rows: List[Dict] = []
     
+    dedup = new_dedup_filter()
+    
     for doc in cat.get("docs", []):
-        # Try to use pre-processed text file first
-        processed_file = f"data/processed/{Path(doc['file']).stem}_extracted.txt"
-        text_file = Path(processed_file)
-        
-        if text_file.exists():
-            print(f"Using pre-processed text: {processed_file}")
-            with open(text_file, 'r', encoding='utf-8') as f:
-                text = f.read()
-        else:
-            # Fallback to PDF processing
-            f = Path(doc["file"])
-            if not f.exists():
-                continue
-            print(f"Processing PDF: {doc['title']}...")
-            text = pdf_to_text(str(f))
-        
-        chunks = split_into_chunks(text)
-        
-        # Limit chunks to prevent memory issues
-        if len(chunks) > max_chunks_per_doc:
-            print(f"Limiting {doc['title']} to {max_chunks_per_doc} chunks (was {len(chunks)})")
-            chunks = chunks[:max_chunks_per_doc]
-        
-        for idx, ch in enumerate(chunks):
-            rows.append({
-                "doc_id": doc["id"],
-                "title": doc.get("title", ""),
-                "type": doc.get("type", ""),
-                "source": doc.get("source", ""),
-                "date": doc.get("date", ""),
-                "restrictions": doc.get("restrictions", ""),
-                "chunk_id": f"{doc['id']}_c{idx}",
-                "chunk_text": ch
-            })
+        if not ensure_pages(doc, store):
+            continue
+        print(f"Using stored pages: {store.path_for(doc['id'])}")
+        boilerplate = fit_boilerplate(doc["id"], store)
+        rows.extend(islice(chunk_rows(doc, doc_pages(doc, store), boilerplate=boilerplate, dedup=dedup),
+                           max_chunks_per_doc))
+    if dedup is not None and dedup.dropped:
+        print(f"Dropped {dedup.dropped} near-duplicate chunks")
     
     return pd.DataFrame(rows)
@@ -0,0 +1,196 @@
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how i if in is it of on or that the this to was what when where which with do does".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+def _postings(texts: List[str], vocab: Dict[str, int], first_doc: int = 0):
+    """(term ids, doc ids, term frequencies, doc lengths) for texts, growing vocab in place"""
+    terms: List[int] = []
+    docs: List[int] = []
+    freqs: List[int] = []
+    doc_len = np.zeros(len(texts), dtype="float32")
+    for d, text in enumerate(texts):
+        toks = tokenize(text or "")
+        doc_len[d] = len(toks)
+        for term, tf in Counter(toks).items():
+            terms.append(vocab.setdefault(term, len(vocab)))
+            docs.append(first_doc + d)
+            freqs.append(tf)
+    return (np.asarray(terms, dtype="int32"), np.asarray(docs, dtype="int32"),
+            np.asarray(freqs, dtype="float32"), doc_len)
+
+def _term_stats(df: np.ndarray, n_docs: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(term_ptr, idf) from per-term document frequencies"""
+    term_ptr = np.zeros(df.shape[0] + 1, dtype="int64")
+    np.cumsum(df, out=term_ptr[1:])
+    n = max(n_docs, 1)
+    return term_ptr, np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype("float32")
+
+class BM25Index:
+    """Okapi BM25 over an inverted index stored as CSR arrays.
+
+    Postings for term t are doc_ids[term_ptr[t]:term_ptr[t + 1]] with matching
+    term frequencies in tfs, so a query touches only the postings of its own
+    terms and never needs an embedding call.
+    """
+
+    ARRAYS = ("term_ptr", "doc_ids", "tfs", "doc_len", "idf")
+
+    def __init__(self, vocab: Dict[str, int], term_ptr: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray, idf: np.ndarray, k1: float = 1.2, b: float = 0.75):
+        self.vocab = vocab
+        self.term_ptr = term_ptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.idf = idf
+        self.k1 = k1
+        self.b = b
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    @property
+    def n_docs(self) -> int:
+        return int(self.doc_len.shape[0])
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        terms, docs, freqs, doc_len = _postings(texts, vocab)
+        order = np.argsort(terms, kind="stable")  # keeps doc order within each term
+        term_ptr, idf = _term_stats(np.bincount(terms, minlength=len(vocab)), len(texts))
+        return cls(vocab, term_ptr, docs[order], freqs[order], doc_len, idf, k1, b)
+
+    def search(self, query: str, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (doc ids, scores), best first; only documents sharing a term with the query"""
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or self.n_docs == 0:
+            return np.zeros(0, dtype="int64"), np.zeros(0, dtype="float32")
+        scores = np.zeros(self.n_docs, dtype="float32")
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len / max(self.avgdl, 1e-9))
+        for t in term_ids:
+            s, e = self.term_ptr[t], self.term_ptr[t + 1]
+            docs, tf = self.doc_ids[s:e], self.tfs[s:e]
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1.0) / (tf + norm[docs])
+        matched = np.flatnonzero(scores)
+        k = min(k, matched.shape[0])
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top, scores[top]
+
+    def write(self, bundle: Path) -> Dict[str, str]:
+        """Write into a bundle directory; returns {logical name: relative path} for the manifest"""
+        out = Path(bundle) / "bm25"
+        out.mkdir(exist_ok=True)
+        files = {}
+        for name in self.ARRAYS:
+            np.save(out / f"{name}.npy", getattr(self, name))
+            files[f"bm25.{name}"] = f"bm25/{name}.npy"
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(out / "vocab.json", "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "terms": terms}, f)
+        files["bm25.vocab"] = "bm25/vocab.json"
+        return files
+
+    @classmethod
+    def open(cls, bundle: Path) -> Optional["BM25Index"]:
+        """Memory-map a lexical index written by write(); None if the bundle has none"""
+        src = Path(bundle) / "bm25"
+        if not (src / "vocab.json").exists():
+            return None
+        with open(src / "vocab.json", "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        arrays = {name: np.load(src / f"{name}.npy", mmap_mode="r") for name in cls.ARRAYS}
+        vocab = {t: i for i, t in enumerate(spec["terms"])}
+        return cls(vocab, k1=spec["k1"], b=spec["b"], **arrays)
+
+class BM25Builder:
+    """Builds a BM25Index one batch of documents at a time, in bounded memory.
+
+    Each batch's postings are appended to spill files under work_dir/bm25;
+    finish() orders them by term with a blockwise counting sort straight into
+    memory-mapped .npy files, so only the vocabulary and one block of
+    postings are ever held in memory. The result has the layout of
+    BM25Index.write(), and BM25Index.open(work_dir) reopens it.
+    """
+
+    SPILL = {"terms": "int32", "docs": "int32", "tfs": "float32", "doc_len": "float32"}
+
+    def __init__(self, work_dir: Path, k1: float = 1.2, b: float = 0.75, block: int = 1 << 20):
+        self.dir = Path(work_dir) / "bm25"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.block = block
+        self.vocab: Dict[str, int] = {}
+        self.n_docs = 0
+        self.n_postings = 0
+        self._spill = {name: open(self.dir / f"{name}.spill", "wb") for name in self.SPILL}
+
+    def add(self, texts: List[str]):
+        arrays = _postings(texts, self.vocab, self.n_docs)
+        for name, arr in zip(self.SPILL, arrays):
+            arr.tofile(self._spill[name])
+        self.n_docs += len(texts)
+        self.n_postings += arrays[0].shape[0]
+
+    def _read_spill(self, name: str, count: int) -> np.ndarray:
+        if count == 0:
+            return np.zeros(0, dtype=self.SPILL[name])
+        return np.memmap(self.dir / f"{name}.spill", dtype=self.SPILL[name], mode="r", shape=(count,))
+
+    def finish(self) -> BM25Index:
+        for f in self._spill.values():
+            f.close()
+        n, v = self.n_postings, len(self.vocab)
+        terms, docs, tfs = (self._read_spill(name, n) for name in ("terms", "docs", "tfs"))
+
+        df = np.zeros(v, dtype="int64")
+        for start in range(0, n, self.block):
+            df += np.bincount(terms[start:start + self.block], minlength=v)
+        term_ptr, idf = _term_stats(df, self.n_docs)
+
+        out_docs = np.lib.format.open_memmap(self.dir / "doc_ids.npy", mode="w+", dtype="int32", shape=(n,))
+        out_tfs = np.lib.format.open_memmap(self.dir / "tfs.npy", mode="w+", dtype="float32", shape=(n,))
+        cursor = term_ptr[:-1].copy()   # next free slot per term
+        for start in range(0, n, self.block):
+            block_terms = np.asarray(terms[start:start + self.block])
+            order = np.argsort(block_terms, kind="stable")   # spill is in doc order, so each term stays sorted by doc
+            sorted_terms = block_terms[order]
+            rank = np.arange(sorted_terms.shape[0]) - np.searchsorted(sorted_terms, sorted_terms)
+            slots = cursor[sorted_terms] + rank
+            out_docs[slots] = np.asarray(docs[start:start + self.block])[order]
+            out_tfs[slots] = np.asarray(tfs[start:start + self.block])[order]
+            cursor += np.bincount(sorted_terms, minlength=v)
+        out_docs.flush()
+        out_tfs.flush()
+        del out_docs, out_tfs, terms, docs, tfs
+
+        np.save(self.dir / "term_ptr.npy", term_ptr)
+        np.save(self.dir / "idf.npy", idf)
+        np.save(self.dir / "doc_len.npy", self._read_spill("doc_len", self.n_docs))
+        with open(self.dir / "vocab.json", "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "terms": sorted(self.vocab, key=self.vocab.get)}, f)
+        for name in self.SPILL:
+            (self.dir / f"{name}.spill").unlink()
+        return BM25Index.open(self.dir.parent)
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, c: float = 60.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse several best-first id lists: score(d) = sum over lists of 1 / (c + rank)"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            fused[int(doc)] = fused.get(int(doc), 0.0) + 1.0 / (c + rank + 1)
+    best = sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+    return (np.asarray([d for d, _ in best], dtype="int64"),
+            np.asarray([s for _, s in best], dtype="float32"))
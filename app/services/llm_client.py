@@ -1,4 +1,6 @@
-from typing import List, Dict
+import asyncio
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict, Optional
 import google.generativeai as genai
 from app.core.config import settings
 
@@ -7,30 +9,122 @@ if not settings.GOOGLE_API_KEY:
     raise RuntimeError("GOOGLE_API_KEY is missing. Set it in your .env file.")
 genai.configure(api_key=settings.GOOGLE_API_KEY)
 
+class LLMTimeoutError(TimeoutError):
+    """The model did not answer within the per-call timeout"""
+
+@lru_cache(maxsize=8)
+def get_model(model_name: str = settings.GEMINI_MODEL) -> genai.GenerativeModel:
+    """Model handles are reused; the underlying gRPC channels are pooled by the SDK per process"""
+    return genai.GenerativeModel(model_name)
+
+def _build_prompt(messages: List[Dict[str, str]]) -> str:
+    # Gemini prefers "generate_content" with one or more parts
+    # We pass system instruction and user content together.
+    system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    user = "\n".join(m["content"] for m in messages if m["role"] == "user")
+    return f"{system}\n\nUser:\n{user}"
+
+def _generation_config() -> Dict:
+    return {
+        "temperature": settings.REQUEST_TEMPERATURE,
+        "max_output_tokens": settings.REQUEST_MAX_OUTPUT_TOKENS,
+    }
+
+def _response_text(resp, strip: bool = True) -> str:
+    # Handle empty or safety-blocked responses
+    try:
+        text = getattr(resp, "text", "") or ""
+    except ValueError:
+        text = ""  # .text raises when every candidate was blocked
+    return text.strip() if strip else text
+
 def chat_completion(messages: List[Dict[str, str]]) -> str:
     """
     Very small wrapper to call Gemini with a system+user message list.
     Expects messages like:
     [{"role":"system","content":"..."}, {"role":"user","content":"..."}]
     Returns the text output.
-    """
-    # Build a single prompt string from messages
-    system = "\n".join(m["content"] for m in messages if m["role"] == "system")
-    user = "\n".join(m["content"] for m in messages if m["role"] == "user")
 
-    model = genai.GenerativeModel(settings.GEMINI_MODEL)
-    # Gemini prefers "generate_content" with one or more parts
-    # We pass system instruction and user content together.
-    prompt = f"{system}\n\nUser:\n{user}"
-
-    resp = model.generate_content(
-        prompt,
-        generation_config={
-            "temperature": settings.REQUEST_TEMPERATURE,
-            "max_output_tokens": settings.REQUEST_MAX_OUTPUT_TOKENS,
-        },
+    Blocking; scripts only. Request handlers use chat_completion_async.
+    """
+    resp = get_model().generate_content(
+        _build_prompt(messages),
+        generation_config=_generation_config(),
         safety_settings=None,  # use defaults; you can tune later
+        request_options={"timeout": settings.REQUEST_TIMEOUT_SECONDS},
     )
-    # Handle empty or safety-blocked responses
-    text = getattr(resp, "text", "") or ""
-    return text.strip()
+    return _response_text(resp)
+
+_semaphore: Optional[asyncio.Semaphore] = None
+def _limiter() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+async def chat_completion_async(messages: List[Dict[str, str]], timeout: Optional[float] = None,
+                                model_name: Optional[str] = None) -> str:
+    """Non-blocking chat_completion.
+
+    At most LLM_MAX_CONCURRENCY calls run at once; the rest wait without
+    holding the event loop. Raises LLMTimeoutError after `timeout` seconds
+    (default REQUEST_TIMEOUT_SECONDS). Cancelling the awaiting task, e.g. on
+    client disconnect, cancels the upstream call.
+    """
+    timeout = timeout or settings.REQUEST_TIMEOUT_SECONDS
+    model = get_model(model_name or settings.GEMINI_MODEL)
+    async with _limiter():
+        try:
+            resp = await asyncio.wait_for(
+                model.generate_content_async(
+                    _build_prompt(messages),
+                    generation_config=_generation_config(),
+                    safety_settings=None,
+                    request_options={"timeout": timeout},
+                ),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Model did not respond within {timeout:.0f}s")
+    return _response_text(resp)
+
+async def stream_chat_completion(messages: List[Dict[str, str]], timeout: Optional[float] = None,
+                                 model_name: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield the completion text piece by piece as Gemini generates it.
+
+    `timeout` bounds the wait for each piece, not the whole answer. Closing
+    the generator (aclose, or the consumer being cancelled) closes the
+    upstream stream, so a disconnected client stops generation.
+    """
+    timeout = timeout or settings.REQUEST_TIMEOUT_SECONDS
+    model = get_model(model_name or settings.GEMINI_MODEL)
+    async with _limiter():
+        try:
+            resp = await asyncio.wait_for(
+                model.generate_content_async(
+                    _build_prompt(messages),
+                    generation_config=_generation_config(),
+                    safety_settings=None,
+                    stream=True,
+                    request_options={"timeout": timeout},
+                ),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Model did not start responding within {timeout:.0f}s")
+        chunks = resp.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise LLMTimeoutError(f"Model stalled for {timeout:.0f}s mid-stream")
+                text = _response_text(chunk, strip=False)  # keep inter-chunk whitespace
+                if text:
+                    yield text
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
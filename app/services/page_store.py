@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+
+PAGE_SCHEMA = pa.schema([
+    ("doc_id", pa.string()),
+    ("page", pa.int32()),          # 1-based PDF page number
+    ("text", pa.string()),         # raw extracted text, uncleaned
+    ("char_count", pa.int32()),
+    ("error", pa.string()),        # extraction error, null for good pages
+])
+METADATA_KEY = b"aviagenai.pages"
+
+class PageStore:
+    """Extracted PDF pages as compressed Parquet, one file per document.
+
+    Each `<doc_id>.parquet` is sorted by page and written in row groups of
+    PAGE_STORE_ROW_GROUP_PAGES pages, so row-group statistics let a scan
+    filtered by document and page range skip files and row groups without
+    decompressing them. Pages are read back as a stream of record batches,
+    never as a whole document.
+    """
+
+    def __init__(self, root: Optional[str] = None, row_group_pages: Optional[int] = None):
+        self.root = Path(root or settings.PAGE_STORE_DIR)
+        self.row_group_pages = row_group_pages or settings.PAGE_STORE_ROW_GROUP_PAGES
+
+    def path_for(self, doc_id: str) -> Path:
+        return self.root / f"{doc_id}.parquet"
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self.path_for(doc_id).exists()
+
+    def documents(self) -> List[str]:
+        return sorted(p.stem for p in self.root.glob("*.parquet")) if self.root.exists() else []
+
+    def write_document(self, doc_id: str, pages: Iterable[Dict], metadata: Optional[Dict] = None) -> Dict:
+        """Replace a document's pages from a page-ordered stream of {page, text, error?} records.
+
+        Pages are buffered one row group at a time and the file is renamed
+        into place when complete, so readers never see a partial document.
+        Returns the document metadata stored in the file footer.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(doc_id)
+        tmp = path.with_suffix(".parquet.tmp")
+        stats = {"total_pages": 0, "total_characters": 0, "pages_processed": 0, "pages_with_errors": 0}
+        info = {"extraction_date": time.strftime("%Y-%m-%dT%H:%M:%S"), **(metadata or {}), "doc_id": doc_id}
+        try:
+            with pq.ParquetWriter(str(tmp), PAGE_SCHEMA, compression="zstd") as writer:
+                batch: List[Dict] = []
+                for record in pages:
+                    text = record.get("text") or ""
+                    batch.append({"doc_id": doc_id, "page": int(record["page"]), "text": text,
+                                  "char_count": len(text), "error": record.get("error")})
+                    stats["total_pages"] += 1
+                    stats["total_characters"] += len(text)
+                    stats["pages_processed"] += int(bool(text))
+                    stats["pages_with_errors"] += int(record.get("error") is not None)
+                    if len(batch) >= self.row_group_pages:
+                        writer.write_table(pa.Table.from_pylist(batch, schema=PAGE_SCHEMA))
+                        batch = []
+                if batch:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=PAGE_SCHEMA))
+                info.update(stats)
+                writer.add_key_value_metadata({METADATA_KEY: json.dumps(info).encode()})
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return info
+
+    def delete(self, doc_id: str) -> bool:
+        path = self.path_for(doc_id)
+        if not path.exists():
+            return False
+        path.unlink()
+        return True
+
+    def metadata(self, doc_id: str) -> Optional[Dict]:
+        """Document metadata (source file, page and character counts) from the file footer"""
+        path = self.path_for(doc_id)
+        if not path.exists():
+            return None
+        kv = pq.ParquetFile(str(path)).metadata.metadata or {}
+        return json.loads(kv.get(METADATA_KEY, b"{}"))
+
+    def _filter(self, doc_ids: Optional[List[str]], first_page: Optional[int], last_page: Optional[int]):
+        expr = None
+        for term in (
+            ds.field("doc_id").isin(doc_ids) if doc_ids else None,
+            ds.field("page") >= first_page if first_page is not None else None,
+            ds.field("page") <= last_page if last_page is not None else None,
+        ):
+            if term is not None:
+                expr = term if expr is None else expr & term
+        return expr
+
+    def scan(self, doc_ids: Optional[List[str]] = None, first_page: Optional[int] = None,
+             last_page: Optional[int] = None, columns: Optional[List[str]] = None,
+             batch_size: int = 256) -> Iterator[pa.RecordBatch]:
+        """Record batches of matching pages, in document then page order.
+
+        Only the files of the requested documents are opened, and row groups
+        whose page statistics fall outside the range are skipped.
+        """
+        docs = [d for d in (doc_ids or self.documents()) if d in self]
+        for doc_id in docs:
+            dataset = ds.dataset(str(self.path_for(doc_id)), format="parquet")
+            yield from dataset.to_batches(columns=columns, filter=self._filter(None, first_page, last_page),
+                                          batch_size=batch_size)
+
+    def iter_pages(self, doc_id: Optional[str] = None, first_page: Optional[int] = None,
+                   last_page: Optional[int] = None, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Page records ({doc_id, page, text, char_count, error}) one batch in memory at a time"""
+        for batch in self.scan([doc_id] if doc_id else None, first_page, last_page, columns):
+            yield from batch.to_pylist()
+
+    def read(self, doc_ids: Optional[List[str]] = None, first_page: Optional[int] = None,
+             last_page: Optional[int] = None, columns: Optional[List[str]] = None) -> pa.Table:
+        """Matching pages as one table, with predicate pushdown across every document"""
+        paths = [str(self.path_for(d)) for d in (doc_ids or self.documents()) if d in self]
+        if not paths:
+            return PAGE_SCHEMA.empty_table().select(columns or PAGE_SCHEMA.names)
+        dataset = ds.dataset(paths, schema=PAGE_SCHEMA, format="parquet")
+        return dataset.to_table(columns=columns, filter=self._filter(doc_ids, first_page, last_page))
+
+    def stats(self) -> Dict:
+        docs = self.documents()
+        pages = chars = size = 0
+        for doc_id in docs:
+            meta = self.metadata(doc_id) or {}
+            pages += meta.get("total_pages", 0)
+            chars += meta.get("total_characters", 0)
+            size += self.path_for(doc_id).stat().st_size
+        return {"documents": len(docs), "pages": pages, "characters": chars, "bytes": size}
+
+_page_store: Optional[PageStore] = None
+def get_page_store() -> PageStore:
+    global _page_store
+    if _page_store is None:
+        _page_store = PageStore()
+    return _page_store
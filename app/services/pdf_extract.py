@@ -0,0 +1,222 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.page_store import PageStore, get_page_store
+
+# Readers opened by this worker process, so consecutive shards of the same
+# file do not re-parse its cross-reference table
+_readers: Dict[str, object] = {}
+
+def _reader(pdf_path: str):
+    reader = _readers.get(pdf_path)
+    if reader is None:
+        from pypdf import PdfReader
+        _readers.clear()  # one document at a time per worker
+        reader = _readers[pdf_path] = PdfReader(pdf_path)
+    return reader
+
+def page_count(pdf_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(pdf_path).pages)
+
+def plan_shards(total_pages: int, shard_pages: int) -> List[Tuple[int, int]]:
+    """[start, end) page ranges (0-based) of at most shard_pages pages"""
+    return [(s, min(s + shard_pages, total_pages)) for s in range(0, total_pages, shard_pages)]
+
+def shard_name(start: int, end: int) -> str:
+    return f"pages_{start + 1:06d}-{end:06d}.jsonl"
+
+def extract_shard(pdf_path: str, start: int, end: int, out_path: str) -> Dict:
+    """Extract pages [start, end) to a JSON-lines file; runs in a worker process.
+
+    The file is written under a temporary name and renamed when complete, so
+    an existing shard file is always a finished shard.
+    """
+    started = time.perf_counter()
+    reader = _reader(pdf_path)
+    tmp = out_path + ".tmp"
+    chars = errors = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for i in range(start, end):
+            record = {"page": i + 1}
+            try:
+                text = reader.pages[i].extract_text() or ""
+            except Exception as e:
+                text = ""
+                record["error"] = str(e)
+                errors += 1
+            record["text"] = text
+            record["char_count"] = len(text)
+            chars += len(text)
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp, out_path)
+    return {"start": start, "end": end, "pages": end - start, "chars": chars, "errors": errors,
+            "seconds": time.perf_counter() - started}
+
+def _fingerprint(pdf_path: str) -> Dict:
+    stat = os.stat(pdf_path)
+    return {"source_file": str(pdf_path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+def shard_dir_for(pdf_path: str, out_dir: Optional[str] = None) -> Path:
+    return Path(out_dir or settings.PDF_EXTRACT_DIR) / Path(pdf_path).stem
+
+def _prepare(pdf_path: str, out_dir: Optional[str], shard_pages: int, verbose: bool) -> Dict:
+    """Shard directory and manifest for a run, reusing an earlier run's shards when it matches"""
+    shard_dir = shard_dir_for(pdf_path, out_dir)
+    manifest_path = shard_dir / "manifest.json"
+
+    fingerprint = {**_fingerprint(pdf_path), "shard_pages": shard_pages}
+    manifest = None
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if {k: manifest.get(k) for k in fingerprint} != fingerprint:
+            if verbose:
+                print(f"♻️ {pdf_path} or the shard size changed since the last extraction; starting over")
+            shutil.rmtree(shard_dir)
+            manifest = None
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    if manifest is None:
+        manifest = {**fingerprint, "total_pages": page_count(pdf_path), "shards": {}}
+        _write_manifest(manifest_path, manifest)
+    return {"shard_dir": shard_dir, "manifest_path": manifest_path, "manifest": manifest,
+            "shards": plan_shards(manifest["total_pages"], shard_pages)}
+
+def _run_shards(pdf_path: str, run: Dict, todo: List[Tuple[int, int]], workers: int,
+                verbose: bool) -> Iterator[Dict]:
+    """Extract the `todo` shards on a process pool, yielding each shard's stats as it finishes.
+
+    At most 2 x workers shards are in flight; a consumer that stops pulling
+    leaves the pool idle rather than running ahead.
+    """
+    shard_dir, manifest = run["shard_dir"], run["manifest"]
+    done_pages = manifest["total_pages"] - sum(e - s for s, e in todo)
+    started = time.perf_counter()
+    pages_run = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        queue = iter(todo)
+        pending = set()
+        while True:
+            while len(pending) < workers * 2:
+                nxt = next(queue, None)
+                if nxt is None:
+                    break
+                s, e = nxt
+                pending.add(pool.submit(extract_shard, str(pdf_path), s, e, str(shard_dir / shard_name(s, e))))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stats = future.result()
+                pages_run += stats["pages"]
+                manifest["shards"][shard_name(stats["start"], stats["end"])] = {
+                    k: stats[k] for k in ("pages", "chars", "errors")
+                }
+                _write_manifest(run["manifest_path"], manifest)
+                if verbose:
+                    elapsed = time.perf_counter() - started
+                    print(f"  ✅ pages {stats['start'] + 1}-{stats['end']} "
+                          f"({done_pages + pages_run}/{manifest['total_pages']}, {pages_run / elapsed:.1f} pages/s)")
+                yield stats
+
+def _finish(run: Dict, pages_run: int, done_pages: int, elapsed: float, verbose: bool) -> Dict:
+    manifest = run["manifest"]
+    manifest["complete"] = True
+    _write_manifest(run["manifest_path"], manifest)
+    result = {
+        **manifest,
+        "shard_dir": str(run["shard_dir"]),
+        "pages_extracted": pages_run,
+        "pages_resumed": done_pages,
+        "seconds": round(elapsed, 2),
+        "pages_per_second": round(pages_run / elapsed, 1) if pages_run and elapsed else None,
+    }
+    if verbose:
+        rate = f", {result['pages_per_second']} pages/s" if result["pages_per_second"] else ""
+        print(f"✅ Extracted {pages_run} pages in {elapsed:.1f}s{rate} (resumed {done_pages})")
+    return result
+
+def extract_pdf(pdf_path: str, out_dir: Optional[str] = None, workers: Optional[int] = None,
+                shard_pages: Optional[int] = None, verbose: bool = True) -> Dict:
+    """Extract every page of a PDF into page-range shards on a process pool.
+
+    Shards already on disk from an earlier run over the same file (same size,
+    mtime and shard size in the manifest) are skipped, so an interrupted run
+    resumes where it stopped. At most 2 x workers shards are in flight, and
+    each worker holds one shard's text, so memory does not grow with the
+    document. Returns the manifest with run statistics.
+    """
+    workers = workers or settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+    run = _prepare(pdf_path, out_dir, shard_pages or settings.PDF_SHARD_PAGES, verbose)
+    todo = [(s, e) for s, e in run["shards"] if not (run["shard_dir"] / shard_name(s, e)).exists()]
+    done_pages = run["manifest"]["total_pages"] - sum(e - s for s, e in todo)
+    if verbose:
+        print(f"📄 {pdf_path}: {run['manifest']['total_pages']} pages in {len(run['shards'])} shards, "
+              f"{len(run['shards']) - len(todo)} already done, {workers} workers")
+
+    started = time.perf_counter()
+    pages_run = sum(stats["pages"] for stats in _run_shards(pdf_path, run, todo, workers, verbose))
+    return _finish(run, pages_run, done_pages, time.perf_counter() - started, verbose)
+
+def stream_pdf(pdf_path: str, out_dir: Optional[str] = None, workers: Optional[int] = None,
+               shard_pages: Optional[int] = None, verbose: bool = True) -> Iterator[Dict]:
+    """Page records in page order while the extraction is still running.
+
+    Same shards, resume and pool as extract_pdf, but each shard's pages are
+    yielded as soon as it and every shard before it are finished, so the
+    first pages are available after one shard rather than the whole PDF.
+    """
+    workers = workers or settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+    run = _prepare(pdf_path, out_dir, shard_pages or settings.PDF_SHARD_PAGES, verbose)
+    shard_dir, shards = run["shard_dir"], run["shards"]
+    todo = [(s, e) for s, e in shards if not (shard_dir / shard_name(s, e)).exists()]
+    done_pages = run["manifest"]["total_pages"] - sum(e - s for s, e in todo)
+    if verbose:
+        print(f"📄 {pdf_path}: {run['manifest']['total_pages']} pages in {len(shards)} shards, "
+              f"{len(shards) - len(todo)} already done, {workers} workers (streaming)")
+
+    started = time.perf_counter()
+    ready = set(shards).difference(todo)
+    nxt = pages_run = 0
+
+    def in_order() -> Iterator[Dict]:
+        nonlocal nxt
+        while nxt < len(shards) and shards[nxt] in ready:
+            yield from _read_shard(shard_dir / shard_name(*shards[nxt]))
+            nxt += 1
+
+    yield from in_order()
+    for stats in _run_shards(pdf_path, run, todo, workers, verbose):
+        pages_run += stats["pages"]
+        ready.add((stats["start"], stats["end"]))
+        yield from in_order()
+    _finish(run, pages_run, done_pages, time.perf_counter() - started, verbose)
+
+def _write_manifest(path: Path, manifest: Dict):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+def _read_shard(path: Path) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def iter_pages(shard_dir: str) -> Iterator[Dict]:
+    """Page records in page order, one shard in memory at a time"""
+    for path in sorted(Path(shard_dir).glob("pages_*.jsonl")):
+        yield from _read_shard(path)
+
+def store_pages(result: Dict, doc_id: Optional[str] = None, store: Optional[PageStore] = None) -> Dict:
+    """Stream the shards of an extraction into the page store (doc_id defaults to the file stem)"""
+    store = store or get_page_store()
+    doc_id = doc_id or Path(result["source_file"]).stem
+    return store.write_document(doc_id, iter_pages(result["shard_dir"]),
+                                metadata={"source_file": result["source_file"]})
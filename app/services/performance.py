@@ -0,0 +1,141 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import yaml
+
+from app.core.config import settings
+
+# ISA troposphere (ICAO Doc 7488)
+ISA_P0_HPA = 1013.25
+ISA_T0_K = 288.15
+ISA_LAPSE_K_PER_FT = 0.0019812
+ISA_EXPONENT = 5.255877          # g / (R * L)
+
+def isa_temperature_c(pressure_alt_ft):
+    return ISA_T0_K - ISA_LAPSE_K_PER_FT * np.asarray(pressure_alt_ft, dtype="float64") - 273.15
+
+def pressure_altitude_ft(elevation_ft, qnh_hpa=None):
+    """Pressure altitude at a field from its elevation and QNH (ISA, not 30 ft/hPa)"""
+    if isinstance(elevation_ft, (int, float)) and (qnh_hpa is None or isinstance(qnh_hpa, (int, float))):
+        # One field (METAR decoding): plain floats avoid NumPy's per-call overhead
+        if qnh_hpa is None:
+            return float(elevation_ft)
+        return elevation_ft + (ISA_T0_K / ISA_LAPSE_K_PER_FT) * (1.0 - (qnh_hpa / ISA_P0_HPA) ** (1.0 / ISA_EXPONENT))
+    elevation = np.asarray(elevation_ft, dtype="float64")
+    if qnh_hpa is None:
+        return elevation
+    qnh = np.asarray(qnh_hpa, dtype="float64")
+    correction = (ISA_T0_K / ISA_LAPSE_K_PER_FT) * (1.0 - (qnh / ISA_P0_HPA) ** (1.0 / ISA_EXPONENT))
+    return elevation + correction
+
+def density_altitude_ft(pressure_alt_ft, oat_c):
+    """Altitude in the ISA with the same air density as (pressure altitude, OAT)"""
+    if isinstance(pressure_alt_ft, (int, float)) and isinstance(oat_c, (int, float)):
+        sigma = (1.0 - ISA_LAPSE_K_PER_FT * pressure_alt_ft / ISA_T0_K) ** ISA_EXPONENT * ISA_T0_K / (oat_c + 273.15)
+        return (ISA_T0_K / ISA_LAPSE_K_PER_FT) * (1.0 - sigma ** (1.0 / (ISA_EXPONENT - 1.0)))
+    pa = np.asarray(pressure_alt_ft, dtype="float64")
+    oat_k = np.asarray(oat_c, dtype="float64") + 273.15
+    pressure_ratio = (1.0 - ISA_LAPSE_K_PER_FT * pa / ISA_T0_K) ** ISA_EXPONENT
+    sigma = pressure_ratio * ISA_T0_K / oat_k
+    return (ISA_T0_K / ISA_LAPSE_K_PER_FT) * (1.0 - sigma ** (1.0 / (ISA_EXPONENT - 1.0)))
+
+def density_ratio(pressure_alt_ft, oat_c):
+    """sigma = rho / rho0"""
+    pa = np.asarray(pressure_alt_ft, dtype="float64")
+    return (1.0 - ISA_LAPSE_K_PER_FT * pa / ISA_T0_K) ** ISA_EXPONENT * ISA_T0_K / (np.asarray(oat_c, dtype="float64") + 273.15)
+
+class PerformanceGrid:
+    """Table on a rectilinear grid with vectorized multilinear interpolation.
+
+    `axes` are increasing 1-D breakpoints (2 axes: bilinear, 3: trilinear);
+    `values` has shape tuple(len(a) for a in axes). Points outside the grid
+    are clamped to its edge and reported, never extrapolated.
+    """
+
+    def __init__(self, name: str, axis_names: Sequence[str], axes: Sequence[Sequence[float]], values, units: str = ""):
+        self.name = name
+        self.axis_names = list(axis_names)
+        self.axes = [np.asarray(a, dtype="float64") for a in axes]
+        self.values = np.asarray(values, dtype="float64")
+        self.units = units
+        if self.values.shape != tuple(a.size for a in self.axes):
+            raise ValueError(f"{name}: values shape {self.values.shape} does not match axes")
+        if any(np.any(np.diff(a) <= 0) for a in self.axes):
+            raise ValueError(f"{name}: axes must be strictly increasing")
+
+    def __call__(self, *coords) -> Dict[str, np.ndarray]:
+        """Interpolate at broadcast coordinates (one array per axis, in axis order)"""
+        coords = np.broadcast_arrays(*(np.asarray(c, dtype="float64") for c in coords))
+        shape = coords[0].shape
+        lower, frac = [], []
+        clamped = np.zeros(shape, dtype=bool)
+        for axis, c in zip(self.axes, coords):
+            x = np.clip(c, axis[0], axis[-1])
+            clamped |= x != c
+            i = np.clip(np.searchsorted(axis, x, side="right") - 1, 0, axis.size - 2)
+            lower.append(i)
+            frac.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+        # Weighted sum over the 2**d corners of each point's cell
+        result = np.zeros(shape)
+        for corner in range(1 << len(self.axes)):
+            index, weight = [], np.ones(shape)
+            for d in range(len(self.axes)):
+                upper = (corner >> d) & 1
+                index.append(lower[d] + upper)
+                weight = weight * (frac[d] if upper else 1.0 - frac[d])
+            result += weight * self.values[tuple(index)]
+        return {"value": result, "clamped": clamped}
+
+class PerformanceTables:
+    """The T-6 takeoff/landing grids from PERFORMANCE_DATA_PATH.
+
+    `approved` is false unless the file says the tables come from the flight
+    manual; distances from unapproved tables are illustrative only.
+    """
+
+    def __init__(self, data: Dict):
+        self.source = data.get("source", "")
+        self.approved = bool(data.get("approved", False))
+        axes = data.get("axes") or {}
+        self.grids: Dict[str, PerformanceGrid] = {}
+        for name, table in (data.get("tables") or {}).items():
+            axis_names = table["axes"]
+            self.grids[name] = PerformanceGrid(name, axis_names, [axes[a] for a in axis_names], table["values"],
+                                               table.get("units", "ft"))
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "PerformanceTables":
+        p = Path(path)
+        if not p.exists():
+            print(f"⚠️ Performance data not found at {path}")
+            return cls({})
+        with open(p, "r", encoding="utf-8") as f:
+            return cls(yaml.safe_load(f) or {})
+
+    def lookup(self, **coords) -> Dict[str, Dict[str, np.ndarray]]:
+        """Every table at the given coordinates (keyword per axis name, broadcasting)"""
+        return {name: grid(*(coords[a] for a in grid.axis_names)) for name, grid in self.grids.items()}
+
+def performance_sweep(tables: PerformanceTables, weight_lbs: List[float], pressure_alt_ft: List[float],
+                      oat_c: List[float]) -> Dict:
+    """All tables over the weight x PA x OAT product, in one interpolation per table"""
+    w, pa, t = np.meshgrid(np.asarray(weight_lbs, dtype="float64"), np.asarray(pressure_alt_ft, dtype="float64"),
+                           np.asarray(oat_c, dtype="float64"), indexing="ij")
+    found = tables.lookup(weight_lbs=w, pressure_alt_ft=pa, oat_c=t)
+    return {
+        "axes": {"weight_lbs": list(weight_lbs), "pressure_alt_ft": list(pressure_alt_ft), "oat_c": list(oat_c)},
+        "density_altitude_ft": np.round(density_altitude_ft(pa[0], t[0])).tolist(),   # PA x OAT
+        "tables": {name: np.round(r["value"]).tolist() for name, r in found.items()},  # weight x PA x OAT
+        "clamped_points": int(sum(int(r["clamped"].sum()) for r in found.values())),
+        "source": tables.source,
+        "approved": tables.approved,
+    }
+
+_tables: Optional[PerformanceTables] = None
+def get_performance_tables() -> PerformanceTables:
+    global _tables
+    if _tables is None:
+        _tables = PerformanceTables.from_yaml(settings.PERFORMANCE_DATA_PATH)
+    return _tables
@@ -0,0 +1,406 @@
+import os
+import queue
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import faiss
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.services.embed import EMBED_MODEL
+from app.services.embed_cache import embed_texts_cached, text_hash
+from app.services.chunker import Boilerplate
+from app.services.hierarchy import SectionIndexBuilder
+from app.services.ingest import chunk_rows, fit_boilerplate, load_catalog, new_dedup_filter
+from app.services.lexical import BM25Builder
+from app.services.page_store import PageStore, get_page_store
+from app.services.pdf_extract import stream_pdf
+from app.services.retrieve import Retriever
+
+CHUNK_SCHEMA = pa.schema([
+    ("doc_id", pa.string()),
+    ("title", pa.string()),
+    ("type", pa.string()),
+    ("source", pa.string()),
+    ("date", pa.string()),
+    ("restrictions", pa.string()),
+    ("chunk_id", pa.string()),
+    ("chunk_text", pa.string()),
+    ("section", pa.string()),
+    ("page_start", pa.int32()),
+    ("page_end", pa.int32()),
+    ("text_hash", pa.string()),
+])
+
+_DONE = object()   # end-of-stream marker passed down every queue
+
+class PipelineAborted(Exception):
+    """Another stage failed; raised in the remaining stages so they unwind"""
+
+@dataclass(slots=True)
+class StageStats:
+    name: str
+    unit: str
+    items: int = 0
+    busy_s: float = 0.0       # doing the stage's own work
+    starved_s: float = 0.0    # waiting on the upstream queue
+    blocked_s: float = 0.0    # waiting on a full downstream queue (backpressure)
+    peak_queue: int = 0       # deepest the output queue got
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, items: int, busy_s: float):
+        with self._lock:
+            self.items += items
+            self.busy_s += busy_s
+
+    @property
+    def rate(self) -> float:
+        return self.items / self.busy_s if self.busy_s > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.name:<7} {self.items:>7} {self.unit:<7} {self.rate:>9.1f}/s busy "
+                f"{self.busy_s:6.2f}s starved {self.starved_s:6.2f}s blocked {self.blocked_s:6.2f}s "
+                f"peak queue {self.peak_queue}")
+
+class IndexPipeline:
+    """Catalog -> pages -> chunks -> embeddings -> on-disk index, as overlapping stages.
+
+    Each stage is a thread joined to the next by a bounded queue of
+    PIPELINE_QUEUE_DEPTH items, so a slow stage (normally embedding) blocks
+    the ones upstream instead of letting work pile up in memory:
+
+        pages   page-store batches per document; a PDF not yet in the store is
+                extracted shard by shard and its pages are sent on (and written
+                to the store) as each shard finishes
+        chunk   header/footer stripping, structure-aware chunking with page
+                provenance and near-duplicate removal, grouped into embed batches
+        embed   vectors from the previous index, the embedding cache or the API
+        write   one Parquet row group, Arrow record batch and vectors.f32 append
+                per batch; BM25 postings and section centroids are accumulated
+                batch by batch too and finished from spill files at the end
+
+    At any moment the pipeline holds a few batches per queue, independent of
+    the catalog size; what does grow with the corpus is the BM25 vocabulary,
+    one centroid per section group and, in incremental mode, the previous
+    index's text hashes. Per-stage counters record items, busy time, time
+    starved by the upstream stage and time blocked by the downstream one.
+    """
+
+    def __init__(self, catalog_path: str = "corpus/catalog.yaml", store: Optional[PageStore] = None,
+                 work_dir: Optional[str] = None, queue_depth: Optional[int] = None,
+                 embed_batch: Optional[int] = None, chunk_chars: int = 2000, chunk_overlap: int = 200,
+                 embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None, verbose: bool = True):
+        self.catalog_path = catalog_path
+        self.store = store or get_page_store()
+        self.work_dir = Path(work_dir or settings.PIPELINE_WORK_DIR)
+        self.queue_depth = queue_depth or settings.PIPELINE_QUEUE_DEPTH
+        self.embed_batch = embed_batch or settings.PIPELINE_EMBED_BATCH or settings.EMBED_BATCH_SIZE * settings.EMBED_MAX_IN_FLIGHT
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.embed_fn = embed_fn or embed_texts_cached
+        self.verbose = verbose
+        self.stats: Dict[str, StageStats] = {
+            "pages": StageStats("pages", "pages"),
+            "chunk": StageStats("chunk", "chunks"),
+            "embed": StageStats("embed", "vectors"),
+            "write": StageStats("write", "rows"),
+        }
+        self.chunking: Dict = {}   # boilerplate lines stripped, near-duplicate chunks dropped
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    # -- queue plumbing ---------------------------------------------------
+
+    def _put(self, q: queue.Queue, item, stage: StageStats):
+        started = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stage.blocked_s += time.perf_counter() - started
+        stage.peak_queue = max(stage.peak_queue, q.qsize())
+
+    def _get(self, q: queue.Queue, stage: StageStats):
+        started = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise PipelineAborted()
+            try:
+                item = q.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        stage.starved_s += time.perf_counter() - started
+        return item
+
+    def _run_stage(self, target: Callable, *args):
+        try:
+            target(*args)
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    # -- stages -----------------------------------------------------------
+
+    def _forward(self, out: queue.Queue, doc: Dict, pages: Iterator[Dict], boilerplate: Boilerplate) -> Iterator[Dict]:
+        """Pass pages through unchanged while sending them downstream in batches"""
+        st = self.stats["pages"]
+        batch: List[Dict] = []
+        started = time.perf_counter()
+        for page in pages:
+            yield page
+            batch.append(page)
+            if len(batch) >= settings.PAGE_STORE_ROW_GROUP_PAGES:
+                st.add(len(batch), time.perf_counter() - started)
+                self._put(out, (doc, batch, boilerplate), st)
+                batch, started = [], time.perf_counter()
+        st.add(len(batch), time.perf_counter() - started)
+        if batch:
+            self._put(out, (doc, batch, boilerplate), st)
+        self._put(out, (doc, None, boilerplate), st)
+
+    def _pages(self, out: queue.Queue):
+        """(doc, [page records], boilerplate) batches per document, then (doc, None, boilerplate)"""
+        st = self.stats["pages"]
+        for doc in load_catalog(self.catalog_path).get("docs", []):
+            if doc["id"] in self.store:
+                boilerplate = fit_boilerplate(doc["id"], self.store)
+                for _ in self._forward(out, doc, self.store.iter_pages(doc["id"]), boilerplate):
+                    pass
+                continue
+            f = Path(doc["file"])
+            if not f.exists():
+                continue
+            # Not extracted yet: stream shards as they finish into both the page store and the
+            # chunk stage, which fits the (still unfitted) boilerplate as the pages arrive
+            print(f"Processing PDF: {doc['title']}...")
+            boilerplate = Boilerplate(min_pages=settings.BOILERPLATE_MIN_PAGES)
+            self.store.write_document(doc["id"], self._forward(out, doc, stream_pdf(str(f), verbose=self.verbose), boilerplate),
+                                      metadata={"source_file": str(f)})
+        self._put(out, _DONE, st)
+
+    def _chunk(self, inp: queue.Queue, out: queue.Queue):
+        """Chunk rows grouped into lists of embed_batch rows"""
+        st = self.stats["chunk"]
+        batch: List[Dict] = []
+        dedup = new_dedup_filter()
+
+        def doc_stream(first) -> Iterator[Dict]:
+            item = first
+            while item[1] is not None:
+                yield from item[1]
+                item = self._get(inp, st)
+
+        item = self._get(inp, st)
+        while item is not _DONE:
+            boilerplate = item[2]
+            pages = doc_stream(item)
+            if boilerplate.pages_seen == 0:   # document still being extracted
+                pages = boilerplate.ahead(pages, settings.BOILERPLATE_LOOKAHEAD_PAGES)
+            rows = chunk_rows(item[0], pages, self.chunk_chars, self.chunk_overlap,
+                              boilerplate, dedup, self.chunking)
+            while True:
+                started, starved = time.perf_counter(), st.starved_s
+                row = next(rows, None)   # may wait on the pages stage; that counts as starved, not busy
+                st.add(int(row is not None), time.perf_counter() - started - (st.starved_s - starved))
+                if row is None:
+                    break
+                row["text_hash"] = text_hash(row["chunk_text"])
+                batch.append(row)
+                if len(batch) >= self.embed_batch:
+                    self._put(out, batch, st)
+                    batch = []
+            item = self._get(inp, st)
+        if batch:
+            self._put(out, batch, st)
+        self.chunking["near_duplicates"] = dedup.dropped if dedup is not None else 0
+        self._put(out, _DONE, st)
+
+    def _embed(self, inp: queue.Queue, out: queue.Queue, previous_rows: Dict[str, int], reusable: np.ndarray,
+               seen: np.ndarray, previous_vectors):
+        """(rows, vectors) with vectors from the previous index where the text is unchanged.
+
+        previous_rows maps text_hash -> previous row, reusable marks the rows whose vector
+        can be carried over, and seen is set for every previous row still present.
+        """
+        st = self.stats["embed"]
+        while True:
+            rows = self._get(inp, st)
+            if rows is _DONE:
+                break
+            started = time.perf_counter()
+            todo, reused = [], []
+            for i, r in enumerate(rows):
+                j = previous_rows.get(r["text_hash"])
+                if j is not None:
+                    seen[j] = True
+                    if reusable[j]:
+                        reused.append((i, j))
+                        continue
+                todo.append(i)
+            new_vecs = self.embed_fn([rows[i]["chunk_text"] for i in todo]) if todo else None
+            if new_vecs is not None:
+                faiss.normalize_L2(new_vecs)
+            dim = new_vecs.shape[1] if new_vecs is not None else previous_vectors.shape[1]
+            vecs = np.zeros((len(rows), dim), dtype="float32")
+            if todo:
+                vecs[todo] = new_vecs
+            if reused:
+                dst, src = zip(*reused)
+                vecs[list(dst)] = previous_vectors[list(src)]
+            st.add(len(rows), time.perf_counter() - started)
+            self._put(out, (rows, vecs, len(todo)), st)
+        self._put(out, _DONE, st)
+
+    def _write(self, inp: queue.Queue, chunks_path: Path, meta_path: Path, vectors_path: Path, result: Dict):
+        """Append each batch as a Parquet row group, an Arrow record batch and raw float32 rows,
+        and feed it to the lexical and section index builders"""
+        st = self.stats["write"]
+        rows_written = embedded = 0
+        dim = None
+        lexical = BM25Builder(self.work_dir)
+        sections = SectionIndexBuilder(self.work_dir, settings.HIER_GROUP_MAX_CHUNKS, settings.HIER_PAGE_GROUP)
+        with pq.ParquetWriter(str(chunks_path), CHUNK_SCHEMA, compression="zstd") as writer, \
+                pa.OSFile(str(meta_path), "wb") as meta_sink, \
+                pa.ipc.new_file(meta_sink, CHUNK_SCHEMA) as meta_writer, \
+                open(vectors_path, "wb") as vec_file:
+            while True:
+                item = self._get(inp, st)
+                if item is _DONE:
+                    break
+                rows, vecs, n_embedded = item
+                started = time.perf_counter()
+                if dim is not None and vecs.shape[1] != dim:
+                    raise ValueError(f"Embedding dimension changed mid-build ({dim} -> {vecs.shape[1]})")
+                dim = vecs.shape[1]
+                table = pa.Table.from_pylist(rows, schema=CHUNK_SCHEMA)
+                writer.write_table(table)
+                meta_writer.write_table(table)
+                vec_file.write(np.ascontiguousarray(vecs, dtype="<f4").tobytes())
+                lexical.add([r["chunk_text"] for r in rows])
+                sections.add(vecs, table)
+                rows_written += len(rows)
+                embedded += n_embedded
+                st.add(len(rows), time.perf_counter() - started)
+                if self.verbose:
+                    print(f"  📝 {rows_written} chunks indexed ({embedded} embedded) | "
+                          + " ".join(f"{s.name} {s.items}" for s in self.stats.values()))
+        started = time.perf_counter()
+        result.update({"rows": rows_written, "embedded": embedded, "dim": dim,
+                       "lexical": lexical.finish(), "sections": sections.finish()})
+        st.add(0, time.perf_counter() - started)
+
+    # -- driver -----------------------------------------------------------
+
+    def run(self, previous=None) -> Dict:
+        """Run every stage to completion.
+
+        Returns the staged chunk Parquet and vectors file paths plus counts;
+        `previous` (a loaded Retriever) lets unchanged chunks keep their
+        vectors instead of being embedded again.
+        """
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        chunks_path = self.work_dir / "chunks.parquet"
+        meta_path = self.work_dir / "meta.arrow"
+        vectors_path = self.work_dir / "vectors.f32"
+        previous_rows: Dict[str, int] = {}
+        reusable = np.zeros(0, dtype=bool)
+        previous_vectors = None
+        if previous is not None:
+            previous_rows = {h: i for i, h in enumerate(previous.text_hashes())}
+            reusable = np.zeros(previous.vectors.shape[0], dtype=bool)
+            if previous.manifest.get("embed_model") == EMBED_MODEL:
+                reusable = previous.embedded_rows()   # zero (failed) vectors are embedded again
+                previous_vectors = previous.vectors
+        seen = np.zeros(reusable.shape[0], dtype=bool)
+
+        queues = [queue.Queue(maxsize=self.queue_depth) for _ in range(3)]
+        result: Dict = {}
+        stages = [
+            threading.Thread(target=self._run_stage, args=(self._pages, queues[0]), name="pipeline-pages"),
+            threading.Thread(target=self._run_stage, args=(self._chunk, queues[0], queues[1]), name="pipeline-chunk"),
+            threading.Thread(target=self._run_stage, args=(self._embed, queues[1], queues[2], previous_rows, reusable, seen,
+                                                                previous_vectors),
+                             name="pipeline-embed"),
+            threading.Thread(target=self._run_stage, args=(self._write, queues[2], chunks_path, meta_path, vectors_path,
+                                                                result),
+                             name="pipeline-write"),
+        ]
+        started = time.perf_counter()
+        for t in stages:
+            t.start()
+        for t in stages:
+            t.join()
+        if self._errors:
+            raise self._errors[0]
+
+        elapsed = time.perf_counter() - started
+        result.update({
+            "chunks_path": str(chunks_path),
+            "meta_path": str(meta_path),
+            "vectors_path": str(vectors_path),
+            "seconds": round(elapsed, 2),
+            "reused": result.get("rows", 0) - result.get("embedded", 0),
+            "removed": len(previous_rows) - int(seen.sum()),
+            "chunking": dict(self.chunking),
+            "stages": {name: {"items": s.items, "per_second": round(s.rate, 1), "busy_s": round(s.busy_s, 2),
+                              "starved_s": round(s.starved_s, 2), "blocked_s": round(s.blocked_s, 2),
+                              "peak_queue": s.peak_queue}
+                       for name, s in self.stats.items()},
+        })
+        if self.verbose:
+            print(f"✅ Pipeline finished: {result.get('rows', 0)} chunks in {elapsed:.1f}s "
+                  f"({self.chunking.get('boilerplate_lines', 0)} boilerplate lines stripped, "
+                  f"{self.chunking.get('near_duplicates', 0)} near-duplicate chunks dropped)")
+            for s in self.stats.values():
+                print("   " + s.summary())
+        return result
+
+def open_staged(result: Dict):
+    """(vectors memmap, chunk table) for a finished run; both stay memory-mapped, nothing is copied"""
+    table = pa.ipc.open_file(pa.memory_map(result["meta_path"], "r")).read_all()
+    if not result.get("rows"):
+        return np.zeros((0, result.get("dim") or 0), dtype="float32"), table
+    vectors = np.memmap(result["vectors_path"], dtype="<f4", mode="r", shape=(result["rows"], result["dim"]))
+    return vectors, table
+
+def to_retriever(result: Dict, previous=None) -> Retriever:
+    """A Retriever over the staged run, ready for build_ann() and save()"""
+    vectors, table = open_staged(result)
+    r = Retriever()
+    r.vectors = vectors
+    r.meta = table
+    r.lexical = result.get("lexical")
+    r.sections = result.get("sections")
+    r.build_info = {
+        "mode": "incremental" if previous is not None else "full",
+        "parent_version": previous.version if previous is not None else None,
+        "chunks": result.get("rows", 0),
+        "reused": result.get("reused", 0),
+        "embedded": result.get("embedded", 0),
+        "removed": result.get("removed", 0),
+        "chunking": result.get("chunking", {}),
+        "pipeline": result.get("stages", {}),
+    }
+    return r
+
+def cleanup_staged(result: Dict):
+    for key in ("chunks_path", "meta_path", "vectors_path"):
+        path = result.get(key)
+        if path and os.path.exists(path):
+            os.remove(path)
+    if result.get("meta_path"):
+        for name in ("bm25", "sections"):
+            shutil.rmtree(Path(result["meta_path"]).parent / name, ignore_errors=True)
@@ -1,29 +1,228 @@
 import faiss
 import numpy as np
-import pandas as pd
-from typing import List, Dict
-from app.services.embed import embed_texts
+import pyarrow as pa
+from typing import List, Dict, Optional
+from app.services.embed import embed_texts, EMBED_MODEL
+from app.services.embed_cache import embed_texts_cached, text_hash
+from app.services import index_store
+from app.services.lexical import BM25Index, reciprocal_rank_fusion
+from app.services.ann import build_ann_index, apply_search_params, write_ann, read_ann
+from app.services.hierarchy import SectionIndex
+from app.core.config import settings
+
+SEARCH_MODES = ("dense", "lexical", "hybrid")
 
 class Retriever:
     def __init__(self):
-        self.index = None
-        self.meta = None
-
-    def build(self, df: pd.DataFrame):
-        vecs = embed_texts(df["chunk_text"].tolist())
-        faiss.normalize_L2(vecs)
-        self.index = faiss.IndexFlatIP(vecs.shape[1])
-        self.index.add(vecs)
-        self.meta = df.reset_index(drop=True)
-
-    def search(self, query: str, k: int = 5) -> List[Dict]:
-        q = embed_texts([query]).astype("float32")
+        self.vectors = None   # (n, dim) float32, L2-normalised; memory-mapped when opened from a bundle
+        self.meta = None      # pyarrow.Table, one row per vector
+        self.lexical = None   # BM25Index over meta["chunk_text"]
+        self.ann = None       # optional faiss ANN index; None means exact search over vectors
+        self.sections = None  # SectionIndex: section centroids for coarse-to-fine dense search
+        self.ann_spec: Dict = {"type": "flat", "params": {}}
+        self.manifest: Dict = {}
+        self.build_info: Dict = {}
+
+    def build(self, chunks, previous: Optional["Retriever"] = None) -> Dict:
+        """Embed chunks (a pyarrow.Table or pandas DataFrame with a chunk_text column).
+
+        Vectors whose text is unchanged in `previous` are reused as-is.
+        """
+        table = chunks if isinstance(chunks, pa.Table) else pa.Table.from_pandas(chunks, preserve_index=False)
+        texts = table.column("chunk_text").to_pylist()
+        hashes = [text_hash(t) for t in texts]
+        if "text_hash" in table.column_names:
+            table = table.drop_columns(["text_hash"])
+        table = table.append_column("text_hash", pa.array(hashes, pa.string()))
+
+        reusable: Dict[str, int] = {}
+        if previous is not None and previous.manifest.get("embed_model") == EMBED_MODEL:
+            reusable = previous.reusable_rows()
+
+        dim = previous.vectors.shape[1] if reusable else None
+        todo = [i for i, h in enumerate(hashes) if h not in reusable]
+        new_vecs = embed_texts_cached([texts[i] for i in todo]) if todo else None
+        if new_vecs is not None:
+            faiss.normalize_L2(new_vecs)
+            dim = new_vecs.shape[1]
+
+        vecs = np.zeros((len(texts), dim or 0), dtype="float32")
+        if todo:
+            vecs[todo] = new_vecs
+        reused = [(i, reusable[h]) for i, h in enumerate(hashes) if h in reusable]
+        if reused:
+            dst, src = zip(*reused)
+            vecs[list(dst)] = previous.vectors[list(src)]
+
+        self.vectors = vecs
+        self.meta = table
+        self.lexical = BM25Index.build(texts)
+        kept = set(hashes)
+        self.build_info = {
+            "mode": "incremental" if previous is not None else "full",
+            "parent_version": previous.version if previous is not None else None,
+            "chunks": len(texts),
+            "reused": len(texts) - len(todo),
+            "embedded": len(todo),
+            "removed": len(set(previous.text_hashes()) - kept) if previous is not None else 0,
+        }
+        return self.build_info
+
+    def build_ann(self, index_type: str = "flat", params: Optional[Dict] = None) -> Dict:
+        """Train the dense search structure (flat, ivf_flat, ivf_pq or hnsw) over self.vectors"""
+        self.ann, used = build_ann_index(np.asarray(self.vectors), index_type, params)
+        self.ann_spec = {"type": index_type if self.ann is not None else "flat", "params": used}
+        return self.ann_spec
+
+    def text_hashes(self) -> List[str]:
+        """Content hash per row (older bundles without a text_hash column are hashed on the fly)"""
+        if "text_hash" in self.meta.column_names:
+            return self.meta.column("text_hash").to_pylist()
+        return [text_hash(t) for t in self.meta.column("chunk_text").to_pylist()]
+
+    def embedded_rows(self, block: int = 65536) -> np.ndarray:
+        """Boolean mask of rows with a real vector (batches that failed to embed are stored as zeros)"""
+        n = self.vectors.shape[0]
+        mask = np.zeros(n, dtype=bool)
+        for start in range(0, n, block):   # blockwise so a memory-mapped bundle is never copied whole
+            mask[start:start + block] = np.any(np.asarray(self.vectors[start:start + block]) != 0, axis=1)
+        return mask
+
+    def reusable_rows(self) -> Dict[str, int]:
+        """text_hash -> row for every chunk whose vector can be carried into a new build"""
+        embedded = self.embedded_rows()
+        return {h: i for i, h in enumerate(self.text_hashes()) if embedded[i]}
+
+    def save(self, root: str) -> str:
+        """Write the index as a new bundle version under root; returns the version name"""
+        if self.lexical is None:
+            self.lexical = BM25Index.build(self.meta.column("chunk_text").to_pylist())
+        extra = {"ann": self.ann_spec}
+        if self.build_info:
+            extra["build"] = self.build_info
+        if self.sections is None:
+            self.sections = SectionIndex.build(np.asarray(self.vectors), self.meta, settings.HIER_GROUP_MAX_CHUNKS,
+                                               settings.HIER_PAGE_GROUP)
+        attachments = [self.lexical.write]
+        if self.sections is not None:
+            attachments.append(self.sections.write)
+        if self.ann is not None:
+            attachments.append(lambda bundle: write_ann(self.ann, bundle))
+        bundle = index_store.write_bundle(root, self.vectors, self.meta, EMBED_MODEL, extra=extra,
+                                          attachments=attachments)
+        self.manifest = index_store.read_manifest(bundle)
+        return self.manifest["index_version"]
+
+    @classmethod
+    def load(cls, root: str, version: Optional[str] = None, verify: bool = False,
+             search_params: Optional[Dict] = None) -> "Retriever":
+        """Open a bundle zero-copy: vectors and metadata stay in the shared page cache.
+
+        search_params (nprobe / ef_search) override the values recorded at build time.
+        """
+        bundle = index_store.resolve_bundle(root, version)
+        manifest = index_store.read_manifest(bundle)
+        if verify:
+            index_store.verify_bundle(bundle, manifest)
+        r = cls()
+        r.manifest = manifest
+        r.vectors = index_store.open_vectors(bundle, manifest)
+        r.meta = index_store.open_meta(bundle, manifest)
+        r.lexical = BM25Index.open(bundle)
+        if r.lexical is None:
+            # Bundles written before the lexical index existed: build it in memory
+            r.lexical = BM25Index.build(r.meta.column("chunk_text").to_pylist())
+        r.sections = SectionIndex.open(bundle)
+        r.ann_spec = manifest.get("ann", r.ann_spec)
+        if r.ann_spec["type"] != "flat":
+            r.ann = read_ann(bundle)
+            apply_search_params(r.ann, r.ann_spec["type"], {**r.ann_spec["params"], **(search_params or {})})
+        return r
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.manifest.get("index_version")
+
+    @property
+    def hit_columns(self) -> List[str]:
+        """Metadata columns returned with each hit (internal bookkeeping columns excluded)"""
+        return [c for c in self.meta.column_names if c != "text_hash"]
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        q = embed_texts(queries).astype("float32")
         faiss.normalize_L2(q)
-        D, I = self.index.search(q, k)
-        hits = []
-        for score, idx in zip(D[0], I[0]):
-            row = self.meta.iloc[int(idx)].to_dict()
-            row["score"] = float(score)
-            hits.append(row)
-        return hits
+        return q
+
+    @property
+    def hierarchical(self) -> bool:
+        """Whether dense search goes section -> chunk: opted in with HIER_FAN_OUT > 0, the bundle has
+        at least HIER_MIN_CHUNKS chunks and no ANN index (a configured ANN index always wins)"""
+        return (self.sections is not None and self.ann is None and settings.HIER_FAN_OUT > 0
+                and self.vectors.shape[0] >= settings.HIER_MIN_CHUNKS)
+
+    def _dense(self, q: np.ndarray, k: int):
+        """Top-k (ids, scores) for every row of q; rows are padded with id -1 if fewer than k exist"""
+        if self.hierarchical:
+            return self.sections.search(self.vectors, q, k, settings.HIER_FAN_OUT)
+        if self.ann is not None:
+            D, I = self.ann.search(q, k)
+            return I.astype("int64"), D
+        scores = q @ self.vectors.T
+        n = scores.shape[1]
+        if min(k, n) <= 0:
+            return np.full((q.shape[0], 0), -1, dtype="int64"), np.zeros((q.shape[0], 0), dtype="float32")
+        top = np.argpartition(-scores, min(k, n) - 1, axis=1)[:, :min(k, n)]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return top, np.take_along_axis(scores, top, axis=1)
+
+    def _materialize(self, rankings: List, mode: str) -> List[List[Dict]]:
+        """One columnar gather for every hit of every query, then split per query"""
+        ids = [np.asarray(r[0], dtype="int64") for r in rankings]
+        flat = np.concatenate(ids) if ids else np.zeros(0, dtype="int64")
+        rows = self.meta.select(self.hit_columns).take(pa.array(flat)).to_pylist()
+        scores = np.concatenate([np.asarray(r[1], dtype="float32") for r in rankings]).tolist() if ids else []
+        out, pos = [], 0
+        for r in ids:
+            hits = rows[pos:pos + len(r)]
+            for hit, score in zip(hits, scores[pos:pos + len(r)]):
+                hit["score"] = score
+                hit["retrieval"] = mode
+            out.append(hits)
+            pos += len(r)
+        return out
+
+    def search_batch(self, queries: List[str], k: int = 5, mode: str = "dense", depth: int = 50,
+                     query_vectors: Optional[np.ndarray] = None) -> List[List[Dict]]:
+        """Top-k chunks for each query, with a single embedding call for the whole batch.
+
+        mode="dense" ranks by embedding similarity, "lexical" by BM25 with no
+        embedding call at all, and "hybrid" fuses the top `depth` of both with
+        reciprocal-rank fusion. query_vectors (already normalised) skips the
+        embedding call when the caller has them.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}; expected one of {SEARCH_MODES}")
+        if not queries:
+            return []
+        rankings = []
+        if mode == "lexical":
+            rankings = [self.lexical.search(q, k) for q in queries]
+        else:
+            qv = query_vectors if query_vectors is not None else self.embed_queries(queries)
+            D_ids, D_scores = self._dense(qv, k if mode == "dense" else max(k, depth))
+            for i, query in enumerate(queries):
+                keep = D_ids[i] >= 0
+                dense_ids, dense_scores = D_ids[i][keep], D_scores[i][keep]
+                if mode == "dense":
+                    rankings.append((dense_ids, dense_scores))
+                else:
+                    lexical_ids, _ = self.lexical.search(query, max(k, depth))
+                    rankings.append(reciprocal_rank_fusion([dense_ids, lexical_ids], k))
+        return self._materialize(rankings, mode)
 
+    def search(self, query: str, k: int = 5, mode: str = "dense", depth: int = 50,
+               query_vector: Optional[np.ndarray] = None) -> List[Dict]:
+        """Top-k chunks for a single query (see search_batch)"""
+        qv = query_vector.reshape(1, -1) if query_vector is not None else None
+        return self.search_batch([query], k, mode, depth, query_vectors=qv)[0]
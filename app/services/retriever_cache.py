@@ -1,10 +1,25 @@
-import pickle
+import time
+from app.core.config import settings
+from app.services.retrieve import Retriever
+from app.services import index_store
 
 _retriever = None
+_checked_at = 0.0
 def get_retriever():
-    global _retriever
+    """Process-wide retriever; picks up a new CURRENT bundle version without a restart"""
+    global _retriever, _checked_at
+    now = time.monotonic()
+    if _retriever is not None and now - _checked_at >= settings.INDEX_RELOAD_CHECK_SECONDS:
+        _checked_at = now
+        if index_store.current_version(settings.INDEX_DIR) != _retriever.version:
+            _retriever = None
     if _retriever is None:
-        with open("artifacts/retriever.pkl", "rb") as f:
-            _retriever = pickle.load(f)
+        search_params = {}
+        if settings.INDEX_NPROBE:
+            search_params["nprobe"] = settings.INDEX_NPROBE
+        if settings.INDEX_EF_SEARCH:
+            search_params["ef_search"] = settings.INDEX_EF_SEARCH
+        _retriever = Retriever.load(settings.INDEX_DIR, verify=settings.INDEX_VERIFY_CHECKSUMS,
+                                    search_params=search_params)
+        _checked_at = now
     return _retriever
-
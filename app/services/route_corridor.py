@@ -0,0 +1,186 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.airfields import AirfieldDB, get_airfield_db
+
+EARTH_RADIUS_NM = 3440.065
+SEVERITY = {"VFR": 0, "MVFR": 1, "IFR": 2, "LIFR": 3}
+
+def _unit(lat, lon) -> np.ndarray:
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+def distance_nm(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance (haversine), broadcasting over arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype="float64")) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def great_circle_points(lat1: float, lon1: float, lat2: float, lon2: float, step_nm: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Points every ~step_nm along the great circle, both ends included, plus the leg length"""
+    length = float(distance_nm(lat1, lon1, lat2, lon2))
+    n = max(int(math.ceil(length / step_nm)), 1)
+    a, b = _unit(lat1, lon1), _unit(lat2, lon2)
+    omega = math.acos(min(max(float(a @ b), -1.0), 1.0))
+    f = np.linspace(0.0, 1.0, n + 1)[:, None]
+    if omega < 1e-9:
+        points = np.repeat(a[None, :], n + 1, axis=0)
+    else:
+        points = (np.sin((1 - f) * omega) * a + np.sin(f * omega) * b) / math.sin(omega)   # slerp
+    lat = np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0)))
+    lon = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+    return lat, lon, length
+
+class GeoGrid:
+    """Fixed lat/lon grid over station positions.
+
+    Stations are bucketed into cell_deg x cell_deg cells; a radius query only
+    measures distances to stations in the cells overlapping the query's
+    bounding box, so cost follows local station density rather than the size
+    of the whole database.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float = 1.0):
+        self.lat = np.asarray(lat, dtype="float64")
+        self.lon = np.asarray(lon, dtype="float64")
+        self.cell_deg = cell_deg
+        self.lon_cells = int(math.ceil(360 / cell_deg))
+        buckets = defaultdict(list)
+        for row, key in enumerate(zip(self._row(self.lat).tolist(), self._col(self.lon).tolist())):
+            buckets[key].append(row)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {k: np.array(v, dtype="int64") for k, v in buckets.items()}
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90.0) / self.cell_deg).astype("int64")
+
+    def _col(self, lon):
+        return np.floor(((np.asarray(lon) + 180.0) % 360.0) / self.cell_deg).astype("int64") % self.lon_cells
+
+    def candidates(self, lat: np.ndarray, lon: np.ndarray, radius_nm: float) -> np.ndarray:
+        """Rows in any cell within radius_nm of any of the points (superset of the true matches)"""
+        keys = set()
+        dlat = radius_nm / 60.0
+        for plat, plon in zip(np.atleast_1d(lat).tolist(), np.atleast_1d(lon).tolist()):
+            coslat = math.cos(math.radians(min(abs(plat) + dlat, 89.9)))
+            dlon = min(radius_nm / (60.0 * coslat), 180.0)
+            r0, r1 = int(self._row(plat - dlat)), int(self._row(plat + dlat))
+            c0 = int(math.floor((plon - dlon + 180.0) / self.cell_deg))
+            c1 = int(math.floor((plon + dlon + 180.0) / self.cell_deg))
+            for r in range(r0, r1 + 1):
+                for c in range(c0, min(c1, c0 + self.lon_cells - 1) + 1):
+                    keys.add((r, c % self.lon_cells))
+        rows = [self.cells[k] for k in keys if k in self.cells]
+        return np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype="int64")
+
+    def within(self, lat: float, lon: float, radius_nm: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, distances) of stations within radius_nm of one point, nearest first"""
+        rows = self.candidates(lat, lon, radius_nm)
+        d = distance_nm(lat, lon, self.lat[rows], self.lon[rows])
+        keep = d <= radius_nm
+        order = np.argsort(d[keep])
+        return rows[keep][order], d[keep][order]
+
+def resolve_waypoints(waypoints: List[str], db: AirfieldDB) -> List[Dict]:
+    """ICAO codes (from the airfield database) or "lat,lon" strings"""
+    resolved = []
+    for wp in waypoints:
+        wp = wp.strip()
+        if "," in wp:
+            lat, lon = (float(x) for x in wp.split(",", 1))
+            resolved.append({"id": wp, "icao": None, "lat": lat, "lon": lon})
+            continue
+        i = db.index.get(wp.upper())
+        if i is None:
+            raise ValueError(f"Unknown waypoint {wp!r}: not in the airfield database (use \"lat,lon\")")
+        resolved.append({"id": wp.upper(), "icao": wp.upper(), "lat": float(db.lat[i]), "lon": float(db.lon[i])})
+    return resolved
+
+def distance_to_arc(lat, lon, a: Dict, b: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """(off-route nm, along-track nm) from points to the great-circle arc a -> b.
+
+    Points whose projection falls outside the arc measure to the nearer end.
+    """
+    p, ua, ub = _unit(np.asarray(lat, dtype="float64"), np.asarray(lon, dtype="float64")), _unit(a["lat"], a["lon"]), _unit(b["lat"], b["lon"])
+    omega = math.acos(min(max(float(ua @ ub), -1.0), 1.0))
+    to_a = distance_nm(lat, lon, a["lat"], a["lon"])
+    if omega < 1e-9:
+        return to_a, np.zeros_like(to_a)
+    n = np.cross(ua, ub)
+    n /= np.linalg.norm(n)
+    cross = np.arcsin(np.clip(p @ n, -1.0, 1.0))
+    along = np.arctan2(p @ np.cross(n, ua), p @ ua)   # angle from a towards b in the arc's plane
+    inside = (along >= 0) & (along <= omega)
+    to_b = distance_nm(lat, lon, b["lat"], b["lon"])
+    off = np.where(inside, np.abs(cross) * EARTH_RADIUS_NM, np.minimum(to_a, to_b))
+    along_nm = np.clip(along, 0.0, omega) * EARTH_RADIUS_NM
+    return off, along_nm
+
+def sweep_corridor(waypoints: List[Dict], corridor_nm: float, segment_nm: float,
+                   grid: GeoGrid, icaos: np.ndarray) -> Dict:
+    """Stations within corridor_nm of a multi-leg great-circle route, assigned to segments.
+
+    The grid is probed at points every corridor_nm along each leg (radius
+    widened by half a step so the probes cover the whole corridor); the
+    candidates are then measured exactly against every leg's arc, and each
+    station goes to its nearest leg and the segment_nm slice of it it
+    projects onto.
+    """
+    step = max(corridor_nm, 1.0)
+    probes_lat, probes_lon, segments, legs = [], [], [], []
+    offset = 0.0
+    for leg, (a, b) in enumerate(zip(waypoints, waypoints[1:])):
+        lat, lon, length = great_circle_points(a["lat"], a["lon"], b["lat"], b["lon"], step)
+        n_seg = max(int(math.ceil(length / segment_nm)), 1)
+        legs.append((a, b, offset, length, len(segments), n_seg))
+        for k in range(n_seg):
+            segments.append({
+                "leg": leg + 1,
+                "from": a["id"],
+                "to": b["id"],
+                "start_nm": round(offset + k * length / n_seg, 1),
+                "end_nm": round(offset + (k + 1) * length / n_seg, 1),
+            })
+        probes_lat.append(lat)
+        probes_lon.append(lon)
+        offset += length
+
+    rows = grid.candidates(np.concatenate(probes_lat), np.concatenate(probes_lon), corridor_nm + step / 2)
+    stations = []
+    if rows.size:
+        measured = [distance_to_arc(grid.lat[rows], grid.lon[rows], a, b) for a, b, *_ in legs]
+        off = np.stack([m[0] for m in measured])     # legs x candidates
+        along = np.stack([m[1] for m in measured])
+        leg_of = np.argmin(off, axis=0)
+        cols = np.arange(rows.size)
+        offroute, leg_along = off[leg_of, cols], along[leg_of, cols]
+        leg_offset = np.array([l[2] for l in legs])[leg_of]
+        leg_length = np.array([l[3] for l in legs])[leg_of]
+        first_seg = np.array([l[4] for l in legs])[leg_of]
+        n_seg = np.array([l[5] for l in legs])[leg_of]
+        seg = first_seg + np.minimum((leg_along / np.maximum(leg_length, 1e-9) * n_seg).astype("int64"), n_seg - 1)
+        route_along = leg_offset + leg_along
+        keep = np.flatnonzero(offroute <= corridor_nm)
+        for k in keep[np.argsort(route_along[keep], kind="stable")]:
+            stations.append({
+                "icao": str(icaos[rows[k]]),
+                "segment": int(seg[k]),
+                "along_track_nm": round(float(route_along[k]), 1),
+                "offset_nm": round(float(offroute[k]), 1),
+            })
+    return {"distance_nm": round(offset, 1), "segments": segments, "stations": stations, "candidates": int(rows.size)}
+
+def worst_category(categories: List[str]) -> str:
+    known = [c for c in categories if c in SEVERITY]
+    return max(known, key=SEVERITY.get) if known else "unknown"
+
+_station_grid: Optional[GeoGrid] = None
+def get_station_grid() -> GeoGrid:
+    """Spatial index over the airfield database positions"""
+    global _station_grid
+    if _station_grid is None:
+        db = get_airfield_db()
+        _station_grid = GeoGrid(db.lat, db.lon)
+    return _station_grid
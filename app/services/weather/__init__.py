@@ -1,27 +1,42 @@
+from typing import Dict, List, Union
 from .metservice import MetServiceProvider
-from .metno import MetNoTafMetarProvider
 from .base import TafMetar
 from .decoder import decode_metar, decode_taf
+from .cache import get_weather_cache
+from .manager import weather_manager
 
 _metsvc = MetServiceProvider()
-_metno = MetNoTafMetarProvider()
+
+async def _fetch_upstream(icao: str) -> TafMetar:
+    return await weather_manager.fetch_weather(icao)
 
 async def get_taf_metar(icao: str) -> TafMetar:
-    t = await _metsvc.fetch_taf_metar(icao)
-    if t.metar_raw or t.taf_raw:
-        return t
-    return await _metno.fetch_taf_metar(icao)
+    """METAR/TAF for a station, served from the weather cache when it is enabled"""
+    cache = get_weather_cache()
+    if cache is None:
+        return await _fetch_upstream(icao)
+    return await cache.get(icao, _fetch_upstream)
 
-async def get_taf_metar_decoded(icao: str) -> dict:
-    """Get weather data with decoded METAR/TAF information"""
-    weather = await get_taf_metar(icao)
+async def get_taf_metar_many(icaos: List[str]) -> Dict[str, Union[TafMetar, Exception]]:
+    """METAR/TAF for several stations; cache misses are fetched in one batched upstream pass"""
+    cache = get_weather_cache()
+    if cache is None:
+        return await weather_manager.fetch_weather_many(icaos)
+    return await cache.get_many(icaos, weather_manager.fetch_weather_many, _fetch_upstream)
+
+def decode_weather(weather: TafMetar) -> dict:
     return {
         "icao": weather.icao,
+        "provider": weather.provider,
         "metar_raw": weather.metar_raw,
         "taf_raw": weather.taf_raw,
         "metar_decoded": decode_metar(weather.metar_raw),
         "taf_decoded": decode_taf(weather.taf_raw)
     }
 
+async def get_taf_metar_decoded(icao: str) -> dict:
+    """Get weather data with decoded METAR/TAF information"""
+    return decode_weather(await get_taf_metar(icao))
+
 async def get_minute(lat: float, lon: float) -> dict:
     return await _metsvc.fetch_minute(lat, lon)  # returns {} if not configured
@@ -1,11 +1,34 @@
-from typing import Optional
+import asyncio
+from typing import Dict, List, Optional
 
 class TafMetar:
-    def __init__(self, icao: str, metar_raw: Optional[str], taf_raw: Optional[str]):
+    def __init__(self, icao: str, metar_raw: Optional[str], taf_raw: Optional[str], provider: Optional[str] = None):
         self.icao = icao.upper()
         self.metar_raw = metar_raw or ""
         self.taf_raw = taf_raw or ""
+        self.provider = provider  # name of the provider that answered, when known
+
+class WeatherProviderError(Exception):
+    """The provider could not be reached or answered with a server/quota error"""
 
 class WeatherProvider:
+    name = "provider"
+
     async def fetch_taf_metar(self, icao: str) -> TafMetar:
         raise NotImplementedError
+
+    async def fetch_many(self, icaos: List[str], concurrency: int = 8) -> Dict[str, TafMetar]:
+        """Several stations at once. Providers with a multi-station API override
+        this; the default fans out single-station calls, `concurrency` at a time.
+        Raises only when every station failed."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(icao: str) -> TafMetar:
+            async with semaphore:
+                return await self.fetch_taf_metar(icao)
+
+        results = await asyncio.gather(*(one(i) for i in icaos), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return {icao.upper(): r for icao, r in zip(icaos, results) if not isinstance(r, Exception)}
@@ -0,0 +1,286 @@
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from app.services.weather.base import TafMetar
+from app.core.config import settings
+
+_REPORT_TIME = re.compile(r"\b(\d{2})(\d{2})(\d{2})Z\b")
+
+def report_time(raw: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """Latest DDHHMMZ group in a METAR/TAF, resolved to a UTC datetime near `now`"""
+    if not raw:
+        return None
+    now = now or datetime.now(timezone.utc)
+    latest = None
+    for day, hour, minute in _REPORT_TIME.findall(raw):
+        # The group carries no month: take this month, or last month if that lands in the future
+        year, month, t = now.year, now.month, None
+        for _ in range(2):
+            try:
+                candidate = datetime(year, month, int(day), int(hour), int(minute), tzinfo=timezone.utc)
+            except ValueError:
+                candidate = None
+            if candidate is not None and candidate <= now + timedelta(hours=1):
+                t = candidate
+                break
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        if t is not None and (latest is None or t > latest):
+            latest = t
+    return latest
+
+def fresh_until(weather: TafMetar, now: Optional[float] = None) -> float:
+    """Epoch seconds until which a report should be served without refetching.
+
+    The next METAR is expected WEATHER_METAR_INTERVAL_MINUTES after the last
+    observation and the next TAF WEATHER_TAF_INTERVAL_HOURS after the last
+    issue, each plus WEATHER_PUBLISH_DELAY_SECONDS for distribution. A report
+    already past its next cycle (late station) is rechecked after the minimum
+    TTL. Empty results use the minimum TTL too.
+    """
+    now = now if now is not None else time.time()
+    now_dt = datetime.fromtimestamp(now, timezone.utc)
+    delay = settings.WEATHER_PUBLISH_DELAY_SECONDS
+    candidates = []
+    observed = report_time(weather.metar_raw, now_dt)
+    if observed is not None:
+        candidates.append(observed.timestamp() + settings.WEATHER_METAR_INTERVAL_MINUTES * 60 + delay)
+    issued = report_time(weather.taf_raw, now_dt)
+    if issued is not None:
+        candidates.append(issued.timestamp() + settings.WEATHER_TAF_INTERVAL_HOURS * 3600 + delay)
+    ttl = (min(candidates) - now) if candidates else 0
+    ttl = min(max(ttl, settings.WEATHER_CACHE_MIN_TTL_SECONDS), settings.WEATHER_CACHE_MAX_TTL_SECONDS)
+    return now + ttl
+
+@dataclass
+class CachedWeather:
+    weather: TafMetar
+    fetched_at: float
+    fresh_until: float
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.fresh_until
+
+    def is_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+class WeatherCache:
+    """Per-ICAO METAR/TAF cache.
+
+    Fresh entries are returned as-is. Stale entries (past the expected next
+    issue, within stale_s) are returned immediately while one background
+    refresh runs. Concurrent misses for the same station share a single
+    upstream fetch. With a path, entries are written through to SQLite so
+    every worker process and restart sees the same warm cache.
+    """
+
+    def __init__(self, stale_s: float = 1800.0, path: Optional[str] = None):
+        self.stale_s = stale_s
+        self.entries: Dict[str, CachedWeather] = {}
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.tasks = set()  # background refreshes, kept referenced until done
+        self.counters = {"fresh_hits": 0, "stale_hits": 0, "disk_hits": 0, "misses": 0,
+                         "coalesced": 0, "refreshes": 0, "errors": 0}
+        self.lock = threading.Lock()
+        self.conn = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS weather (icao TEXT PRIMARY KEY, metar TEXT, taf TEXT,"
+                " fetched_at REAL, fresh_until REAL, stale_until REAL, provider TEXT)"
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(weather)")]
+            if "provider" not in columns:
+                self.conn.execute("ALTER TABLE weather ADD COLUMN provider TEXT")
+            self.conn.commit()
+
+    def _from_disk(self, icao: str) -> Optional[CachedWeather]:
+        if self.conn is None:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT metar, taf, fetched_at, fresh_until, stale_until, provider FROM weather WHERE icao = ?", (icao,)
+            ).fetchone()
+        if row is None:
+            return None
+        metar, taf, fetched_at, fresh, stale, provider = row
+        return CachedWeather(TafMetar(icao, metar, taf, provider), fetched_at, fresh, stale)
+
+    def peek(self, icao: str) -> Optional[CachedWeather]:
+        """Newest entry from memory or disk, without fetching"""
+        icao = icao.upper()
+        entry = self.entries.get(icao)
+        if entry is not None and entry.is_fresh(time.time()):
+            return entry
+        disk = self._from_disk(icao)
+        if disk is not None and (entry is None or disk.fetched_at > entry.fetched_at):
+            # Another worker refreshed this station more recently
+            self.entries[icao] = entry = disk
+            self.counters["disk_hits"] += 1
+        return entry
+
+    def put(self, weather: TafMetar, now: Optional[float] = None) -> CachedWeather:
+        now = now if now is not None else time.time()
+        fresh = fresh_until(weather, now)
+        entry = CachedWeather(weather, now, fresh, fresh + self.stale_s)
+        self.entries[weather.icao] = entry
+        if self.conn is not None:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO weather (icao, metar, taf, fetched_at, fresh_until, stale_until, provider)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (weather.icao, weather.metar_raw, weather.taf_raw, entry.fetched_at, entry.fresh_until,
+                     entry.stale_until, weather.provider),
+                )
+                self.conn.commit()
+        return entry
+
+    async def _fetch(self, icao: str, fetch: Callable[[str], Awaitable[TafMetar]]) -> TafMetar:
+        """Run one upstream fetch per station; later callers await the same future"""
+        future = self.inflight.get(icao)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[icao] = future
+        try:
+            weather = await fetch(icao)
+            if weather.metar_raw or weather.taf_raw:
+                self.put(weather)
+            future.set_result(weather)
+            return weather
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.counters["errors"] += 1
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self.inflight.pop(icao, None)
+
+    def _refresh(self, icao: str, fetch: Callable[[str], Awaitable[TafMetar]]):
+        if icao in self.inflight:
+            return
+        self.counters["refreshes"] += 1
+
+        async def run():
+            try:
+                await self._fetch(icao, fetch)
+            except Exception as e:
+                print(f"❌ Background weather refresh for {icao} failed: {e}")
+
+        task = asyncio.create_task(run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def get(self, icao: str, fetch: Callable[[str], Awaitable[TafMetar]]) -> TafMetar:
+        icao = icao.upper()
+        now = time.time()
+        entry = self.peek(icao)
+        if entry is not None and entry.is_fresh(now):
+            self.counters["fresh_hits"] += 1
+            return entry.weather
+        if entry is not None and entry.is_usable(now):
+            self.counters["stale_hits"] += 1
+            self._refresh(icao, fetch)
+            return entry.weather
+        self.counters["misses"] += 1
+        return await self._fetch(icao, fetch)
+
+    async def get_many(self, icaos: List[str], fetch_many: Callable[[List[str]], Awaitable[Dict[str, TafMetar]]],
+                       fetch: Callable[[str], Awaitable[TafMetar]]) -> Dict[str, Union[TafMetar, Exception]]:
+        """Like get() for several stations: all misses go upstream in one fetch_many call.
+
+        Stations already being fetched are awaited rather than refetched.
+        Failures are returned per station as the exception.
+        """
+        now = time.time()
+        results: Dict[str, Union[TafMetar, Exception]] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: List[str] = []
+        for icao in dict.fromkeys(i.upper() for i in icaos):
+            entry = self.peek(icao)
+            if entry is not None and entry.is_fresh(now):
+                self.counters["fresh_hits"] += 1
+                results[icao] = entry.weather
+            elif entry is not None and entry.is_usable(now):
+                self.counters["stale_hits"] += 1
+                self._refresh(icao, fetch)
+                results[icao] = entry.weather
+            elif icao in self.inflight:
+                self.counters["coalesced"] += 1
+                waiting[icao] = self.inflight[icao]
+            else:
+                self.counters["misses"] += 1
+                missing.append(icao)
+
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = {icao: loop.create_future() for icao in missing}
+            self.inflight.update(futures)
+            try:
+                fetched = await fetch_many(missing)
+                for icao, future in futures.items():
+                    weather = fetched.get(icao) or TafMetar(icao, "", "")
+                    if weather.metar_raw or weather.taf_raw:
+                        self.put(weather)
+                    future.set_result(weather)
+                    results[icao] = weather
+            except asyncio.CancelledError:
+                for future in futures.values():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.counters["errors"] += 1
+                for icao, future in futures.items():
+                    future.set_exception(e)
+                    future.exception()
+                    results[icao] = e
+            finally:
+                for icao in missing:
+                    self.inflight.pop(icao, None)
+
+        for icao, future in waiting.items():
+            try:
+                results[icao] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                results[icao] = e
+        return results
+
+    def stats(self) -> Dict:
+        now = time.time()
+        return {
+            **self.counters,
+            "stations": {
+                icao: {
+                    "fetched_at": datetime.fromtimestamp(e.fetched_at, timezone.utc).isoformat(),
+                    "fresh_for_s": round(max(e.fresh_until - now, 0.0), 1),
+                    "state": "fresh" if e.is_fresh(now) else "stale" if e.is_usable(now) else "expired",
+                }
+                for icao, e in sorted(self.entries.items())
+            },
+            "persistent": self.conn is not None,
+        }
+
+_weather_cache = None
+def get_weather_cache() -> Optional[WeatherCache]:
+    global _weather_cache
+    if _weather_cache is None and settings.WEATHER_CACHE_ENABLED:
+        _weather_cache = WeatherCache(
+            stale_s=settings.WEATHER_CACHE_STALE_SECONDS,
+            path=settings.WEATHER_CACHE_PATH or None,
+        )
+    return _weather_cache
@@ -1,140 +1,690 @@
-from typing import Optional, Dict
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Dict, List, Sequence, Tuple
 import re
+from app.services.airfields import get_airfield_db
 from app.services.aviation_helpers import wind_components, density_altitude
+from app.services.performance import pressure_altitude_ft
+from app.services.decision_engine import classify_vmc
 
-def decode_metar(raw: Optional[str]) -> Dict:
-    """Basic METAR decoding without external dependencies"""
-    if not raw:
-        return {}
-    
-    raw = raw.strip()
-    result = {"raw": raw}
-    
-    try:
-        # Basic METAR parsing
-        parts = raw.split()
-        if len(parts) < 3:
-            return result
-        
-        # Extract basic wind information
-        wind_match = re.search(r'(\d{3})(\d{2,3})(?:G(\d{2,3}))?KT', raw)
-        if wind_match:
-            wind_dir = int(wind_match.group(1))
-            wind_speed = int(wind_match.group(2))
-            wind_gust = int(wind_match.group(3)) if wind_match.group(3) else None
-            
+# One compiled pattern per METAR group; each token is matched whole, once
+_TIME = re.compile(r"(\d{2})(\d{2})(\d{2})Z")
+_WIND = re.compile(r"(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?(KT|MPS|KMH)")
+_WIND_VAR = re.compile(r"(\d{3})V(\d{3})")
+_VIS_M = re.compile(r"(\d{4})(NDV)?")
+_VIS_SM = re.compile(r"([MP])?(?:(\d{1,2})|(\d)/(\d{1,2}))SM")
+_VIS_WHOLE = re.compile(r"\d")
+_VIS_FRACTION = re.compile(r"(\d)/(\d{1,2})SM")
+_RVR = re.compile(r"R(\d{2}[LCR]?)/([PM]?\d{4})(?:V([PM]?\d{4}))?(FT)?(?:/?([UDN]))?")
+_WX = re.compile(r"(-|\+|VC)?(MI|PR|BC|DR|BL|SH|TS|FZ)?((?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)*)")
+_CLOUD = re.compile(r"(FEW|SCT|BKN|OVC)(\d{3}|///)(CB|TCU|///)?")
+_VV = re.compile(r"VV(\d{3}|///)")
+_TEMP = re.compile(r"(M?\d{2})/(M?\d{2})?")
+_ALTIMETER = re.compile(r"([AQ])(\d{4})")
+
+_CLEAR = {"SKC", "CLR", "NSC", "NCD"}
+_COVER = {"FEW", "SCT", "BKN", "OVC"}
+_TREND = {"NOSIG", "BECMG", "TEMPO"}
+_MPS_TO_KT = 1.94384
+_KMH_TO_KT = 0.539957
+_SM_TO_KM = 1.609
+
+# Common runway headings used for the wind component table (T-6II operations)
+COMMON_RUNWAYS = (18, 36, 9, 27)  # used for stations not in the airfield database
+
+@dataclass(slots=True)
+class CloudLayer:
+    cover: str                  # FEW | SCT | BKN | OVC | VV
+    base_ft: Optional[int]
+    type: Optional[str] = None  # CB | TCU
+
+@dataclass(slots=True)
+class MetarReport:
+    """One decoded METAR/SPECI"""
+    raw: str
+    report_type: str = "METAR"
+    station: Optional[str] = None
+    observed: Optional[Tuple[int, int, int]] = None   # (day, hour, minute) UTC
+    auto: bool = False
+    corrected: bool = False
+    wind_dir_deg: Optional[int] = None               # None when variable (VRB)
+    wind_speed_kt: Optional[float] = None
+    wind_gust_kt: Optional[float] = None
+    wind_variable_from: Optional[int] = None
+    wind_variable_to: Optional[int] = None
+    visibility_km: Optional[float] = None
+    visibility_less_than: bool = False               # M1/4SM
+    cavok: bool = False
+    rvr: List[Dict] = field(default_factory=list)
+    weather: List[str] = field(default_factory=list)
+    clouds: List[CloudLayer] = field(default_factory=list)
+    temp_c: Optional[int] = None
+    dewpoint_c: Optional[int] = None
+    qnh_hpa: Optional[float] = None
+    altimeter_inhg: Optional[float] = None
+    trend: Optional[str] = None
+    remarks: Optional[str] = None
+    unparsed: List[str] = field(default_factory=list)
+
+    @property
+    def ceiling_ft(self) -> Optional[int]:
+        """Lowest broken/overcast layer or vertical visibility"""
+        bases = [c.base_ft for c in self.clouds if c.cover in ("BKN", "OVC", "VV") and c.base_ft is not None]
+        return min(bases) if bases else None
+
+    @property
+    def flight_rules(self) -> str:
+        if self.visibility_km is None:
+            return "unknown"
+        ceiling = self.ceiling_ft
+        # No BKN/OVC layer means no ceiling; classify it as unlimited
+        return classify_vmc(self.visibility_km, ceiling if ceiling is not None else 99999)
+
+    def to_dict(self) -> Dict:
+        """Dictionary form used by the routes (keeps the original decode_metar keys)"""
+        result: Dict = {"raw": self.raw, "station": self.station, "report_type": self.report_type}
+        if self.observed:
+            day, hour, minute = self.observed
+            result["observed"] = {"day": day, "hour": hour, "minute": minute, "text": f"{day:02d}{hour:02d}{minute:02d}Z"}
+        if self.wind_speed_kt is not None:
             result["wind"] = {
-                "dir_deg": wind_dir,
-                "speed_kt": wind_speed,
-                "gust_kt": wind_gust
+                "dir_deg": self.wind_dir_deg,
+                "speed_kt": self.wind_speed_kt,
+                "gust_kt": self.wind_gust_kt,
+                "variable": self.wind_dir_deg is None,
+                "variable_from_deg": self.wind_variable_from,
+                "variable_to_deg": self.wind_variable_to,
             }
-            
-            # Add wind components for common runway headings (T-6II operations)
-            common_runways = [18, 36, 9, 27]  # Add more as needed
-            wind_components_data = {}
-            for rwy in common_runways:
-                headwind, crosswind = wind_components(wind_dir, wind_speed, rwy)
-                wind_components_data[f"rwy_{rwy:02d}"] = {
-                    "headwind_kt": headwind,
-                    "crosswind_kt": crosswind
-                }
-            result["wind_components"] = wind_components_data
-        
-        # Extract visibility
-        vis_match = re.search(r'(\d{4})SM|(\d{1,2})SM', raw)
-        if vis_match:
-            if vis_match.group(1):
-                result["visibility_km"] = int(vis_match.group(1)) * 1.609  # Convert SM to km
+            if self.wind_dir_deg is not None:
+                # One wind against a handful of runways: scalar math is cheaper than NumPy here
+                components = {}
+                db = get_airfield_db()
+                rows = db.runway_rows(self.station) if self.station else None
+                if rows is not None and rows.start < rows.stop:
+                    runways = zip(db.runway_ident[rows].tolist(), db.runway_heading[rows].tolist())
+                else:
+                    runways = ((f"{rwy:02d}", rwy) for rwy in COMMON_RUNWAYS)
+                for ident, heading in runways:
+                    headwind, crosswind = wind_components(self.wind_dir_deg, self.wind_speed_kt, heading)
+                    components[f"rwy_{ident}"] = {"headwind_kt": headwind, "crosswind_kt": crosswind}
+                result["wind_components"] = components
+        if self.visibility_km is not None:
+            result["visibility_km"] = self.visibility_km
+        if self.cavok:
+            result["cavok"] = True
+        if self.rvr:
+            result["rvr"] = [dict(r) for r in self.rvr]  # the report itself is shared via the LRU cache
+        if self.weather:
+            result["weather"] = list(self.weather)
+        result["clouds"] = [{"cover": c.cover, "base_ft": c.base_ft, "type": c.type} for c in self.clouds]
+        ceiling = self.ceiling_ft
+        if ceiling is not None:
+            result["ceiling_ft"] = ceiling
+        if self.temp_c is not None:
+            result["temperature"] = {"temp_c": self.temp_c, "dewpoint_c": self.dewpoint_c}
+            # Field elevation from the airfield database (sea level for unknown
+            # stations), adjusted for QNH
+            pressure_alt_ft = get_airfield_db().pressure_altitude(self.station, self.qnh_hpa) if self.station else None
+            if pressure_alt_ft is None:
+                pressure_alt_ft = float(pressure_altitude_ft(0.0, self.qnh_hpa or None))
+            result["pressure_altitude_ft"] = round(pressure_alt_ft)
+            result["density_altitude_ft"] = density_altitude(pressure_alt_ft, self.temp_c)
+        if self.qnh_hpa is not None:
+            result["altimeter"] = {"qnh_hpa": self.qnh_hpa, "inhg": self.altimeter_inhg}
+        if self.trend:
+            result["trend"] = self.trend
+        if self.remarks:
+            result["remarks"] = self.remarks
+        result["flight_rules"] = ("unknown" if self.visibility_km is None
+                                  else classify_vmc(self.visibility_km, ceiling if ceiling is not None else 99999))
+        return result
+
+def _temperature(text: str) -> int:
+    return -int(text[1:]) if text.startswith("M") else int(text)
+
+def _rvr_value(text: Optional[str]) -> Optional[Dict]:
+    if not text:
+        return None
+    return {"value": int(text.lstrip("PM")), "modifier": {"P": "above", "M": "below"}.get(text[0])}
+
+# A line opening a new report: a type word, or a station followed by its issue/observation time
+_REPORT_START = re.compile(r"^(?:TAF|METAR|SPECI)\b|^[A-Z][A-Z0-9]{3}\s+\d{6}Z\b")
+_HEADER_WORDS = {"TAF", "METAR", "SPECI", "AMD", "COR", "RTD"}
+
+def _reports(raw: str) -> List[str]:
+    """Split a feed into reports, joining the wrapped continuation lines of each.
+
+    A report ends at a trailing "=" or where the next line starts a new one
+    (TAF/METAR/SPECI or "ICAO ddhhmmZ"); FM/BECMG/TEMPO lines continue it.
+    """
+    if "\n" not in raw:
+        return [raw.strip().rstrip("=").strip()]
+    reports: List[List[str]] = []
+    closed = True
+    for line in raw.strip().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        header_only = bool(reports) and all(w in _HEADER_WORDS for w in " ".join(reports[-1]).split())
+        if closed or (_REPORT_START.match(line) and not header_only):
+            reports.append([])
+        reports[-1].append(line.rstrip("=").strip())
+        closed = line.endswith("=")
+    return [" ".join(r) for r in reports]
+
+def _latest_report(raw: str) -> str:
+    """Feeds such as MET Norway return several reports; decode the latest one"""
+    reports = _reports(raw)
+    if len(reports) <= 1:
+        return reports[0] if reports else ""
+
+    def key(report: str):
+        m = _TIME.search(report)
+        return (m.group(1), m.group(2), m.group(3)) if m else ("", "", "")
+
+    return max(reports, key=key)
+
+@lru_cache(maxsize=4096)
+def parse_metar(raw: str) -> MetarReport:
+    """Decode a METAR in one pass over its space-separated groups"""
+    text = _latest_report(raw)
+    report = MetarReport(raw=text)
+    tokens = text.split()
+    n = len(tokens)
+    i = 0
+    if i < n and tokens[i] in ("METAR", "SPECI"):
+        report.report_type = tokens[i]
+        i += 1
+    if i < n and len(tokens[i]) == 4 and tokens[i].isalnum() and not tokens[i].isdigit():
+        report.station = tokens[i]
+        i += 1
+
+    while i < n:
+        tok = tokens[i]
+        i += 1
+        if tok == "RMK":
+            report.remarks = " ".join(tokens[i:])
+            break
+        if tok in _TREND:
+            # Trend groups forecast future conditions; keep them out of the observation
+            rest = []
+            while i < n and tokens[i] != "RMK":
+                rest.append(tokens[i])
+                i += 1
+            report.trend = " ".join([tok, *rest])
+            continue
+        # Each pattern is guarded by a cheap check on the group's shape, so most
+        # groups reach only the regex that decodes them
+        last = tok[-1]
+        if report.observed is None and last == "Z" and (m := _TIME.fullmatch(tok)):
+            report.observed = (int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        elif tok == "AUTO":
+            report.auto = True
+        elif tok in ("COR", "CCA"):
+            report.corrected = True
+        elif report.wind_speed_kt is None and last in "TSH" and (m := _WIND.fullmatch(tok)):
+            factor = {"KT": 1.0, "MPS": _MPS_TO_KT, "KMH": _KMH_TO_KT}[m.group(4)]
+            report.wind_dir_deg = None if m.group(1) == "VRB" else int(m.group(1))
+            report.wind_speed_kt = round(int(m.group(2)) * factor, 1)
+            report.wind_gust_kt = round(int(m.group(3)) * factor, 1) if m.group(3) else None
+        elif len(tok) == 7 and tok[3] == "V" and (m := _WIND_VAR.fullmatch(tok)):
+            report.wind_variable_from, report.wind_variable_to = int(m.group(1)), int(m.group(2))
+        elif tok == "CAVOK":
+            report.cavok = True
+            report.visibility_km = 10.0
+        elif report.visibility_km is None and (len(tok) == 4 or len(tok) == 7) and (m := _VIS_M.fullmatch(tok)):
+            metres = int(m.group(1))
+            report.visibility_km = 10.0 if metres == 9999 else metres / 1000
+        elif report.visibility_km is None and len(tok) == 1 and _VIS_WHOLE.fullmatch(tok) and i < n and (m := _VIS_FRACTION.fullmatch(tokens[i])):
+            # "1 1/2SM" is split over two groups
+            report.visibility_km = round((int(tok) + int(m.group(1)) / int(m.group(2))) * _SM_TO_KM, 2)
+            i += 1
+        elif report.visibility_km is None and last == "M" and (m := _VIS_SM.fullmatch(tok)):
+            miles = int(m.group(2)) if m.group(2) else int(m.group(3)) / int(m.group(4))
+            report.visibility_km = round(miles * _SM_TO_KM, 2)
+            report.visibility_less_than = m.group(1) == "M"
+        elif tok[0] == "R" and tok[1:2].isdigit() and (m := _RVR.fullmatch(tok)):
+            report.rvr.append({
+                "runway": m.group(1),
+                "min": _rvr_value(m.group(2)),
+                "max": _rvr_value(m.group(3)),
+                "unit": "ft" if m.group(4) else "m",
+                "tendency": m.group(5),
+            })
+        elif tok[:3] in _COVER and (m := _CLOUD.fullmatch(tok)):
+            base = None if m.group(2) == "///" else int(m.group(2)) * 100
+            cloud_type = m.group(3) if m.group(3) and m.group(3) != "///" else None
+            report.clouds.append(CloudLayer(m.group(1), base, cloud_type))
+        elif tok[:2] == "VV" and (m := _VV.fullmatch(tok)):
+            report.clouds.append(CloudLayer("VV", None if m.group(1) == "///" else int(m.group(1)) * 100))
+        elif tok in _CLEAR:
+            pass
+        elif "/" in tok and (m := _TEMP.fullmatch(tok)):
+            report.temp_c = _temperature(m.group(1))
+            report.dewpoint_c = _temperature(m.group(2)) if m.group(2) else None
+        elif len(tok) == 5 and (m := _ALTIMETER.fullmatch(tok)):
+            value = int(m.group(2))
+            if m.group(1) == "Q":
+                report.qnh_hpa = float(value)
+                report.altimeter_inhg = round(value / 33.8639, 2)
             else:
-                result["visibility_km"] = int(vis_match.group(2)) * 1.609
-        
-        # Extract ceiling information
-        ceiling_match = re.search(r'(BKN|OVC)(\d{3})', raw)
-        if ceiling_match:
-            result["ceiling_ft"] = int(ceiling_match.group(2)) * 100
-        
-        # Extract temperature and dewpoint
-        temp_match = re.search(r'(\d{2})/(\d{2})', raw)
-        if temp_match:
-            temp_c = int(temp_match.group(1))
-            dewpoint_c = int(temp_match.group(2))
-            result["temperature"] = {
-                "temp_c": temp_c,
-                "dewpoint_c": dewpoint_c
-            }
-            
-            # Calculate density altitude if we have pressure altitude
-            # For now, assume sea level (0 ft) - in real implementation, get from QNH
-            pressure_alt_ft = 0  # This should be calculated from QNH in real implementation
-            result["density_altitude_ft"] = density_altitude(pressure_alt_ft, temp_c)
-        
-        # Basic flight rules determination
-        if "OVC" in raw or "BKN" in raw:
-            result["flight_rules"] = "IFR" if "OVC" in raw else "MVFR"
-        elif "FEW" in raw or "SCT" in raw:
-            result["flight_rules"] = "VFR"
+                report.altimeter_inhg = value / 100
+                report.qnh_hpa = round(report.altimeter_inhg * 33.8639, 1)
+        elif (m := _WX.fullmatch(tok)) and (m.group(2) or m.group(3)):
+            report.weather.append(tok)
+        elif tok == "NSW" or tok.startswith("RE"):
+            report.weather.append(tok)
         else:
-            result["flight_rules"] = "VFR"
-            
+            report.unparsed.append(tok)
+    return report
+
+@lru_cache(maxsize=4096)
+def _metar_dict(raw: str) -> Dict:
+    return parse_metar(raw).to_dict()
+
+def decode_metar(raw: Optional[str]) -> Dict:
+    """Decode a METAR into the dictionary used across the API ({} for no report).
+
+    The dict form is cached per raw string (the airfield lookup, wind
+    components and PA/DA are computed once); callers get a shallow copy, so
+    they may add or replace top-level keys but must not mutate nested values.
+    """
+    if not raw or not raw.strip():
+        return {}
+    try:
+        return dict(_metar_dict(raw.strip()))
     except Exception as e:
-        result["error"] = str(e)
-    
+        return {"raw": raw.strip(), "error": str(e)}
+
+# TAF groups (see parse_taf)
+_TAF_VALIDITY = re.compile(r"(\d{2})(\d{2})/(\d{2})(\d{2})")
+_TAF_FM = re.compile(r"FM(\d{2})(\d{2})(\d{2})")
+_TAF_PROB = re.compile(r"PROB(\d{2})")
+_TAF_TEMP = re.compile(r"T[XN]M?\d{2}/\d{4}Z")
+
+# Plain-language names for the TAF summary
+_WX_WORDS = {"SH": "showers", "TS": "thunderstorms", "RA": "rain", "DZ": "drizzle", "SN": "snow",
+             "FG": "fog", "BR": "mist", "HZ": "haze", "GR": "hail", "FZ": "freezing"}
+
+def _resolve_time(day: int, hour: int, minute: int, reference: datetime) -> datetime:
+    """DD/HH/MM from a TAF as the UTC datetime closest to `reference` (hour 24 allowed)"""
+    best = None
+    for months in (0, -1, 1):
+        year, month = reference.year, reference.month + months
+        if month < 1:
+            year, month = year - 1, 12
+        elif month > 12:
+            year, month = year + 1, 1
+        try:
+            t = datetime(year, month, day, tzinfo=timezone.utc) + timedelta(hours=hour, minutes=minute)
+        except ValueError:
+            continue
+        if best is None or abs(t - reference) < abs(best - reference):
+            best = t
+    return best or reference
+
+@dataclass(slots=True)
+class TafPeriod:
+    """One TAF segment: the base forecast or a FM/BECMG/TEMPO/PROB change group.
+
+    Unset fields are None; for weather and clouds an empty sequence means
+    explicitly none (NSW, NSC, SKC, CAVOK).
+    """
+    kind: str                     # BASE | FM | BECMG | TEMPO | PROB
+    start: datetime
+    end: datetime
+    probability: Optional[int] = None
+    raw: str = ""
+    wind_dir_deg: Optional[int] = None
+    wind_speed_kt: Optional[float] = None
+    wind_gust_kt: Optional[float] = None
+    visibility_km: Optional[float] = None
+    weather: Optional[Sequence[str]] = None
+    clouds: Optional[Sequence[CloudLayer]] = None
+
+    @property
+    def temporary(self) -> bool:
+        """TEMPO/PROB groups only fluctuate; they never become the prevailing forecast"""
+        return self.kind in ("TEMPO", "PROB")
+
+    def merged_into(self, base: "TafPeriod", kind: str, start: datetime, end: datetime) -> "TafPeriod":
+        """Conditions after this change: its own values where given, base values elsewhere"""
+        wind_given = self.wind_speed_kt is not None
+        return TafPeriod(
+            kind=kind, start=start, end=end, raw=self.raw,
+            wind_dir_deg=self.wind_dir_deg if wind_given else base.wind_dir_deg,
+            wind_speed_kt=self.wind_speed_kt if wind_given else base.wind_speed_kt,
+            wind_gust_kt=self.wind_gust_kt if wind_given else base.wind_gust_kt,
+            visibility_km=self.visibility_km if self.visibility_km is not None else base.visibility_km,
+            weather=self.weather if self.weather is not None else base.weather,
+            clouds=self.clouds if self.clouds is not None else base.clouds,
+        )
+
+    @property
+    def ceiling_ft(self) -> Optional[int]:
+        bases = [c.base_ft for c in self.clouds or [] if c.cover in ("BKN", "OVC", "VV") and c.base_ft is not None]
+        return min(bases) if bases else None
+
+    def conditions(self) -> Dict:
+        """Same keys as decode_metar, so decision_engine.analyze_weather accepts it"""
+        ceiling = self.ceiling_ft
+        result: Dict = {
+            "kind": self.kind,
+            "probability": self.probability,
+            "from": self.start.isoformat(),
+            "to": self.end.isoformat(),
+            "visibility_km": self.visibility_km,
+            "ceiling_ft": ceiling,
+            "weather": list(self.weather or []),
+            "clouds": [{"cover": c.cover, "base_ft": c.base_ft, "type": c.type} for c in self.clouds or []],
+            "flight_rules": ("unknown" if self.visibility_km is None
+                             else classify_vmc(self.visibility_km, ceiling if ceiling is not None else 99999)),
+        }
+        if self.wind_speed_kt is not None:
+            result["wind"] = {"dir_deg": self.wind_dir_deg, "speed_kt": self.wind_speed_kt, "gust_kt": self.wind_gust_kt}
+        return result
+
+def _worst(periods: List[TafPeriod]) -> Dict:
+    """Most restrictive combination of several periods' conditions"""
+    vis = [p.visibility_km for p in periods if p.visibility_km is not None]
+    ceilings = [p.ceiling_ft for p in periods if p.ceiling_ft is not None]
+    winds = [p for p in periods if p.wind_speed_kt is not None]
+    strongest = max(winds, key=lambda p: max(p.wind_speed_kt, p.wind_gust_kt or 0), default=None)
+    weather = list(dict.fromkeys(w for p in periods for w in p.weather or []))
+    visibility = min(vis) if vis else None
+    ceiling = min(ceilings) if ceilings else None
+    result: Dict = {
+        "visibility_km": visibility,
+        "ceiling_ft": ceiling,
+        "weather": weather,
+        "clouds": [{"cover": c.cover, "base_ft": c.base_ft, "type": c.type} for p in periods for c in p.clouds or []],
+        "flight_rules": ("unknown" if visibility is None
+                         else classify_vmc(visibility, ceiling if ceiling is not None else 99999)),
+        "sources": list(dict.fromkeys(p.kind if p.probability is None else f"{p.kind}{p.probability}" for p in periods)),
+    }
+    if strongest is not None:
+        result["wind"] = {
+            "dir_deg": strongest.wind_dir_deg,
+            "speed_kt": max(p.wind_speed_kt for p in winds),
+            "gust_kt": max((p.wind_gust_kt for p in winds if p.wind_gust_kt), default=None),
+        }
     return result
 
+class IntervalIndex:
+    """Periods that may overlap, looked up by time.
+
+    Periods are sorted by start with a running maximum of end times, so a
+    point query is a bisect plus a backwards scan that stops as soon as no
+    earlier period can still be open: O(log n + k) for k matches.
+    """
+
+    def __init__(self, periods: List[TafPeriod]):
+        self.periods = sorted(periods, key=lambda p: (p.start, p.end))
+        self.starts = [p.start for p in self.periods]
+        self.max_end = []
+        latest = None
+        for p in self.periods:
+            latest = p.end if latest is None or p.end > latest else latest
+            self.max_end.append(latest)
+
+    def overlapping(self, start: datetime, end: Optional[datetime] = None) -> List[TafPeriod]:
+        """Periods intersecting [start, end) (or containing `start` when end is None)"""
+        end = end or start
+        found = []
+        i = bisect_right(self.starts, end if end > start else start) - 1
+        while i >= 0 and self.max_end[i] > start:
+            p = self.periods[i]
+            if p.end > start and (p.start < end or p.start <= start):
+                found.append(p)
+            i -= 1
+        found.reverse()
+        return found
+
+@dataclass(slots=True)
+class TafReport:
+    """A decoded TAF: ordered periods plus indexes for time lookups.
+
+    parse_taf caches reports and hands the same instance to every caller, so
+    treat it as read-only; period sequences are tuples once parsing finishes.
+    """
+    raw: str
+    station: Optional[str] = None
+    issued: Optional[datetime] = None
+    valid_from: Optional[datetime] = None
+    valid_to: Optional[datetime] = None
+    amended: bool = False
+    periods: Sequence[TafPeriod] = field(default_factory=list)       # as written, sorted by start
+    prevailing: Sequence[TafPeriod] = field(default_factory=list)    # non-overlapping timeline from BASE/FM/BECMG
+    changes: Optional[IntervalIndex] = None                      # TEMPO/PROB and BECMG transition windows
+    _starts: List[datetime] = field(default_factory=list)
+
+    def prevailing_at(self, t: datetime) -> Optional[TafPeriod]:
+        i = bisect_right(self._starts, t) - 1
+        if i < 0 or t >= self.prevailing[i].end:
+            return None
+        return self.prevailing[i]
+
+    def at(self, t: datetime) -> Dict:
+        """Prevailing and worst-case conditions forecast for time t"""
+        base = self.prevailing_at(t)
+        extra = self.changes.overlapping(t) if self.changes else []
+        candidates = ([base] if base else []) + extra
+        return {
+            "time": t.isoformat(),
+            "in_validity": base is not None,
+            "prevailing": base.conditions() if base else None,
+            "worst": _worst(candidates) if candidates else None,
+            "changes": [p.conditions() for p in extra],
+        }
+
+    def window(self, start: datetime, end: datetime) -> Dict:
+        """Everything forecast over [start, end), with the worst case across it"""
+        i = max(bisect_right(self._starts, start) - 1, 0)
+        base = []
+        while i < len(self.prevailing) and self.prevailing[i].start < end:
+            if self.prevailing[i].end > start:
+                base.append(self.prevailing[i])
+            i += 1
+        extra = self.changes.overlapping(start, end) if self.changes else []
+        candidates = base + extra
+        return {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "prevailing": [p.conditions() for p in base],
+            "changes": [p.conditions() for p in extra],
+            "worst": _worst(candidates) if candidates else None,
+        }
+
+    def timeline(self) -> List[Dict]:
+        return [p.conditions() for p in self.prevailing]
+
+def _build_timeline(report: TafReport):
+    """Prevailing segments: FM replaces conditions, BECMG applies from the end of its window"""
+    events = sorted((p for p in report.periods if not p.temporary and p.kind != "BASE"), key=lambda p: p.start)
+    base = next((p for p in report.periods if p.kind == "BASE"), None)
+    if base is None:
+        return
+    current = base.merged_into(base, "BASE", base.start, base.end)
+    timeline = []
+    for change in events:
+        effective = change.start if change.kind == "FM" else change.end
+        if effective <= current.start:
+            effective = current.start
+        if effective > current.start:
+            current.end = effective
+            timeline.append(current)
+        if change.kind == "FM":
+            current = change.merged_into(TafPeriod("BASE", effective, effective), "FM", effective, report.valid_to or base.end)
+        else:
+            current = change.merged_into(current, "BECMG", effective, report.valid_to or base.end)
+    current.end = report.valid_to or base.end
+    if current.end > current.start:
+        timeline.append(current)
+    report.prevailing = timeline
+    report._starts = [p.start for p in timeline]
+    # During a BECMG window either the old or the new conditions may apply
+    report.changes = IntervalIndex([p for p in report.periods if p.temporary or p.kind == "BECMG"])
+
+def parse_taf(raw: str, reference: Optional[datetime] = None) -> TafReport:
+    """Decode a TAF into validity-stamped periods (times resolved around `reference`, default now).
+
+    Reports are cached per (raw, reference); the default reference is the
+    current hour, so a TAF without an issue time is never resolved against a
+    stale "now". The returned report is shared: do not modify it.
+    """
+    if reference is None:
+        reference = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return _parse_taf(raw, reference)
+
+def _freeze(report: TafReport):
+    """Swap the period lists for tuples so the cached report can't be changed in place"""
+    for p in (*report.periods, *report.prevailing):
+        if p.weather is not None:
+            p.weather = tuple(p.weather)
+        if p.clouds is not None:
+            p.clouds = tuple(p.clouds)
+    report.periods = tuple(report.periods)
+    report.prevailing = tuple(report.prevailing)
+
+@lru_cache(maxsize=1024)
+def _parse_taf(raw: str, reference: datetime) -> TafReport:
+    text = _latest_report(raw)
+    report = TafReport(raw=text)
+    tokens = text.split()
+    n = len(tokens)
+    i = 0
+    while i < n and tokens[i] in ("TAF", "AMD", "COR", "RTD"):
+        report.amended = report.amended or tokens[i] in ("AMD", "COR")
+        i += 1
+    if i < n and len(tokens[i]) == 4 and tokens[i].isalpha():
+        report.station = tokens[i]
+        i += 1
+    if i < n and (m := _TIME.fullmatch(tokens[i])):
+        report.issued = _resolve_time(int(m.group(1)), int(m.group(2)), int(m.group(3)), reference)
+        reference = report.issued
+        i += 1
+    if i < n and (m := _TAF_VALIDITY.fullmatch(tokens[i])):
+        report.valid_from = _resolve_time(int(m.group(1)), int(m.group(2)), 0, reference)
+        report.valid_to = _resolve_time(int(m.group(3)), int(m.group(4)), 0, report.valid_from + timedelta(hours=12))
+        i += 1
+    valid_from = report.valid_from or reference
+    valid_to = report.valid_to or valid_from + timedelta(hours=24)
+
+    period = TafPeriod("BASE", valid_from, valid_to)
+    words: List[str] = []
+    prob: Optional[int] = None
+
+    def close():
+        period.raw = " ".join(words)
+        report.periods.append(period)
+
+    while i < n:
+        tok = tokens[i]
+        i += 1
+        if tok == "RMK":
+            break
+        if m := _TAF_FM.fullmatch(tok):
+            close()
+            start = _resolve_time(int(m.group(1)), int(m.group(2)), int(m.group(3)), valid_from)
+            period, words, prob = TafPeriod("FM", start, valid_to), [tok], None
+            continue
+        if m := _TAF_PROB.fullmatch(tok):
+            close()
+            prob = int(m.group(1))
+            period, words = TafPeriod("PROB", valid_from, valid_to, probability=prob), [tok]
+            continue
+        if tok in ("BECMG", "TEMPO"):
+            if prob is not None and words == [f"PROB{prob}"]:
+                words.append(tok)   # PROB30 TEMPO: one probabilistic temporary group
+            else:
+                close()
+                period, words, prob = TafPeriod(tok, valid_from, valid_to), [tok], None
+            continue
+        words.append(tok)
+        if period.kind != "BASE" and (m := _TAF_VALIDITY.fullmatch(tok)):
+            period.start = _resolve_time(int(m.group(1)), int(m.group(2)), 0, valid_from)
+            period.end = _resolve_time(int(m.group(3)), int(m.group(4)), 0, period.start + timedelta(hours=6))
+        elif m := _WIND.fullmatch(tok):
+            factor = {"KT": 1.0, "MPS": _MPS_TO_KT, "KMH": _KMH_TO_KT}[m.group(4)]
+            period.wind_dir_deg = None if m.group(1) == "VRB" else int(m.group(1))
+            period.wind_speed_kt = round(int(m.group(2)) * factor, 1)
+            period.wind_gust_kt = round(int(m.group(3)) * factor, 1) if m.group(3) else None
+        elif tok == "CAVOK":
+            period.visibility_km, period.clouds, period.weather = 10.0, [], []
+        elif m := _VIS_M.fullmatch(tok):
+            metres = int(m.group(1))
+            period.visibility_km = 10.0 if metres == 9999 else metres / 1000
+        elif _VIS_WHOLE.fullmatch(tok) and i < n and (m := _VIS_FRACTION.fullmatch(tokens[i])):
+            period.visibility_km = round((int(tok) + int(m.group(1)) / int(m.group(2))) * _SM_TO_KM, 2)
+            words.append(tokens[i])
+            i += 1
+        elif m := _VIS_SM.fullmatch(tok):
+            miles = int(m.group(2)) if m.group(2) else int(m.group(3)) / int(m.group(4))
+            period.visibility_km = round(miles * _SM_TO_KM, 2)
+        elif m := _CLOUD.fullmatch(tok):
+            base = None if m.group(2) == "///" else int(m.group(2)) * 100
+            cloud_type = m.group(3) if m.group(3) and m.group(3) != "///" else None
+            period.clouds = (period.clouds or []) + [CloudLayer(m.group(1), base, cloud_type)]
+        elif m := _VV.fullmatch(tok):
+            period.clouds = (period.clouds or []) + [CloudLayer("VV", None if m.group(1) == "///" else int(m.group(1)) * 100)]
+        elif tok in _CLEAR:
+            period.clouds = []
+        elif tok == "NSW":
+            period.weather = []
+        elif _TAF_TEMP.fullmatch(tok):
+            pass
+        elif (m := _WX.fullmatch(tok)) and (m.group(2) or m.group(3)):
+            period.weather = (period.weather or []) + [tok]
+    close()
+    report.periods.sort(key=lambda p: p.start)
+    _build_timeline(report)
+    _freeze(report)
+    return report
+
 def decode_taf(raw: Optional[str]) -> Dict:
-    """Basic TAF decoding without external dependencies"""
-    if not raw:
+    """Decode a TAF into the dictionary used across the API ({} for no report)"""
+    if not raw or not raw.strip():
         return {}
-    
     raw = raw.strip()
-    result = {"raw": raw}
-    
     try:
-        # Basic TAF parsing - extract key information
-        parts = raw.split()
-        
-        # Extract wind information
-        wind_match = re.search(r'(\d{3})(\d{2,3})KT', raw)
-        if wind_match:
-            result["wind"] = {
-                "dir_deg": int(wind_match.group(1)),
-                "speed_kt": int(wind_match.group(2))
-            }
-        
-        # Extract visibility
-        vis_match = re.search(r'(\d{4})SM|(\d{1,2})SM', raw)
-        if vis_match:
-            if vis_match.group(1):
-                result["visibility_km"] = int(vis_match.group(1)) * 1.609
-            else:
-                result["visibility_km"] = int(vis_match.group(2)) * 1.609
-        
-        # Extract weather conditions
-        weather_conditions = []
-        if "SH" in raw:
-            weather_conditions.append("showers")
-        if "RA" in raw:
-            weather_conditions.append("rain")
-        if "SN" in raw:
-            weather_conditions.append("snow")
-        if "FG" in raw:
-            weather_conditions.append("fog")
-        
-        if weather_conditions:
-            result["weather"] = weather_conditions
-        
-        # Basic summary
-        summary_parts = []
-        if "wind" in result:
-            summary_parts.append(f"Wind {result['wind']['dir_deg']}° at {result['wind']['speed_kt']} kt")
-        if "visibility_km" in result:
-            summary_parts.append(f"Visibility {result['visibility_km']:.1f} km")
-        if weather_conditions:
-            summary_parts.append(f"Weather: {', '.join(weather_conditions)}")
-        
-        result["summary"] = "; ".join(summary_parts) if summary_parts else "TAF data available"
-        
+        report = parse_taf(raw)
     except Exception as e:
-        result["error"] = str(e)
-    
+        return {"raw": raw, "error": str(e)}
+
+    result: Dict = {
+        "raw": report.raw,
+        "station": report.station,
+        "issued": report.issued.isoformat() if report.issued else None,
+        "valid_from": report.valid_from.isoformat() if report.valid_from else None,
+        "valid_to": report.valid_to.isoformat() if report.valid_to else None,
+        "amended": report.amended,
+    }
+    base = report.prevailing[0].conditions() if report.prevailing else {}
+    if "wind" in base:
+        result["wind"] = {"dir_deg": base["wind"]["dir_deg"], "speed_kt": base["wind"]["speed_kt"]}
+    if base.get("visibility_km") is not None:
+        result["visibility_km"] = base["visibility_km"]
+    # Phenomena anywhere in the forecast, in plain words
+    codes = [w for p in report.periods for w in p.weather or []]
+    weather_conditions = [word for code, word in _WX_WORDS.items() if any(code in c for c in codes)]
+    if weather_conditions:
+        result["weather"] = weather_conditions
+    result["periods"] = [p.conditions() for p in report.periods]
+    result["timeline"] = report.timeline()
+
+    # Basic summary
+    summary_parts = []
+    if "wind" in result:
+        direction = "VRB" if result["wind"]["dir_deg"] is None else f"{result['wind']['dir_deg']}°"
+        summary_parts.append(f"Wind {direction} at {result['wind']['speed_kt']} kt")
+    if "visibility_km" in result:
+        summary_parts.append(f"Visibility {result['visibility_km']:.1f} km")
+    if weather_conditions:
+        summary_parts.append(f"Weather: {', '.join(weather_conditions)}")
+    changes = len(report.periods) - 1
+    if changes > 0:
+        summary_parts.append(f"{changes} change group{'s' if changes != 1 else ''}")
+    result["summary"] = "; ".join(summary_parts) if summary_parts else "TAF data available"
     return result
@@ -1,51 +1,250 @@
-from typing import List, Optional
+import asyncio
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
 from app.services.weather.base import WeatherProvider, TafMetar
 from app.services.weather.metno import MetNoTafMetarProvider
 from app.services.weather.metservice import MetServiceProvider
 from app.core.config import settings
 
+class ProviderHealth:
+    """Rolling latency/error window and circuit breaker for one provider.
+
+    The breaker opens after `failure_threshold` consecutive failures. After
+    `cooldown_s` it goes half-open and lets a single trial request through:
+    success closes it, failure opens it again.
+    """
+
+    def __init__(self, name: str, window: int = 50, failure_threshold: int = 3, cooldown_s: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.outcomes = deque(maxlen=window)   # (ok, latency_s); latency is None for bulk calls
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.empty = 0
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_s:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def release(self):
+        """A request ended without an outcome (cancelled by a hedge winner)"""
+        self.trial_in_flight = False
+
+    def record_success(self, latency_s: Optional[float], empty: bool = False):
+        self.requests += 1
+        self.empty += int(empty)
+        self.outcomes.append((True, latency_s))
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+        self.state = "closed"
+
+    def record_failure(self, latency_s: Optional[float], error: str):
+        self.requests += 1
+        self.failures += 1
+        self.outcomes.append((False, latency_s))
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"⚠️ Circuit breaker opened for {self.name}: {error}")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        latencies = [lat for ok, lat in self.outcomes if ok and lat is not None]
+        if not latencies:
+            return None
+        return float(np.percentile(latencies, q))
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    def snapshot(self) -> Dict:
+        p50, p95 = self.latency_percentile(50), self.latency_percentile(95)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "score": round(1.0 - self.error_rate(), 3),   # success rate over the rolling window
+            "error_rate": round(self.error_rate(), 3),
+            "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "empty_results": self.empty,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
 class WeatherManager:
-    """Manages multiple weather providers with fallback logic"""
-    
+    """Manages multiple weather providers with fallback logic.
+
+    Providers are tried in preference order, skipping any whose circuit
+    breaker is open. With hedging on, the next provider is started when the
+    current one has not answered within its own p95 latency (bounded by
+    WEATHER_HEDGE_MIN/MAX_DELAY_MS); the first non-empty result wins and the
+    other request is cancelled.
+    """
+
     def __init__(self):
         self.providers: List[WeatherProvider] = []
-        
+
         # Add CheckWX (via MetServiceProvider) first (most reliable for aviation weather)
         if settings.CHECKWX_API_KEY:
             self.providers.append(MetServiceProvider())
             print("✅ CheckWX provider configured")
-        
+
         # Add MET Norway as fallback (always available)
         self.providers.append(MetNoTafMetarProvider())
         print("✅ MET Norway provider configured")
-    
+
+        self.health: Dict[str, ProviderHealth] = {
+            p.name: ProviderHealth(
+                p.name,
+                window=settings.WEATHER_HEALTH_WINDOW,
+                failure_threshold=settings.WEATHER_BREAKER_FAILURES,
+                cooldown_s=settings.WEATHER_BREAKER_COOLDOWN_SECONDS,
+            )
+            for p in self.providers
+        }
+        self.hedge = settings.WEATHER_HEDGE_ENABLED
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _hedge_delay(self, provider: WeatherProvider) -> float:
+        health = self.health[provider.name]
+        low, high = settings.WEATHER_HEDGE_MIN_DELAY_MS / 1000, settings.WEATHER_HEDGE_MAX_DELAY_MS / 1000
+        if sum(1 for ok, lat in health.outcomes if ok and lat is not None) < 5:
+            return high  # not enough samples for a meaningful percentile yet
+        return min(max(health.latency_percentile(settings.WEATHER_HEDGE_PERCENTILE), low), high)
+
+    async def _attempt(self, provider: WeatherProvider, icao: str) -> TafMetar:
+        health = self.health[provider.name]
+        started = time.perf_counter()
+        try:
+            result = await provider.fetch_taf_metar(icao)
+        except asyncio.CancelledError:
+            health.release()
+            raise
+        except Exception as e:
+            health.record_failure(time.perf_counter() - started, str(e))
+            raise
+        health.record_success(time.perf_counter() - started, empty=not (result.metar_raw or result.taf_raw))
+        result.provider = provider.name
+        return result
+
     async def fetch_weather(self, icao: str) -> TafMetar:
         """Fetch weather data using available providers with fallback"""
+        queue = list(self.providers)
+        pending: Dict[asyncio.Task, WeatherProvider] = {}
+        last_launch = [0.0]
+
+        def launch() -> bool:
+            while queue:
+                provider = queue.pop(0)
+                if self.health[provider.name].allow():
+                    pending[asyncio.create_task(self._attempt(provider, icao))] = provider
+                    last_launch[0] = time.monotonic()
+                    return True
+            return False
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and queue:
+                    delay = self._hedge_delay(next(reversed(pending.values())))
+                    timeout = max(last_launch[0] + delay - time.monotonic(), 0.0)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slow provider: race the next one against it
+                    if launch():
+                        self.hedges += 1
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is not None:
+                        print(f"❌ Error with {provider.name}: {task.exception()}")
+                        continue
+                    result = task.result()
+                    # Check if we got meaningful data
+                    if result.metar_raw or result.taf_raw:
+                        if provider is not self.providers[0] and pending:
+                            self.hedge_wins += 1
+                        print(f"✅ Weather data fetched from {provider.name}")
+                        return result
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # If all providers failed, return empty result
+        print("❌ All weather providers failed")
+        return TafMetar(icao=icao, metar_raw="", taf_raw="")
+
+    async def fetch_weather_many(self, icaos: List[str]) -> Dict[str, TafMetar]:
+        """Bulk lookup: each provider in turn gets one batched call for the stations still missing"""
+        results: Dict[str, TafMetar] = {}
+        missing = list(dict.fromkeys(i.upper() for i in icaos))
         for provider in self.providers:
+            if not missing:
+                break
+            health = self.health[provider.name]
+            if not health.allow():
+                continue
             try:
-                result = await provider.fetch_taf_metar(icao)
-                # Check if we got meaningful data
-                if result.metar_raw or result.taf_raw:
-                    print(f"✅ Weather data fetched from {provider.__class__.__name__}")
-                    return result
+                batch = await provider.fetch_many(missing, concurrency=settings.WEATHER_BULK_CONCURRENCY)
+            except asyncio.CancelledError:
+                health.release()
+                raise
             except Exception as e:
-                print(f"❌ Error with {provider.__class__.__name__}: {e}")
+                # Batch latency says nothing about single-request latency, so it is not recorded
+                health.record_failure(None, str(e))
+                print(f"❌ Bulk error with {provider.name}: {e}")
                 continue
-        
-        # If all providers failed, return empty result
-        print("❌ All weather providers failed")
-        return TafMetar(icao=icao, metar_raw="", taf_raw="")
-    
+            found = {i: w for i, w in batch.items() if w.metar_raw or w.taf_raw}
+            health.record_success(None, empty=not found)
+            for icao, weather in found.items():
+                weather.provider = provider.name
+                results[icao] = weather
+            missing = [i for i in missing if i not in results]
+        for icao in missing:
+            results[icao] = TafMetar(icao=icao, metar_raw="", taf_raw="")
+        return results
+
     def get_provider_info(self) -> List[str]:
         """Get information about configured providers"""
         info = []
+        if not settings.CHECKWX_API_KEY:
+            info.append("CheckWX: not configured")
         for provider in self.providers:
-            if isinstance(provider, MetServiceProvider):
-                status = "configured" if settings.CHECKWX_API_KEY else "not configured"
-                info.append(f"CheckWX: {status}")
-            elif isinstance(provider, MetNoTafMetarProvider):
-                info.append("MET Norway: available (free)")
+            info.append(f"{provider.name}: {self.health[provider.name].state}")
         return info
 
+    def get_provider_health(self) -> Dict:
+        return {
+            "health": [self.health[p.name].snapshot() for p in self.providers],
+            "hedging": {"enabled": self.hedge, "hedged_requests": self.hedges, "hedge_wins": self.hedge_wins},
+        }
+
 # Global weather manager instance
 weather_manager = WeatherManager()
@@ -1,20 +1,29 @@
-import os
-import httpx
-from app.services.weather.base import WeatherProvider, TafMetar
+import asyncio
+from typing import Optional
+from app.services.weather.base import WeatherProvider, WeatherProviderError, TafMetar
+from app.services.http_client import provider_get
+from app.core.config import settings
 
-UA = os.getenv("METNO_USER_AGENT", "AviaGenAI/0.1 (contact: you@example.com)")
+UA = settings.METNO_USER_AGENT
 
 class MetNoTafMetarProvider(WeatherProvider):
+    name = "MET Norway"
     BASE = "https://api.met.no/weatherapi/tafmetar/1.0"
 
-    async def fetch_taf_metar(self, icao: str) -> TafMetar:
+    async def _fetch_text(self, product: str, icao: str) -> Optional[str]:
         headers = {"User-Agent": UA, "Accept": "text/plain"}
-        metar_raw, taf_raw = None, None
-        async with httpx.AsyncClient(timeout=20.0, headers=headers) as client:
-            m = await client.get(f"{self.BASE}/metar.txt", params={"icao": icao})
-            if m.status_code == 200:
-                metar_raw = m.text
-            t = await client.get(f"{self.BASE}/taf.txt", params={"icao": icao})
-            if t.status_code == 200:
-                taf_raw = t.text
-        return TafMetar(icao, metar_raw, taf_raw)
+        try:
+            r = await provider_get("metno", f"{self.BASE}/{product}.txt", params={"icao": icao}, headers=headers)
+        except Exception as e:
+            raise WeatherProviderError(f"MET Norway {product.upper()} request failed: {e!r}") from e
+        if r.status_code == 429 or r.status_code >= 500:
+            raise WeatherProviderError(f"MET Norway {product.upper()} returned HTTP {r.status_code}")
+        return r.text if r.status_code == 200 else None
+
+    async def fetch_taf_metar(self, icao: str) -> TafMetar:
+        # METAR and TAF are independent requests; fetch them together
+        metar_raw, taf_raw = await asyncio.gather(
+            self._fetch_text("metar", icao),
+            self._fetch_text("taf", icao),
+        )
+        return TafMetar(icao, metar_raw, taf_raw, provider=self.name)
@@ -1,11 +1,12 @@
-import os
-import httpx
-from typing import Optional, Dict
-from app.services.weather.base import WeatherProvider, TafMetar
+import asyncio
+from typing import Optional, Dict, List
+from app.services.weather.base import WeatherProvider, WeatherProviderError, TafMetar
+from app.services.http_client import provider_get
 from app.core.config import settings
 
 class MetServiceProvider(WeatherProvider):
     """CheckWX API provider (most reliable aviation weather)"""
+    name = "CheckWX"
     
     def __init__(self):
         self.api_key = settings.CHECKWX_API_KEY
@@ -15,51 +16,95 @@ class MetServiceProvider(WeatherProvider):
             "Accept": "application/json"
         }
     
+    async def _fetch_first(self, product: str, icao: str) -> Optional[str]:
+        """First report of a CheckWX product ("metar" or "taf"); None when there is none"""
+        try:
+            response = await provider_get("checkwx", f"{self.base_url}/{product}/{icao}", headers=self.headers)
+        except Exception as e:
+            raise WeatherProviderError(f"CheckWX {product.upper()} request failed: {e!r}") from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise WeatherProviderError(f"CheckWX {product.upper()} returned HTTP {response.status_code}")
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("results", 0) > 0 and data.get("data"):
+                return data["data"][0]  # Get the first report
+        return None
+    
     async def fetch_taf_metar(self, icao: str) -> TafMetar:
         """Fetch TAF and METAR data from CheckWX API"""
         if not self.api_key:
             print("CheckWX not configured - missing API key")
             return TafMetar(icao=icao, metar_raw="", taf_raw="")
         
-        metar_raw, taf_raw = None, None
-        
-        async with httpx.AsyncClient(timeout=20.0, headers=self.headers) as client:
-            try:
-                # Fetch METAR data
-                metar_response = await client.get(f"{self.base_url}/metar/{icao}")
-                if metar_response.status_code == 200:
-                    data = metar_response.json()
-                    if data.get("results", 0) > 0 and data.get("data"):
-                        metar_raw = data["data"][0]  # Get the first METAR
-            except Exception as e:
-                print(f"Error fetching METAR from CheckWX: {e}")
-            
-            try:
-                # Fetch TAF data
-                taf_response = await client.get(f"{self.base_url}/taf/{icao}")
-                if taf_response.status_code == 200:
-                    data = taf_response.json()
-                    if data.get("results", 0) > 0 and data.get("data"):
-                        taf_raw = data["data"][0]  # Get the first TAF
-            except Exception as e:
-                print(f"Error fetching TAF from CheckWX: {e}")
-        
-        return TafMetar(icao=icao, metar_raw=metar_raw or "", taf_raw=taf_raw or "")
+        # Both requests go out together over the shared keep-alive client
+        metar_raw, taf_raw = await asyncio.gather(
+            self._fetch_first("metar", icao),
+            self._fetch_first("taf", icao),
+            return_exceptions=True,
+        )
+        if isinstance(metar_raw, Exception) and isinstance(taf_raw, Exception):
+            raise metar_raw
+        for product, result in (("METAR", metar_raw), ("TAF", taf_raw)):
+            if isinstance(result, Exception):
+                print(f"Error fetching {product} from CheckWX: {result}")
+        metar_raw = None if isinstance(metar_raw, Exception) else metar_raw
+        taf_raw = None if isinstance(taf_raw, Exception) else taf_raw
+        return TafMetar(icao=icao, metar_raw=metar_raw or "", taf_raw=taf_raw or "", provider=self.name)
+
+    async def _fetch_reports(self, product: str, icaos: List[str]) -> Dict[str, str]:
+        """One multi-station CheckWX call; reports are matched back to stations by their ICAO group"""
+        wanted = {i.upper() for i in icaos}
+        try:
+            response = await provider_get("checkwx", f"{self.base_url}/{product}/{','.join(icaos)}", headers=self.headers)
+        except Exception as e:
+            raise WeatherProviderError(f"CheckWX {product.upper()} request failed: {e!r}") from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise WeatherProviderError(f"CheckWX {product.upper()} returned HTTP {response.status_code}")
+        reports: Dict[str, str] = {}
+        if response.status_code == 200:
+            for raw in response.json().get("data") or []:
+                icao = next((tok for tok in str(raw).split()[:4] if tok in wanted), None)
+                if icao and icao not in reports:
+                    reports[icao] = raw
+        return reports
+
+    async def fetch_many(self, icaos: List[str], concurrency: int = 8) -> Dict[str, TafMetar]:
+        """METAR and TAF for many stations in CHECKWX_BULK_MAX_STATIONS-sized requests"""
+        if not self.api_key:
+            return {i.upper(): TafMetar(icao=i, metar_raw="", taf_raw="") for i in icaos}
+        size = max(settings.CHECKWX_BULK_MAX_STATIONS, 1)
+        groups = [icaos[i:i + size] for i in range(0, len(icaos), size)]
+        calls = [self._fetch_reports(product, g) for g in groups for product in ("metar", "taf")]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        metars: Dict[str, str] = {}
+        tafs: Dict[str, str] = {}
+        for call, result in enumerate(results):
+            if isinstance(result, Exception):
+                print(f"Error fetching bulk weather from CheckWX: {result}")
+                continue
+            (metars if call % 2 == 0 else tafs).update(result)
+        return {
+            i.upper(): TafMetar(icao=i, metar_raw=metars.get(i.upper(), ""), taf_raw=tafs.get(i.upper(), ""),
+                                provider=self.name)
+            for i in icaos
+        }
 
     async def fetch_minute(self, lat: float, lon: float) -> Dict:
         """Fetch minute-by-minute weather data (if available)"""
         if not self.api_key:
             return {}
         
-        async with httpx.AsyncClient(timeout=20.0, headers=self.headers) as client:
-            try:
-                # CheckWX doesn't have minute-by-minute data, but we can get current conditions
-                # This is a placeholder for future implementation
-                response = await client.get(f"{self.base_url}/metar/lat/{lat}/lon/{lon}")
-                if response.status_code == 200:
-                    data = response.json()
-                    return data
-            except Exception as e:
-                print(f"Error fetching minute data from CheckWX: {e}")
-                return {}
+        try:
+            # CheckWX doesn't have minute-by-minute data, but we can get current conditions
+            # This is a placeholder for future implementation
+            response = await provider_get("checkwx", f"{self.base_url}/metar/lat/{lat}/lon/{lon}", headers=self.headers)
+            if response.status_code == 200:
+                data = response.json()
+                return data
+        except Exception as e:
+            print(f"Error fetching minute data from CheckWX: {e}")
+            return {}
         return {}
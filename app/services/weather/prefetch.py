@@ -0,0 +1,143 @@
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+
+from app.services.weather.cache import WeatherCache, get_weather_cache
+from app.services.weather.manager import WeatherManager, weather_manager
+from app.core.config import settings
+
+class PrefetchScheduler:
+    """Keeps the weather cache warm for a watch-list of stations.
+
+    Each station is refreshed just after its cache entry stops being fresh,
+    i.e. just after the next METAR/TAF is expected (see cache.fresh_until),
+    plus random jitter so workers and stations do not fire together. Due
+    stations are fetched in one bulk call, limited to `per_minute` stations a
+    minute so a long watch-list cannot drain the provider quota. A station
+    whose new report has not been published yet gets the cache's minimum TTL
+    and is simply retried then. With the disk tier, a station another worker
+    already refreshed is seen as fresh and skipped.
+    """
+
+    def __init__(self, stations: List[str], cache: WeatherCache, manager: WeatherManager,
+                 jitter_s: float = 60.0, per_minute: float = 30.0):
+        self.stations = list(dict.fromkeys(s.strip().upper() for s in stations if s.strip()))
+        self.cache = cache
+        self.manager = manager
+        self.jitter_s = jitter_s
+        self.per_minute = per_minute
+        self.tokens = per_minute
+        self.refilled_at = time.monotonic()
+        self.next_due: Dict[str, float] = {icao: 0.0 for icao in self.stations}
+        self.task: Optional[asyncio.Task] = None
+        self.counters = {"cycles": 0, "refreshed": 0, "skipped_fresh": 0, "deferred": 0, "errors": 0}
+        self.last_error: Optional[str] = None
+
+    def _take(self, wanted: int) -> int:
+        """Stations allowed right now under the per-minute budget"""
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self.refilled_at) * self.per_minute / 60)
+        self.refilled_at = now
+        granted = min(wanted, int(self.tokens))
+        self.tokens -= granted
+        return granted
+
+    def _schedule(self, icao: str, now: float):
+        entry = self.cache.peek(icao)
+        if entry is not None and entry.fresh_until > now:
+            self.next_due[icao] = entry.fresh_until + random.uniform(0, self.jitter_s)
+        else:
+            self.next_due[icao] = now + settings.WEATHER_CACHE_MIN_TTL_SECONDS
+
+    async def refresh_due(self):
+        now = time.time()
+        due = []
+        for icao in self.stations:
+            if self.next_due[icao] > now:
+                continue
+            entry = self.cache.peek(icao)
+            if entry is not None and entry.is_fresh(now):
+                self.counters["skipped_fresh"] += 1   # refreshed elsewhere (request path or another worker)
+                self._schedule(icao, now)
+                continue
+            due.append(icao)
+        if not due:
+            return
+        granted = self._take(len(due))
+        self.counters["deferred"] += len(due) - granted
+        due = due[:granted]
+        if not due:
+            return
+        self.counters["cycles"] += 1
+        try:
+            fetched = await self.manager.fetch_weather_many(due)
+        except Exception as e:
+            self.counters["errors"] += 1
+            self.last_error = str(e)
+            print(f"❌ Weather prefetch for {', '.join(due)} failed: {e}")
+            for icao in due:
+                self.next_due[icao] = now + settings.WEATHER_CACHE_MIN_TTL_SECONDS
+            return
+        for icao in due:
+            weather = fetched.get(icao)
+            if weather is not None and (weather.metar_raw or weather.taf_raw):
+                self.cache.put(weather)
+                self.counters["refreshed"] += 1
+            self._schedule(icao, time.time())
+
+    def _sleep_for(self) -> float:
+        wait = min(self.next_due.values(), default=time.time() + 60) - time.time()
+        return min(max(wait, 1.0), 60.0)
+
+    async def run(self):
+        print(f"✅ Weather prefetch watching {', '.join(self.stations)}")
+        while True:
+            try:
+                await self.refresh_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["errors"] += 1
+                self.last_error = str(e)
+                print(f"❌ Weather prefetch error: {e}")
+            await asyncio.sleep(self._sleep_for())
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def status(self) -> Dict:
+        now = time.time()
+        return {
+            **self.counters,
+            "running": self.task is not None and not self.task.done(),
+            "stations": {icao: {"next_refresh_in_s": round(max(self.next_due[icao] - now, 0.0), 1)}
+                         for icao in self.stations},
+            "budget_per_minute": self.per_minute,
+            "last_error": self.last_error,
+        }
+
+_scheduler = None
+def get_prefetch_scheduler() -> Optional[PrefetchScheduler]:
+    """Scheduler for WEATHER_WATCHLIST; None when the list is empty or the cache is off"""
+    global _scheduler
+    cache = get_weather_cache()
+    if _scheduler is None and settings.WEATHER_WATCHLIST.strip() and cache is not None:
+        _scheduler = PrefetchScheduler(
+            settings.WEATHER_WATCHLIST.split(","),
+            cache,
+            weather_manager,
+            jitter_s=settings.WEATHER_PREFETCH_JITTER_SECONDS,
+            per_minute=settings.WEATHER_PREFETCH_STATIONS_PER_MINUTE,
+        )
+    return _scheduler
@@ -1,5 +1,6 @@
 import re
-from typing import List
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional
 
 def clean_text(s: str) -> str:
     s = s.replace("\x00", " ").replace("\u200b", "")
@@ -14,5 +15,59 @@ def split_into_chunks(text: str, max_chars: int = 2000, overlap: int = 200) -> L
     while i < n:
         end = min(i + max_chars, n)
         chunks.append(text[i:end].strip())
-        i = max(0, end - overlap)
+        if end == n:
+            break
+        i = max(i + 1, end - overlap)
     return [c for c in chunks if c]
+
+def chunk_pages(pages: Iterable[Dict], max_chars: int = 2000, overlap: int = 200) -> Iterator[Dict]:
+    """split_into_chunks over a stream of {page, text} records, keeping page provenance.
+
+    Cleaned pages are joined with blank lines, as pdf_to_text does, and cut
+    into the same overlapping windows; each chunk reports the first and last
+    page its (stripped) text comes from. Only the text not yet fully chunked
+    is held, so memory stays at about one window plus one page.
+    """
+    buf, base, pos = "", 0, 0         # unchunked text, its absolute offset, next window start
+    starts: List[int] = []            # absolute offsets where each held page begins
+    numbers: List[int] = []
+
+    def window(end: int) -> Optional[Dict]:
+        raw = buf[pos - base:end - base]
+        s = pos + len(raw) - len(raw.lstrip())
+        e = pos + len(raw.rstrip())
+        if e <= s:
+            return None
+        first = numbers[max(bisect_right(starts, s) - 1, 0)]
+        last = numbers[max(bisect_left(starts, e) - 1, 0)]
+        return {"text": raw.strip(), "page_start": first, "page_end": last}
+
+    for record in pages:
+        text = clean_text(record.get("text") or "")
+        if not text:
+            continue
+        if buf:
+            buf += "\n\n"
+        starts.append(base + len(buf))
+        numbers.append(int(record["page"]))
+        buf += text
+        while base + len(buf) - pos > max_chars:
+            end = pos + max_chars
+            chunk = window(end)
+            if chunk:
+                yield chunk
+            pos = max(pos + 1, end - overlap)
+        # Drop text and pages that every later window starts after
+        keep = max(bisect_right(starts, pos) - 1, 0)
+        del starts[:keep], numbers[:keep]
+        buf, base = buf[pos - base:], pos
+
+    total = base + len(buf)
+    while pos < total:
+        end = min(pos + max_chars, total)
+        chunk = window(end)
+        if chunk:
+            yield chunk
+        if end == total:
+            break
+        pos = max(pos + 1, end - overlap)
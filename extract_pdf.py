@@ -4,82 +4,38 @@ PDF Text Extraction Script for AviaGenAI Corpus
 Extracts text from T-6II documentation for AI processing
 """
 
+import argparse
 import os
-import sys
 from pathlib import Path
-from pypdf import PdfReader
-import json
-from datetime import datetime
 
-def extract_pdf_text(pdf_path: str, output_dir: str = "data/processed") -> dict:
+from app.services.ingest import catalog_doc_id
+from app.services.page_store import PageStore
+from app.services.pdf_extract import extract_pdf, store_pages
+
+def extract_pdf_text(pdf_path: str, store_dir: str = None, doc_id: str = None, workers: int = None,
+                     shard_pages: int = None) -> dict:
     """
-    Extract text from PDF and save as structured data
+    Extract text from PDF into the page store.
+
+    Pages are extracted in shards on a process pool (resuming from shards
+    left by an interrupted run), then streamed into the document's Parquet
+    file, one row per page.
     """
     try:
-        # Create output directory
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Read PDF
-        reader = PdfReader(pdf_path)
-        total_pages = len(reader.pages)
-        
         print(f"Processing PDF: {pdf_path}")
-        print(f"Total pages: {total_pages}")
-        
-        # Extract text from all pages
-        full_text = ""
-        page_texts = []
-        
-        for page_num, page in enumerate(reader.pages, 1):
-            try:
-                page_text = page.extract_text()
-                page_texts.append({
-                    "page": page_num,
-                    "text": page_text,
-                    "char_count": len(page_text)
-                })
-                full_text += f"\n--- PAGE {page_num} ---\n{page_text}\n"
-                print(f"Processed page {page_num}/{total_pages}")
-            except Exception as e:
-                print(f"Error processing page {page_num}: {e}")
-                page_texts.append({
-                    "page": page_num,
-                    "text": "",
-                    "char_count": 0,
-                    "error": str(e)
-                })
-        
-        # Create metadata
-        metadata = {
-            "source_file": pdf_path,
-            "extraction_date": datetime.now().isoformat(),
-            "total_pages": total_pages,
-            "total_characters": len(full_text),
-            "pages_processed": len([p for p in page_texts if p.get("text")]),
-            "pages_with_errors": len([p for p in page_texts if p.get("error")])
-        }
-        
-        # Save full text
-        output_file = Path(output_dir) / f"{Path(pdf_path).stem}_extracted.txt"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(full_text)
-        
-        # Save structured data
-        json_file = Path(output_dir) / f"{Path(pdf_path).stem}_structured.json"
-        structured_data = {
-            "metadata": metadata,
-            "pages": page_texts
-        }
-        
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(structured_data, f, indent=2, ensure_ascii=False)
+        result = extract_pdf(pdf_path, workers=workers, shard_pages=shard_pages)
+        store = PageStore(store_dir)
+        doc_id = doc_id or catalog_doc_id(pdf_path)
+        info = store_pages(result, doc_id, store)
         
         print(f"\n✅ Extraction complete!")
-        print(f"📄 Full text saved to: {output_file}")
-        print(f"📊 Structured data saved to: {json_file}")
-        print(f"📈 Total characters: {len(full_text):,}")
+        print(f"📄 Pages saved to: {store.path_for(doc_id)} (doc_id {doc_id})")
+        print(f"📈 {info['total_pages']} pages, {info['total_characters']:,} characters, "
+              f"{info['pages_with_errors']} with errors")
+        if result["pages_per_second"]:
+            print(f"⚡ {result['pages_per_second']} pages/s")
         
-        return metadata
+        return result
         
     except Exception as e:
         print(f"❌ Error extracting PDF: {e}")
@@ -87,7 +43,15 @@ def extract_pdf_text(pdf_path: str, output_dir: str = "data/processed") -> dict:
 
 def main():
     """Main function to process T-6II PDF"""
-    pdf_path = "corpus/t6ii_checklists/519613250-Beechcraft-T-6B-Texan-II-Flight-Training-Instructions.pdf"
+    parser = argparse.ArgumentParser(description="Extract PDF text in parallel, resumable page shards")
+    parser.add_argument("pdf", nargs="?",
+                        default="corpus/t6ii_checklists/519613250-Beechcraft-T-6B-Texan-II-Flight-Training-Instructions.pdf")
+    parser.add_argument("--store-dir", default=None, help="Page store directory (default: PAGE_STORE_DIR)")
+    parser.add_argument("--doc-id", default=None, help="Document id (default: from corpus/catalog.yaml, else the file stem)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: PDF_EXTRACT_WORKERS or CPU count)")
+    parser.add_argument("--shard-pages", type=int, default=None, help="Pages per shard (default: PDF_SHARD_PAGES)")
+    args = parser.parse_args()
+    pdf_path = args.pdf
     
     if not os.path.exists(pdf_path):
         print(f"❌ PDF file not found: {pdf_path}")
@@ -96,7 +60,7 @@ def main():
     print("🛩️ AviaGenAI PDF Text Extraction")
     print("=" * 50)
     
-    result = extract_pdf_text(pdf_path)
+    result = extract_pdf_text(pdf_path, args.store_dir, args.doc_id, args.workers, args.shard_pages)
     
     if "error" not in result:
         print(f"\n🎯 Ready for next steps:")
@@ -107,4 +71,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-